@@ -1,7 +1,11 @@
 # consolidador_ultra_simple.py
+import sys
 import pandas as pd
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "scripts" / "utilidades"))
+from escritura_excel import LibroExcel
+
 # Configuración
 CARPETA_1 = Path(r"C:\Users\eisne\OneDrive - Distribuidora La Florida S.A\Planeamientos de Rutas - Reportes de Disponibilidad de Personal\RURAL") 
 CARPETA_2 = Path(r"C:\Users\eisne\OneDrive - Distribuidora La Florida S.A\Planeamientos de Rutas - Reportes de Disponibilidad de Personal\MACROZONAS") 
@@ -17,14 +21,14 @@ def consolidar_simple():
     
     print(f"📁 Encontrados: {len(archivos)} archivos")
     
-    with pd.ExcelWriter(SALIDA, engine='openpyxl') as writer:
+    with LibroExcel(SALIDA) as libro:
         for i, archivo in enumerate(archivos, 1):
             try:
                 df = pd.read_excel(archivo, sheet_name='Registro')
                 df['Origen'] = archivo.name
                 
                 nombre_hoja = f"Reg_{i}"
-                df.to_excel(writer, sheet_name=nombre_hoja, index=False)
+                libro.escribir_hoja(nombre_hoja, df)
                 
                 print(f"✅ {archivo.name} -> {len(df)} filas")
                 
@@ -1,7 +1,11 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, send_from_directory, Response
+from werkzeug.http import is_resource_modified
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.compute as pc
+from werkzeug.datastructures import MultiDict
 import os
-import shutil
 from pathlib import Path
 import logging
 import subprocess
@@ -9,10 +13,17 @@ import sys
 import json
 import threading
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import OrderedDict
 import tkinter as tk
 from tkinter import filedialog
 import tempfile
+import hashlib
+
+# Servicio de configuración compartido con los scripts de procesamiento
+sys.path.insert(0, str(Path(__file__).parent / "scripts" / "utilidades"))
+from configuracion_sistema import cargar_configuracion, guardar_configuracion, validar_configuracion, registrar_observador
+from publicar_archivos import publicar_archivos
 
 app = Flask(__name__)
 app.config['APP_NAME'] = 'OTIF Master'
@@ -36,6 +47,35 @@ procesamiento_status = {
     'total_lineas': 0
 }
 
+# Filtros aceptados sobre los parquet de salida (parámetro -> columna)
+FILTROS_LISTA = {
+    'centro': 'Centro',
+    'familia': 'Familia',
+    'zona': 'Zona'
+}
+COLUMNA_FECHA = 'Fe.Entrega'
+# Sufijos de los joins en orden de preferencia (igual que el cubo OTIF)
+SUFIJOS_COLUMNA = ('_rep_plr', '_completos', '', '_vol_portafolio', '_no_entregas')
+PARAMETROS_FILTRO = list(FILTROS_LISTA) + ['fecha_desde', 'fecha_hasta']
+FORMATOS_EXPORTACION = {'csv': 'text/csv', 'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'}
+# Filas de datos que caben en una hoja de Excel (1.048.576 menos el encabezado)
+MAX_FILAS_EXPORTACION_XLSX = 1_048_575
+# Por encima de este tamaño el xlsx se arma en un temporal en disco y no en memoria
+MAX_BYTES_XLSX_EN_MEMORIA = 32 * 1024 * 1024
+TAMANO_LOTE_EXPORTACION = 65536
+
+# Consultas agregadas sobre el dataset unificado
+ARCHIVO_CONSULTA_DEFECTO = 'datos_completos_con_no_entregas.parquet'
+ARCHIVO_CUBO = 'cubo_otif.parquet'
+METRICAS_CONSULTA = ['Entregas', 'No Entrega', 'Cajas Equiv.', 'Cajas Equiv NE']
+MAX_CONSULTAS_EN_CACHE = 64
+cache_consultas = OrderedDict()
+cache_consultas_lock = threading.Lock()
+
+# Dashboard HTML de Monitor de Guías (contexto generado por generar_dashboard_regional.py)
+CARPETA_DASHBOARD_MONITOR = "C:/data/SAP_Extraction/y_dev_74"
+ARCHIVO_CONTEXTO_DASHBOARD = 'dashboard_monitor_guias.json'
+
 def seleccionar_carpeta(titulo="Seleccionar carpeta"):
     """
     Abre un explorador de archivos para seleccionar una carpeta.
@@ -70,37 +110,206 @@ def seleccionar_carpeta(titulo="Seleccionar carpeta"):
         logger.error(f"Error al abrir explorador de carpetas: {str(e)}")
         return None
 
-def cargar_configuracion():
-    """Carga la configuración de rutas desde el archivo JSON."""
+def al_cambiar_configuracion(config):
+    """Observador de configuración: descarta las consultas en caché al cambiar las rutas."""
+    logger.info("Configuración de rutas actualizada, limpiando caché de consultas")
+    with cache_consultas_lock:
+        cache_consultas.clear()
+
+registrar_observador(al_cambiar_configuracion)
+
+def resolver_columna(columnas, nombre):
+    """
+    Busca una columna por nombre exacto o con los sufijos que agregan los
+    joins de la unificación (p.ej. 'Familia_rep_plr'). Se prefiere la versión
+    de REP PLR (base de los joins, '_rep_plr' o '_completos'), en el mismo
+    orden que el cubo (SUFIJOS_COLUMNA en unificar_datos_completos.py).
+    Retorna el nombre real de la columna o None si no existe.
+    """
+    for sufijo in SUFIJOS_COLUMNA:
+        if f"{nombre}{sufijo}" in columnas:
+            return f"{nombre}{sufijo}"
+    for col in columnas:
+        if col.startswith(f"{nombre}_"):
+            return col
+    return None
+
+def _convertir_valor_filtro(tipo, valor):
+    """Convierte un valor de filtro recibido como texto al tipo de la columna del parquet."""
+    if pa.types.is_dictionary(tipo):
+        tipo = tipo.value_type
+    if pa.types.is_timestamp(tipo):
+        return datetime.fromisoformat(valor)
+    if pa.types.is_date(tipo):
+        return datetime.fromisoformat(valor).date()
+    if pa.types.is_integer(tipo):
+        return int(valor)
+    if pa.types.is_floating(tipo):
+        return float(valor)
+    return valor
+
+def _es_solo_fecha(valor):
+    """Indica si el texto es una fecha sin hora (YYYY-MM-DD)."""
     try:
-        with open('configuracion_rutas.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        # Configuración por defecto
-        config_default = {
-            "rutas_archivos": {
-                "rep_plr": "Data/Rep PLR",
-                "no_entregas": "Data/No Entregas/2025",
-                "vol_portafolio": "Data/Vol_Portafolio",
-                "output_unificado": "Data/Output_Unificado",
-                "output_final": "Data/Output/calculo_otif"
-            },
-            "archivos_principales": [
-                "rep_plr.parquet",
-                "no_entregas.parquet", 
-                "vol_portafolio.parquet",
-                "datos_completos_con_no_entregas.parquet"
-            ],
-            "ultima_actualizacion": None
-        }
-        guardar_configuracion(config_default)
-        return config_default
+        datetime.strptime(valor.strip(), '%Y-%m-%d')
+        return True
+    except ValueError:
+        return False
+
+def construir_filtro_parquet(esquema, parametros):
+    """
+    Construye una expresión de pyarrow.dataset a partir de los parámetros de
+    la petición (centro, familia, zona, fecha_desde, fecha_hasta) para que el
+    filtrado se haga al leer el parquet y no en memoria.
+
+    Args:
+        esquema (pa.Schema): Esquema del parquet
+        parametros (MultiDict): Parámetros de la petición
+
+    Returns:
+        ds.Expression | None: Filtro combinado o None si no hay filtros
+
+    Raises:
+        ValueError: Si un filtro apunta a una columna inexistente o un valor no es válido
+    """
+    condiciones = []
+
+    for parametro, nombre_columna in FILTROS_LISTA.items():
+        valores = [v.strip() for valor in parametros.getlist(parametro) for v in valor.split(',') if v.strip()]
+        if not valores:
+            continue
+        columna = resolver_columna(esquema.names, nombre_columna)
+        if columna is None:
+            raise ValueError(f"La columna '{nombre_columna}' no existe en el archivo")
+        tipo = esquema.field(columna).type
+        condiciones.append(ds.field(columna).isin([_convertir_valor_filtro(tipo, v) for v in valores]))
+
+    fecha_desde = parametros.get('fecha_desde')
+    fecha_hasta = parametros.get('fecha_hasta')
+    if fecha_desde or fecha_hasta:
+        columna = resolver_columna(esquema.names, COLUMNA_FECHA)
+        if columna is None:
+            raise ValueError(f"La columna '{COLUMNA_FECHA}' no existe en el archivo")
+        tipo = esquema.field(columna).type
+        if fecha_desde:
+            condiciones.append(ds.field(columna) >= _convertir_valor_filtro(tipo, fecha_desde))
+        if fecha_hasta:
+            valor_tipo = tipo.value_type if pa.types.is_dictionary(tipo) else tipo
+            if pa.types.is_timestamp(valor_tipo) and _es_solo_fecha(fecha_hasta):
+                # Rango semiabierto: incluye todo el día de fecha_hasta, no solo la medianoche
+                limite = _convertir_valor_filtro(tipo, fecha_hasta) + timedelta(days=1)
+                condiciones.append(ds.field(columna) < limite)
+            else:
+                condiciones.append(ds.field(columna) <= _convertir_valor_filtro(tipo, fecha_hasta))
+
+    filtro = None
+    for condicion in condiciones:
+        filtro = condicion if filtro is None else filtro & condicion
+    return filtro
+
+def generar_csv_por_lotes(dataset, filtro):
+    """Genera el CSV de un dataset filtrado lote a lote, sin cargar el archivo completo."""
+    # BOM para que Excel reconozca los acentos
+    yield '\ufeff'
+    encabezado = True
+    for lote in dataset.to_batches(filter=filtro, batch_size=TAMANO_LOTE_EXPORTACION):
+        if lote.num_rows == 0:
+            continue
+        yield lote.to_pandas().to_csv(index=False, header=encabezado)
+        encabezado = False
+    if encabezado:
+        yield pd.DataFrame(columns=dataset.schema.names).to_csv(index=False)
 
-def guardar_configuracion(config):
-    """Guarda la configuración en el archivo JSON."""
-    config["ultima_actualizacion"] = datetime.now().isoformat()
-    with open('configuracion_rutas.json', 'w', encoding='utf-8') as f:
-        json.dump(config, f, indent=2, ensure_ascii=False)
+def escribir_xlsx_por_lotes(dataset, filtro, destino):
+    """Escribe un dataset filtrado a Excel (ruta o buffer) en modo write_only, lote a lote."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title="Datos")
+    ws.append(dataset.schema.names)
+    for lote in dataset.to_batches(filter=filtro, batch_size=TAMANO_LOTE_EXPORTACION):
+        df_lote = lote.to_pandas()
+        for fila in df_lote.itertuples(index=False, name=None):
+            ws.append([None if pd.isna(valor) else valor for valor in fila])
+    wb.save(destino)
+
+def ejecutar_consulta_agregada(archivo, filtros, agrupar_por, metricas):
+    """
+    Ejecuta una consulta agregada sobre un parquet leyendo solo las columnas
+    necesarias y aplicando los filtros en la lectura.
+
+    Args:
+        archivo (Path): Parquet a consultar
+        filtros (tuple): Pares (parámetro, valores) aceptados por construir_filtro_parquet
+        agrupar_por (tuple): Columnas de agrupación
+        metricas (tuple): Columnas a sumar
+
+    Returns:
+        pd.DataFrame: Una fila por grupo con la suma de cada métrica y el % OTIF
+
+    Raises:
+        ValueError: Si alguna columna no existe en el archivo
+    """
+    dataset = ds.dataset(archivo, format='parquet')
+    nombres = dataset.schema.names
+    filtro = construir_filtro_parquet(dataset.schema, MultiDict([(p, v) for p, valores in filtros for v in valores]))
+
+    columnas_grupo = []
+    for nombre in agrupar_por:
+        columna = resolver_columna(nombres, nombre)
+        if columna is None:
+            raise ValueError(f"La columna de agrupación '{nombre}' no existe en el archivo")
+        columnas_grupo.append(columna)
+
+    columnas_metrica = []
+    for nombre in metricas:
+        columna = resolver_columna(nombres, nombre)
+        if columna is None:
+            raise ValueError(f"La métrica '{nombre}' no existe en el archivo")
+        columnas_metrica.append(columna)
+
+    tabla = dataset.to_table(columns=columnas_grupo + columnas_metrica, filter=filtro)
+
+    if columnas_grupo:
+        agregada = tabla.group_by(columnas_grupo).aggregate([(col, 'sum') for col in columnas_metrica])
+        df = agregada.to_pandas().rename(columns={f"{col}_sum": col for col in columnas_metrica})
+        df = df[columnas_grupo + columnas_metrica].sort_values(columnas_grupo, ignore_index=True)
+    else:
+        df = pd.DataFrame([{col: pc.sum(tabla[col]).as_py() or 0 for col in columnas_metrica}])
+
+    # Nombres lógicos en la respuesta, aunque el parquet tenga sufijos de join
+    df.columns = list(agrupar_por) + list(metricas)
+
+    if 'Entregas' in df.columns and 'No Entrega' in df.columns:
+        entregas = df['Entregas'].astype('float64')
+        df['% OTIF'] = ((entregas - df['No Entrega']) / entregas.where(entregas > 0) * 100).round(2)
+
+    return df
+
+def consultar_con_cache(archivo, filtros, agrupar_por, metricas):
+    """
+    Devuelve el resultado de ejecutar_consulta_agregada usando una caché en
+    memoria indexada por la consulta y la versión (mtime/tamaño) del archivo.
+
+    Returns:
+        tuple: (DataFrame, bool indicando si vino de la caché)
+    """
+    stat = archivo.stat()
+    clave = (str(archivo), stat.st_mtime_ns, stat.st_size, filtros, agrupar_por, metricas)
+
+    with cache_consultas_lock:
+        if clave in cache_consultas:
+            cache_consultas.move_to_end(clave)
+            return cache_consultas[clave], True
+
+    df = ejecutar_consulta_agregada(archivo, filtros, agrupar_por, metricas)
+
+    with cache_consultas_lock:
+        cache_consultas[clave] = df
+        while len(cache_consultas) > MAX_CONSULTAS_EN_CACHE:
+            cache_consultas.popitem(last=False)
+
+    return df, False
 
 def ejecutar_script(script_name):
     """Ejecuta un script Python y retorna True si fue exitoso."""
@@ -121,7 +330,13 @@ def ejecutar_script(script_name):
         return False
 
 def copiar_archivos_a_destino():
-    """Copia solo los archivos principales a la carpeta de destino."""
+    """
+    Publica solo los archivos principales en la carpeta de destino.
+
+    Los archivos sin cambios se omiten; el resto se publica con reflink/hardlink
+    si origen y destino comparten sistema de archivos, o con copias en paralelo
+    verificadas contra el manifiesto de checksums.
+    """
     config = cargar_configuracion()
     carpeta_destino = Path(config["rutas_archivos"]["output_final"])
     carpeta_destino.mkdir(parents=True, exist_ok=True)
@@ -133,24 +348,26 @@ def copiar_archivos_a_destino():
     for archivo in config["archivos_principales"]:
         ruta_origen = Path(config["rutas_archivos"]["output_unificado"]) / archivo
         if ruta_origen.exists():
-            archivos_a_copiar.append(str(ruta_origen))
+            archivos_a_copiar.append(ruta_origen)
         else:
             procesamiento_status['mensajes'].append(f"⚠️ Archivo no encontrado: {archivo}")
     
     archivos_copiados = []
+    if not archivos_a_copiar:
+        return archivos_copiados
     
-    for archivo_origen in archivos_a_copiar:
-        origen = Path(archivo_origen)
-        if origen.exists():
-            destino = carpeta_destino / origen.name
-            try:
-                shutil.copy2(origen, destino)
-                archivos_copiados.append(archivo_origen)
-                procesamiento_status['mensajes'].append(f"✅ Copiado: {origen.name}")
-            except Exception as e:
-                procesamiento_status['mensajes'].append(f"❌ Error al copiar {archivo_origen}: {str(e)}")
+    resultados = publicar_archivos(archivos_a_copiar, carpeta_destino)
+    
+    for origen in archivos_a_copiar:
+        resultado = resultados[origen.name]
+        if 'error' in resultado:
+            procesamiento_status['mensajes'].append(f"❌ Error al copiar {origen}: {resultado['error']}")
+        elif resultado['metodo'] == 'omitido':
+            archivos_copiados.append(str(origen))
+            procesamiento_status['mensajes'].append(f"⏭️ Sin cambios: {origen.name}")
         else:
-            procesamiento_status['mensajes'].append(f"⚠️ Archivo no encontrado: {archivo_origen}")
+            archivos_copiados.append(str(origen))
+            procesamiento_status['mensajes'].append(f"✅ Copiado: {origen.name} ({resultado['metodo']})")
     
     return archivos_copiados
 
@@ -412,16 +629,157 @@ def archivos_generados():
 
 @app.route('/descargar_archivo/<nombre_archivo>')
 def descargar_archivo(nombre_archivo):
-    """Permite descargar un archivo específico."""
+    """
+    Permite descargar un archivo específico.
+
+    Sin parámetros se sirve el archivo completo con soporte de Range y GET
+    condicional (ETag/Last-Modified). Con filtros (centro, familia, zona,
+    fecha_desde, fecha_hasta) o con formato=csv/xlsx se exporta solo el
+    subconjunto pedido, leyendo el parquet por lotes. Un xlsx que supere el
+    límite de filas de Excel se rechaza con 413.
+    """
+    config = cargar_configuracion()
+    carpeta_destino = Path(config["rutas_archivos"]["output_final"]).resolve()
+    archivo = (carpeta_destino / nombre_archivo).resolve()
+
+    if archivo.parent != carpeta_destino or not archivo.is_file():
+        return jsonify({'error': 'Archivo no encontrado'}), 404
+
+    formato = request.args.get('formato', '').lower()
+    hay_filtros = any(request.args.get(parametro) for parametro in PARAMETROS_FILTRO)
+
+    if not formato and not hay_filtros:
+        return send_from_directory(carpeta_destino, archivo.name, as_attachment=True,
+                                   conditional=True, etag=True, max_age=0)
+
+    formato = formato or 'csv'
+    if formato not in FORMATOS_EXPORTACION:
+        return jsonify({'error': f'Formato "{formato}" no soportado. Use: {", ".join(FORMATOS_EXPORTACION)}'}), 400
+    if archivo.suffix.lower() != '.parquet':
+        return jsonify({'error': 'Los filtros y la conversión solo aplican a archivos parquet'}), 400
+
+    try:
+        dataset = ds.dataset(archivo, format='parquet')
+        filtro = construir_filtro_parquet(dataset.schema, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # El ETag depende de la versión del archivo y de la consulta pedida
+    stat = archivo.stat()
+    consulta = '&'.join(f"{k}={','.join(request.args.getlist(k))}" for k in sorted(request.args))
+    etag = hashlib.md5(f"{stat.st_mtime_ns}-{stat.st_size}-{consulta}".encode('utf-8')).hexdigest()
+    ultima_modificacion = datetime.fromtimestamp(stat.st_mtime)
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=ultima_modificacion):
+        respuesta = Response(status=304)
+        respuesta.set_etag(etag)
+        return respuesta
+
+    nombre_descarga = f"{archivo.stem}_filtrado.{formato}"
+
+    if formato == 'csv':
+        respuesta = Response(generar_csv_por_lotes(dataset, filtro), mimetype=FORMATOS_EXPORTACION['csv'])
+        respuesta.headers['Content-Disposition'] = f'attachment; filename="{nombre_descarga}"'
+    else:
+        total_filas = dataset.count_rows(filter=filtro)
+        if total_filas > MAX_FILAS_EXPORTACION_XLSX:
+            return jsonify({
+                'error': f'La exportación tiene {total_filas:,} filas y Excel admite como máximo '
+                         f'{MAX_FILAS_EXPORTACION_XLSX:,}. Aplique filtros o use formato=csv'
+            }), 413
+
+        # El xlsx es un zip y no se puede enviar por partes: se arma completo en
+        # modo write_only en un temporal que pasa a disco si crece demasiado
+        buffer = tempfile.SpooledTemporaryFile(max_size=MAX_BYTES_XLSX_EN_MEMORIA)
+        escribir_xlsx_por_lotes(dataset, filtro, buffer)
+        buffer.seek(0)
+        respuesta = send_file(buffer, as_attachment=True, download_name=nombre_descarga,
+                              mimetype=FORMATOS_EXPORTACION['xlsx'], conditional=False, etag=False)
+
+    respuesta.set_etag(etag)
+    respuesta.last_modified = ultima_modificacion
+    return respuesta
+
+@app.route('/consultar_datos')
+def consultar_datos():
+    """
+    Consulta de solo lectura sobre el dataset unificado.
+
+    Parámetros:
+        centro, familia, zona: Valores separados por coma
+        fecha_desde, fecha_hasta: Rango de Fe.Entrega (YYYY-MM-DD, inclusivo)
+        agrupar_por: Columnas separadas por coma (p.ej. Zona,Centro)
+        metricas: Columnas a sumar (por defecto Entregas, No Entrega, Cajas Equiv.)
+        archivo: Uno de los archivos principales (por defecto el dataset unificado)
+
+    Si no se indica archivo y la consulta (agrupación, métricas y filtros) solo
+    usa columnas del cubo precalculado (cubo_otif.parquet), se responde desde
+    el cubo; si falta alguna, desde el dataset completo.
+    """
     config = cargar_configuracion()
     carpeta_destino = Path(config["rutas_archivos"]["output_final"])
+
+    agrupar_por = tuple(c.strip() for c in request.args.get('agrupar_por', '').split(',') if c.strip())
+    metricas = tuple(m.strip() for m in request.args.get('metricas', '').split(',') if m.strip())
+    metricas = metricas or tuple(METRICAS_CONSULTA[:3])
+
+    no_permitidas = [m for m in metricas if m not in METRICAS_CONSULTA]
+    if no_permitidas:
+        return jsonify({'error': f'Métricas no soportadas: {", ".join(no_permitidas)}. Use: {", ".join(METRICAS_CONSULTA)}'}), 400
+
+    filtros = tuple(
+        (parametro, tuple(request.args.getlist(parametro)))
+        for parametro in PARAMETROS_FILTRO if request.args.get(parametro)
+    )
+    columnas_filtro = tuple(
+        FILTROS_LISTA.get(parametro, COLUMNA_FECHA) for parametro, _ in filtros
+    )
+
+    nombre_archivo = request.args.get('archivo')
+    if nombre_archivo is None:
+        nombre_archivo = ARCHIVO_CONSULTA_DEFECTO
+        archivo_cubo = carpeta_destino / ARCHIVO_CUBO
+        if archivo_cubo.exists():
+            try:
+                columnas_cubo = ds.dataset(archivo_cubo, format='parquet').schema.names
+                # El cubo solo sirve si tiene todas las columnas de agrupación, métricas y filtros
+                if all(c in columnas_cubo for c in agrupar_por + metricas + columnas_filtro):
+                    nombre_archivo = ARCHIVO_CUBO
+            except Exception as e:
+                logger.warning(f"No se pudo leer el cubo OTIF, se usa el dataset completo: {str(e)}")
+
+    if nombre_archivo not in config["archivos_principales"] + [ARCHIVO_CUBO] or not nombre_archivo.endswith('.parquet'):
+        return jsonify({'error': f'Archivo "{nombre_archivo}" no disponible para consultas'}), 400
+
     archivo = carpeta_destino / nombre_archivo
-    
-    if archivo.exists():
-        return send_file(archivo, as_attachment=True)
-    else:
+    if not archivo.exists():
         return jsonify({'error': 'Archivo no encontrado'}), 404
 
+    inicio = time.perf_counter()
+    try:
+        df, desde_cache = consultar_con_cache(archivo, filtros, agrupar_por, metricas)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error en consulta sobre {nombre_archivo}: {str(e)}")
+        return jsonify({'error': f'Error al ejecutar la consulta: {str(e)}'}), 500
+
+    # Fechas en ISO y NaN como null para el JSON
+    df = df.copy()
+    for col in df.select_dtypes(include=['datetime', 'datetimetz']).columns:
+        df[col] = df[col].dt.strftime('%Y-%m-%d')
+    filas = df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+    return jsonify({
+        'archivo': nombre_archivo,
+        'agrupar_por': list(agrupar_por),
+        'metricas': list(metricas),
+        'total_grupos': len(filas),
+        'filas': filas,
+        'desde_cache': desde_cache,
+        'tiempo_ms': round((time.perf_counter() - inicio) * 1000, 1)
+    })
+
 @app.route('/ver_resumen')
 def ver_resumen():
     """Retorna el resumen del procesamiento."""
@@ -435,6 +793,20 @@ def ver_resumen():
     else:
         return jsonify({'error': 'Resumen no encontrado'}), 404
 
+@app.route('/dashboard_monitor_guias')
+def dashboard_monitor_guias():
+    """Muestra el último dashboard de Monitor de Guías con la plantilla HTML."""
+    config = cargar_configuracion()
+    carpeta = Path(config["rutas_archivos"].get("dashboard_monitor_guias", CARPETA_DASHBOARD_MONITOR))
+    archivo_contexto = carpeta / ARCHIVO_CONTEXTO_DASHBOARD
+    
+    if not archivo_contexto.exists():
+        return jsonify({'error': 'Dashboard no encontrado'}), 404
+    
+    with open(archivo_contexto, 'r', encoding='utf-8') as f:
+        contexto = json.load(f)
+    return render_template('dashboard_monitor_guias.html', incluir_partes=False, **contexto)
+
 @app.route('/configuracion')
 def obtener_configuracion():
     """Retorna la configuración actual."""
@@ -455,10 +827,13 @@ def actualizar_configuracion():
         if 'archivos_principales' in nueva_config:
             config_actual['archivos_principales'] = nueva_config['archivos_principales']
         
+        validar_configuracion(config_actual)
         guardar_configuracion(config_actual)
         return jsonify({'message': 'Configuración actualizada correctamente', 'config': config_actual})
-    except Exception as e:
+    except (ValueError, TypeError, AttributeError) as e:
         return jsonify({'error': f'Error al actualizar configuración: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': f'Error al guardar configuración: {str(e)}'}), 500
 
 @app.route('/seleccionar_carpeta/<tipo_ruta>', methods=['POST'])
 def seleccionar_carpeta_ruta(tipo_ruta):
@@ -732,7 +1107,8 @@ def estadisticas_rendimiento_web():
             'rep_plr.parquet',
             'no_entregas.parquet',
             'vol_portafolio.parquet',
-            'datos_completos_con_no_entregas.parquet'
+            'datos_completos_con_no_entregas.parquet',
+            'cubo_otif.parquet'
         ]
     }
     
@@ -1,6 +1,7 @@
 # agrupar_datos_no_entregas_mejorado.py
 import pandas as pd
 import os
+import sys
 from pathlib import Path
 import logging
 import concurrent.futures
@@ -8,7 +9,8 @@ import gc
 import time
 from datetime import datetime
 
-# Importar módulo de configuración
+# Importar módulo de configuración (compartido con la app web, en scripts/utilidades)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utilidades"))
 try:
     from configuracion_sistema import cargar_configuracion, obtener_carpeta_salida, verificar_configuracion
 except ImportError:
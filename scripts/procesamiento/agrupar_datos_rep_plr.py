@@ -1,13 +1,15 @@
 # rep_plr_processor.py
 import pandas as pd
 import os
+import sys
 from pathlib import Path
 import logging
 import concurrent.futures
 import gc
 import time
 
-# Importar módulo de configuración
+# Importar módulo de configuración (compartido con la app web, en scripts/utilidades)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utilidades"))
 try:
     from configuracion_sistema import cargar_configuracion, obtener_carpeta_salida, verificar_configuracion
 except ImportError:
@@ -1,10 +1,15 @@
+import argparse
+import fnmatch
+import json
 import os
-import ftplib
+import re
 import shutil
 from datetime import datetime
 
 import socket
 
+from transferencia_ftp import PoolFTP, subir_archivos, asegurar_ruta_remota, ARCHIVO_DIARIO, MAX_CONEXIONES
+
 
 ###
 # --- Configuración ---
@@ -12,6 +17,8 @@ import socket
 DIRECTORIO_TRABAJO = r"C:\SAP\CARGARS"
 DIRECTORIO_MOVIDOS = os.path.join(DIRECTORIO_TRABAJO, "Movidos")
 ARCHIVO_ULTIMO_CENTRO = os.path.join(DIRECTORIO_TRABAJO, "ultimo_centro.txt")
+ARCHIVO_REGLAS_CENTROS = os.path.join(DIRECTORIO_TRABAJO, "reglas_centros.json")
+RUTA_DIARIO = os.path.join(DIRECTORIO_TRABAJO, ARCHIVO_DIARIO)
 
 # Configuración FTP (puedes sobrescribir con variables de entorno)
 
@@ -34,12 +41,35 @@ CENTROS = [
     "VYDSubeRS",
 ]
 
+# Reglas de enrutamiento (modo --enrutar): cada .DNL va a los centros de todas
+# las reglas que cumple. Una regla puede indicar:
+#   "nombre":    patrón del nombre de archivo (comodines * ?, sin distinguir mayúsculas)
+#   "contenido": expresión regular buscada en el encabezado del archivo
+#   "centro":    centro o lista de centros de destino
+# Se pueden reemplazar con reglas_centros.json en el directorio de trabajo.
+REGLAS_CENTROS = [
+    {"nombre": f"{centro[:-len('SubeRS')]}*", "centro": centro}
+    for centro in CENTROS if centro != "SubeRS"
+]
+
+# Bytes leídos del inicio del .DNL para las reglas de contenido
+BYTES_ENCABEZADO = 4096
+
 # --- Utilidades ---
 def mostrar_estado(mensaje):
-    print(socket.gethostbyname("fifjumpftp-prd.cloud.fifco.com"))
     """Muestra un mensaje de estado en la consola con marca de tiempo."""
     print(f"[{datetime.now().strftime('%H:%M:%S')}] {mensaje}")
 
+def resolver_host(host):
+    """Resuelve el servidor FTP una sola vez; las conexiones del pool usan la IP."""
+    try:
+        ip = socket.gethostbyname(host)
+    except OSError as e:
+        mostrar_estado(f"[WARN] No se pudo resolver {host}: {e}. Se usará el nombre.")
+        return host
+    mostrar_estado(f"Servidor FTP {host} -> {ip}")
+    return ip
+
 def leer_ultima_seleccion():
     """Lee el último centro guardado, si existe y es válido."""
     try:
@@ -92,19 +122,65 @@ def ensure_remote_path(ftp, path):
     Asegura que el path remoto exista navegando y creándolo si hace falta.
     path: "RoadShow/SncaSubeRS"
     """
-    partes = path.replace("\\", "/").split("/")
-    for parte in partes:
-        if not parte:
+    asegurar_ruta_remota(ftp, path)
+
+def cargar_reglas_centros(ruta=ARCHIVO_REGLAS_CENTROS):
+    """Lee las reglas de enrutamiento del JSON si existe; si no, usa REGLAS_CENTROS."""
+    if not os.path.exists(ruta):
+        return REGLAS_CENTROS
+    with open(ruta, "r", encoding="utf-8") as f:
+        reglas = json.load(f)
+
+    validas = []
+    for regla in reglas:
+        centros = regla.get("centro")
+        centros = [centros] if isinstance(centros, str) else list(centros or [])
+        desconocidos = [c for c in centros if c not in CENTROS]
+        if not centros or desconocidos or not ("nombre" in regla or "contenido" in regla):
+            mostrar_estado(f"[WARN] Regla ignorada en {os.path.basename(ruta)}: {regla}")
             continue
-        try:
-            ftp.cwd(parte)
-        except ftplib.error_perm:
-            # Intentar crear y luego entrar
-            try:
-                ftp.mkd(parte)
-                ftp.cwd(parte)
-            except ftplib.error_perm as e:
-                raise RuntimeError(f"No se pudo acceder/crear el directorio remoto '{parte}': {e}")
+        validas.append(regla)
+    return validas
+
+def _leer_encabezado(ruta):
+    with open(ruta, "rb") as f:
+        return f.read(BYTES_ENCABEZADO).decode("latin-1")
+
+def centros_de_archivo(ruta, reglas):
+    """Retorna los centros de destino de un archivo según las reglas (sin repetir)."""
+    nombre = os.path.basename(ruta).lower()
+    encabezado = None
+    centros = []
+    for regla in reglas:
+        if "nombre" in regla and not fnmatch.fnmatchcase(nombre, regla["nombre"].lower()):
+            continue
+        if "contenido" in regla:
+            if encabezado is None:
+                encabezado = _leer_encabezado(ruta)
+            if not re.search(regla["contenido"], encabezado):
+                continue
+        destino = regla["centro"]
+        for centro in [destino] if isinstance(destino, str) else destino:
+            if centro not in centros:
+                centros.append(centro)
+    return centros
+
+def enrutar_archivos(archivos, reglas):
+    """
+    Asigna cada archivo a sus centros.
+
+    Returns:
+        (destinos {archivo: [centros]}, archivos sin centro)
+    """
+    destinos = {}
+    sin_centro = []
+    for archivo in archivos:
+        centros = centros_de_archivo(os.path.join(DIRECTORIO_TRABAJO, archivo), reglas)
+        if centros:
+            destinos[archivo] = centros
+        else:
+            sin_centro.append(archivo)
+    return destinos, sin_centro
 
 def listar_archivos_dnl(directorio):
     """Lista archivos .DNL (insensible a mayúsculas) en el directorio indicado."""
@@ -114,7 +190,15 @@ def listar_archivos_dnl(directorio):
     ]
 
 # --- Flujo principal ---
-def main():
+def main(centro=None, enrutar=False):
+    """
+    Sube los .DNL del directorio de trabajo al FTP y archiva los confirmados.
+
+    Args:
+        centro: Centro de destino para todos los archivos (sin menú)
+        enrutar: Asignar cada archivo a sus centros con las reglas (sin menú)
+        Sin ninguno de los dos se muestra el menú de selección de centro.
+    """
     mostrar_estado("Iniciando el proceso de carga de RoadShow a SAP...")
 
     # 1) Preparación de directorios
@@ -128,55 +212,69 @@ def main():
         mostrar_estado(f"🚨 ERROR: No se pudo preparar el entorno. Detalles: {e}")
         return
 
-    # 2) Selección de centro (con recuerdo de última selección) si hay archivos a subir
+    # 2) Destino de cada archivo: reglas, centro indicado o menú (con recuerdo de última selección)
     archivos_a_subir = listar_archivos_dnl(DIRECTORIO_TRABAJO)
+    fallidos = []
+    sin_centro = []
+    trabajos = []
 
     if not archivos_a_subir:
         mostrar_estado("[Aviso]: No se encontraron archivos '.DNL' para subir. Se limpiará moviéndolos si aparecieron nuevos.")
     else:
-        ultimo_centro = leer_ultima_seleccion()
-        centro_elegido = seleccionar_centro(default_centro=ultimo_centro)
-        # Guardar inmediatamente la elección para próximas ejecuciones
-        guardar_ultima_seleccion(centro_elegido)
+        if enrutar:
+            try:
+                reglas = cargar_reglas_centros()
+            except (OSError, ValueError) as e:
+                mostrar_estado(f"🚨 ERROR: No se pudieron leer las reglas de centros. Detalles: {e}")
+                return
+            destinos, sin_centro = enrutar_archivos(archivos_a_subir, reglas)
+            if sin_centro:
+                mostrar_estado(f"[WARN] {len(sin_centro)} archivo(s) no cumplen ninguna regla y quedan sin subir: "
+                               f"{', '.join(sin_centro)}")
+        else:
+            if centro is None:
+                centro = seleccionar_centro(default_centro=leer_ultima_seleccion())
+            # Guardar inmediatamente la elección para próximas ejecuciones
+            guardar_ultima_seleccion(centro)
+            destinos = {archivo: [centro] for archivo in archivos_a_subir}
+
+        trabajos = [
+            (os.path.join(DIRECTORIO_TRABAJO, archivo), f"{FTP_BASE_REMOTO}/{c}")
+            for archivo, centros in destinos.items()
+            for c in centros
+        ]
+        archivos_a_subir = list(destinos)
 
-        ruta_remota = f"{FTP_BASE_REMOTO}/{centro_elegido}"
-        mostrar_estado(f"Conectando a {FTP_HOST} para subir {len(archivos_a_subir)} archivo(s) a '{ruta_remota}'...")
+    if trabajos:
+        carpetas = sorted({ruta_remota for _, ruta_remota in trabajos})
+        mostrar_estado(f"Conectando a {FTP_HOST} para subir {len(archivos_a_subir)} archivo(s) a "
+                       f"{len(carpetas)} carpeta(s) ({MAX_CONEXIONES} conexiones)...")
         user, password = obtener_credenciales()
 
-        try:
-            with ftplib.FTP(FTP_HOST, timeout=30) as ftp:
-                ftp.login(user, password)
-                mostrar_estado("[OK] Conexión y login exitosos.")
-
-                # Modo ASCII (como en tu script original). Para binario: ftp.voidcmd('TYPE I')
-                ftp.voidcmd('TYPE A')
-                # Asegurar y cambiar a directorio remoto
-                ensure_remote_path(ftp, ruta_remota)
-                mostrar_estado(f"Directorio remoto listo: {ruta_remota}")
-
-                # Subida de archivos
-                archivos_subidos_count = 0
-                for nombre_archivo in archivos_a_subir:
-                    mostrar_estado(f" Subiendo: {nombre_archivo}")
-                    with open(nombre_archivo, 'rb') as fp:
-                        ftp.storbinary(f'STOR {nombre_archivo}', fp)
-                        archivos_subidos_count += 1
-
-                mostrar_estado(f"[OK] Subida FTP completa. Total de archivos subidos: {archivos_subidos_count}")
-
-        except ftplib.all_errors as e:
-            mostrar_estado(f"ERROR FATAL: Falló la transferencia FTP. Detalle: {e}")
-            return
-        except RuntimeError as e:
-            mostrar_estado(f"ERROR: {e}")
-            return
+        # Subida en paralelo a todas las carpetas con las mismas conexiones;
+        # el diario evita reenviar lo ya subido a cada carpeta
+        with PoolFTP(resolver_host(FTP_HOST), user, password) as pool:
+            resultados = subir_archivos(pool, trabajos, RUTA_DIARIO, mostrar_estado)
+
+        # Un archivo está listo solo si llegó a todas sus carpetas
+        fallidos = sorted({os.path.basename(ruta) for (ruta, _), r in resultados.items() if r.startswith("ERROR")})
+        archivos_a_subir = [f for f in archivos_a_subir if f not in fallidos]
+
+        for carpeta in carpetas:
+            estados = [r for (_, ruta_remota), r in resultados.items() if ruta_remota == carpeta]
+            subidos = estados.count("subido")
+            omitidos = estados.count("omitido")
+            mostrar_estado(f"    {carpeta}: subidos {subidos}, ya enviados antes {omitidos}, "
+                           f"con error {len(estados) - subidos - omitidos}")
+        mostrar_estado(f"[OK] Subida FTP completa. Archivos confirmados: {len(archivos_a_subir)}, "
+                       f"con error: {len(fallidos)}")
 
     # 3) Mover archivos procesados
     mostrar_estado("Moviendo archivos '.DNL' procesados para archivarlos...")
     archivos_movidos = 0
     try:
-        # Re-listar para evitar mover si la subida no ocurrió
-        archivos_para_mover = listar_archivos_dnl(DIRECTORIO_TRABAJO)
+        # Solo se mueven los archivos verificados en el FTP (los que fallaron quedan para reintentar)
+        archivos_para_mover = archivos_a_subir
 
         for archivo in archivos_para_mover:
             origen = os.path.join(DIRECTORIO_TRABAJO, archivo)
@@ -195,7 +293,22 @@ def main():
         return
 
     # 4) Finalización
+    if fallidos:
+        mostrar_estado(f"ERROR: {len(fallidos)} archivo(s) no se pudieron subir y quedan para la próxima ejecución: "
+                       f"{', '.join(fallidos)}")
+        return
+    if sin_centro:
+        mostrar_estado(f"[WARN] Terminó el proceso RoadShow con {len(sin_centro)} archivo(s) sin centro asignado.")
+        return
     mostrar_estado("[OK] Terminó el proceso RoadShow. Todos los pasos completados con éxito.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Carga de archivos .DNL de RoadShow al FTP de SAP")
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument("--centro", choices=CENTROS,
+                       help="Subir todos los archivos a este centro sin mostrar el menú")
+    grupo.add_argument("--enrutar", action="store_true",
+                       help="Asignar cada archivo a sus centros según reglas_centros.json (o las reglas por defecto)")
+    args = parser.parse_args()
+
+    main(centro=args.centro, enrutar=args.enrutar)
\ No newline at end of file
@@ -1,6 +1,11 @@
 import pandas as pd
 import os
+import sys
 from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utilidades"))
+from escritura_excel import escribir_excel
 
 def extract_and_append_data(excel_file, sheet_name, output_file):
     print(f"Processing {sheet_name} from {excel_file}...")
@@ -36,7 +41,7 @@ def extract_and_append_data(excel_file, sheet_name, output_file):
         print(f"Datos leídos. {len(df)} filas añadidas.")
     
     try:
-        combined_df.to_excel(output_file, index=False)
+        escribir_excel(output_file, combined_df)
         print(f"Datos guardados en {output_file}.")
     except Exception as e:
         print(f"Error al guardar el archivo {output_file}: {e}")
@@ -79,7 +84,7 @@ def create_current_month_file(excel_file, sheet_name):
             combined_df = current_month_data
         
         try:
-            combined_df.to_excel(output_file, index=False)
+            escribir_excel(output_file, combined_df)
             print(f"Archivo mensual creado/actualizado: {output_file}")
         except Exception as e:
             print(f"Error al guardar el archivo {output_file}: {e}")
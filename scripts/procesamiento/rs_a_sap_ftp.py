@@ -1,13 +1,15 @@
 import os
-import ftplib
 import shutil
 from datetime import datetime
 import time
 
+from transferencia_ftp import PoolFTP, subir_archivos, ARCHIVO_DIARIO, MAX_CONEXIONES
+
 # --- Configuración ---
 # Directorios
 DIRECTORIO_TRABAJO = r"C:\SAP\CARGARS"
 DIRECTORIO_MOVIDOS = os.path.join(DIRECTORIO_TRABAJO, "Movidos")
+RUTA_DIARIO = os.path.join(DIRECTORIO_TRABAJO, ARCHIVO_DIARIO)
 
 # Configuración FTP (extraída de subeRS.ftp)
 FTP_HOST = "fifjumpftp-prd.cloud.fifco.com"
@@ -38,35 +40,28 @@ def main():
 
     # 2. Transferencia de archivos vía FTP
     archivos_a_subir = [f for f in os.listdir(DIRECTORIO_TRABAJO) if f.endswith(".DNL") and os.path.isfile(f)]
+    fallidos = []
     
     if not archivos_a_subir:
         mostrar_estado("ℹ️ Aviso: No se encontraron archivos '.dnl' para subir. Saltando paso FTP.")
     else:
-        mostrar_estado(f"Conectando a {FTP_HOST} para subir {len(archivos_a_subir)} archivo(s)...")
-        try:
-            # 1. Conexión y Login
-            with ftplib.FTP(FTP_HOST, timeout=30) as ftp:
-                ftp.login(FTP_USER, FTP_PASS)
-                mostrar_estado("✅ Conexión y login exitosos.")
-                
-                # 2. Configuración (ascii y cd)
-                ftp.voidcmd('TYPE A') # Equivalente a 'ascii'
-                ftp.cwd(FTP_RUTA_REMOTA) # Equivalente a 'cd RoadShow' y 'cd SnisSubeRS'
-                mostrar_estado(f"Cambiado a directorio remoto: {FTP_RUTA_REMOTA}")
-                
-                # 3. Subida de archivos (mput *.dnl)
-                archivos_subidos_count = 0
-                for nombre_archivo in archivos_a_subir:
-                    mostrar_estado(f"    - Subiendo: {nombre_archivo}")
-                    with open(nombre_archivo, 'rb') as fp:
-                        ftp.storbinary(f'STOR {nombre_archivo}', fp)
-                        archivos_subidos_count += 1
-                
-                mostrar_estado(f"✅ Subida FTP completa. Total de archivos subidos: {archivos_subidos_count}")
-
-        except ftplib.all_errors as e:
-            mostrar_estado(f"❌ ERROR FATAL: Falló la transferencia FTP. Detalle del error: {e}")
+        mostrar_estado(f"Conectando a {FTP_HOST} para subir {len(archivos_a_subir)} archivo(s) "
+                       f"a {FTP_RUTA_REMOTA} ({MAX_CONEXIONES} conexiones)...")
+        
+        # Subida en paralelo (mput *.dnl) con verificación y diario de lo ya enviado
+        trabajos = [(os.path.join(DIRECTORIO_TRABAJO, f), FTP_RUTA_REMOTA) for f in archivos_a_subir]
+        with PoolFTP(FTP_HOST, FTP_USER, FTP_PASS) as pool:
+            resultados = subir_archivos(pool, trabajos, RUTA_DIARIO, mostrar_estado)
+        
+        fallidos = [os.path.basename(ruta) for (ruta, _), r in resultados.items() if r.startswith("ERROR")]
+        if fallidos:
+            mostrar_estado(f"❌ ERROR: No se pudieron subir {len(fallidos)} archivo(s): {', '.join(fallidos)}")
+            mostrar_estado("Los archivos con error no se mueven y se reintentarán en la próxima ejecución.")
+        archivos_a_subir = [f for f in archivos_a_subir if f not in fallidos]
+        if not archivos_a_subir:
             return
+        
+        mostrar_estado(f"✅ Subida FTP completa. Total de archivos confirmados: {len(archivos_a_subir)}")
     
     # 3. Mover archivos procesados
     mostrar_estado("Moviendo archivos '.DNL' procesados para archivarlos...")
@@ -96,6 +91,9 @@ def main():
         return
 
     # 4. Finalización
+    if fallidos:
+        mostrar_estado(f"⚠️ Termino el proceso RoadShow con {len(fallidos)} archivo(s) pendientes de subir.")
+        return
     mostrar_estado("🎉 Termino el proceso RoadShow. Todos los pasos completados con éxito.")
 
 if __name__ == "__main__":
@@ -1,12 +1,55 @@
 """
 Script para extraer datos de múltiples fuentes ODBC, filtrar por mes actual y guardar en C:\data
+
+Las fuentes se extraen en paralelo (una conexión por fuente, cada una con su
+propio timeout) y cada resultado se escribe como una partición de un dataset
+parquet (Extraccion_Access_AAAAMM/Fuente_ODBC=RSxx/) a medida que termina.
+
+Las filas se leen por lotes (cursor.fetchmany) y cada lote se escribe como un
+row group del parquet, así que la memoria no depende del tamaño del mes. El
+CSV y el Excel (opcional, --excel) se escriben por lotes desde el dataset.
+
+Si una fuente supera su tiempo de espera se marca como fallida, pero su hilo
+no se puede interrumpir mientras el driver está bloqueado: sigue hasta que
+el driver corte la consulta (TIMEOUT_CONSULTA) y el proceso no termina antes.
+Ese hilo escribe en una carpeta de trabajo de la ejecución que se descarta,
+nunca en el dataset publicado, y se detiene en el siguiente lote.
+
+El filtro del mes es un rango semiabierto (fecha >= inicio AND fecha < fin)
+para que el motor pueda usar el índice de la columna. Con --incremental solo
+se piden las filas desde la marca de agua de cada fuente (la fecha máxima ya
+extraída) y se combinan con las filas anteriores de su partición.
+
+La variante de consulta que funcionó en cada fuente (nombre de tabla,
+corchetes) y sus columnas se guardan en un caché de descubrimiento, para no
+repetir en cada ejecución las variantes que fallan. Si la consulta guardada
+falla, se descarta y se vuelve a probar todas las variantes.
 """
 
-import pandas as pd
-import pyodbc
+import argparse
+import datetime as dt
+import decimal
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 from pathlib import Path
 from datetime import datetime
 
+try:
+    import pyodbc
+except ImportError:
+    pyodbc = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utilidades"))
+from escritura_excel import LibroExcel
+
 # ===== CONFIGURACIÓN =====
 # Lista de nombres de fuentes ODBC a conectar
 FUENTES_ODBC = ["RS01", "RS03", "RS04", "RS06", "RS07", "RS08", "RS10", "RS13", "RS14"]
@@ -32,15 +75,59 @@ CONSULTA_SQL = None  # Ejemplo: "SELECT * FROM Tabla WHERE Campo = 'Valor'"
 # COLUMNAS_SELECCIONADAS = ["Campo1", "Campo2", "Campo3"]
 COLUMNAS_SELECCIONADAS = None  # None = todas las columnas
 
+# ===== EXTRACCIÓN EN PARALELO =====
+# Fuentes extraídas a la vez (cada una con su propia conexión)
+MAX_HILOS_FUENTES = 4
+
+# Segundos para establecer la conexión y para ejecutar la consulta de cada fuente
+TIMEOUT_CONEXION = 30
+TIMEOUT_CONSULTA = 900
+
+# Columna de partición del dataset parquet
+COLUMNA_FUENTE = "Fuente_ODBC"
+
+# ===== LECTURA POR LOTES =====
+# Filas leídas por cada fetchmany (= filas por row group del parquet)
+TAMANO_LOTE = 50_000
+
+# ===== EXTRACCIÓN INCREMENTAL =====
+# Marca de agua por fuente (máximo de COLUMNA_FECHA extraído), guardada dentro del dataset
+ARCHIVO_MARCAS_AGUA = "_marcas_agua.json"
+
+# ===== CACHÉ DE DESCUBRIMIENTO =====
+# Variante de consulta validada y columnas de cada fuente
+ARCHIVO_DESCUBRIMIENTO = "descubrimiento_odbc.json"
+
+# Exportaciones además del dataset parquet
+EXPORTAR_CSV = True
+EXPORTAR_EXCEL = False  # Lento y limitado a 1.048.576 filas; activar con --excel
+
+# Tipo Arrow para cada tipo Python que reporta pyodbc en cursor.description
+TIPOS_ARROW = {
+    str: pa.string(),
+    int: pa.int64(),
+    float: pa.float64(),
+    bool: pa.bool_(),
+    dt.datetime: pa.timestamp('us'),
+    dt.date: pa.date32(),
+    dt.time: pa.time64('us'),
+    bytes: pa.binary(),
+    bytearray: pa.binary(),
+}
+
 def conectar_odbc(nombre_fuente):
     """
     Conecta a una fuente de datos ODBC por nombre
     """
+    if pyodbc is None:
+        raise ConnectionError("pyodbc no está instalado (pip install pyodbc)")
+    
     # String de conexión para ODBC DSN
     conn_str = f"DSN={nombre_fuente};"
     
     try:
-        conn = pyodbc.connect(conn_str)
+        conn = pyodbc.connect(conn_str, timeout=TIMEOUT_CONEXION)
+        conn.timeout = TIMEOUT_CONSULTA  # Timeout de cada consulta en esta conexión
         return conn
     except Exception as e:
         raise ConnectionError(f"No se pudo conectar a ODBC '{nombre_fuente}': {str(e)}")
@@ -68,21 +155,29 @@ def obtener_mes_actual():
         mes = ahora.month - 1
     return año, mes
 
+def rango_mes(año, mes):
+    """
+    Retorna el rango semiabierto [inicio, fin) del mes: el primer instante del
+    mes y el primer instante del mes siguiente
+    """
+    inicio = datetime(año, mes, 1)
+    fin = datetime(año + 1, 1, 1) if mes == 12 else datetime(año, mes + 1, 1)
+    return inicio, fin
 
-
-def construir_consulta(tabla_o_consulta, columna_fecha, año, mes, columnas=None):
+def construir_consulta(tabla_o_consulta, columna_fecha, columnas=None):
     """
-    Construye la consulta SQL con filtro por mes actual
+    Construye la consulta SQL con filtro por rango de fechas
+    (parámetros: inicio inclusivo, fin exclusivo)
     Prueba múltiples variaciones del nombre de tabla
     """
     # Si hay una consulta SQL personalizada, usarla
     if CONSULTA_SQL:
         # Agregar filtro de fecha a la consulta personalizada
         if "WHERE" in CONSULTA_SQL.upper():
-            filtro_fecha = f" AND YEAR({columna_fecha}) = {año} AND MONTH({columna_fecha}) = {mes}"
+            filtro_fecha = f" AND {columna_fecha} >= ? AND {columna_fecha} < ?"
             consulta = CONSULTA_SQL + filtro_fecha
         else:
-            filtro_fecha = f" WHERE YEAR({columna_fecha}) = {año} AND MONTH({columna_fecha}) = {mes}"
+            filtro_fecha = f" WHERE {columna_fecha} >= ? AND {columna_fecha} < ?"
             consulta = CONSULTA_SQL + filtro_fecha
         return consulta
     
@@ -111,8 +206,8 @@ def construir_consulta(tabla_o_consulta, columna_fecha, año, mes, columnas=None
     
     # Construir consultas con todas las variaciones
     consultas = {}
-    filtro1 = f" WHERE YEAR({columna_fecha}) = {año} AND MONTH({columna_fecha}) = {mes}"
-    filtro2 = f" WHERE YEAR([{columna_fecha}]) = {año} AND MONTH([{columna_fecha}]) = {mes}"
+    filtro1 = f" WHERE {columna_fecha} >= ? AND {columna_fecha} < ?"
+    filtro2 = f" WHERE [{columna_fecha}] >= ? AND [{columna_fecha}] < ?"
     
     if columnas:
         columnas_str = ", ".join(columnas)
@@ -153,9 +248,156 @@ def listar_tablas_disponibles(conn, fuente_nombre):
         print(f"  [ADVERTENCIA] {fuente_nombre}: No se pudieron listar las tablas: {str(e)}")
         return []
 
-def extraer_datos(conn, fuente_nombre, tabla_o_consulta, columna_fecha, año, mes, columnas=None):
+def inferir_esquema(descripcion, filas):
+    """
+    Define el esquema Arrow de la consulta una sola vez por fuente: con el tipo
+    que reporta el driver (cursor.description) o, si el driver no lo informa,
+    con los valores del primer lote.
+    """
+    campos = []
+    for i, columna in enumerate(descripcion):
+        nombre, tipo_driver = columna[0], columna[1]
+        precision, escala = (columna[4], columna[5]) if len(columna) > 5 else (None, None)
+        
+        if tipo_driver is decimal.Decimal and precision and precision <= 38:
+            tipo = pa.decimal128(precision, escala or 0)
+        elif tipo_driver in TIPOS_ARROW:
+            tipo = TIPOS_ARROW[tipo_driver]
+        else:
+            tipo = pa.array([fila[i] for fila in filas]).type
+            if pa.types.is_null(tipo):
+                tipo = pa.string()
+        campos.append(pa.field(nombre, tipo))
+    return pa.schema(campos)
+
+def lote_a_arrow(filas, esquema):
+    """Convierte un lote de filas del cursor a un RecordBatch con el esquema de la fuente"""
+    columnas = list(zip(*filas))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, esquema)],
+        schema=esquema
+    )
+
+def cargar_descubrimiento(ruta):
+    """Carga el caché de descubrimiento (vacío si no existe o está dañado)"""
+    if ruta is None:
+        return {}
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def guardar_descubrimiento(ruta, descubrimiento):
+    """Guarda el caché de descubrimiento de forma atómica"""
+    if ruta is None:
+        return
+    ruta = Path(ruta)
+    ruta_temporal = ruta.with_name(f".{ruta.name}.tmp")
+    with open(ruta_temporal, 'w', encoding='utf-8') as f:
+        json.dump(descubrimiento, f, indent=2, ensure_ascii=False)
+    os.replace(ruta_temporal, ruta)
+
+def _entrada_vigente(entrada, tabla_o_consulta, columna_fecha, columnas):
+    """Indica si una entrada del caché corresponde a la configuración actual"""
+    return (entrada is not None
+            and entrada.get('tabla') == tabla_o_consulta
+            and entrada.get('columna_fecha') == columna_fecha
+            and entrada.get('columnas_seleccionadas') == columnas)
+
+def ejecutar_consulta(conn, tabla_o_consulta, columna_fecha, desde, hasta, columnas=None,
+                      fuente_nombre=None, descubrimiento=None):
+    """
+    Ejecuta la consulta del rango [desde, hasta) (probando las variantes del
+    nombre de tabla) y retorna el cursor listo para leer
+    
+    Si descubrimiento (dict del caché) tiene una consulta validada para la
+    fuente, se ejecuta directamente; si falla, se descarta y se prueban todas
+    las variantes. La variante que funciona queda guardada en el caché.
+    """
+    parametros = (desde, hasta)
+    cursor = conn.cursor()
+    
+    # Si CONSULTA_SQL está definida, usar directamente (es un string)
+    if CONSULTA_SQL:
+        cursor.execute(construir_consulta(tabla_o_consulta, columna_fecha, columnas), parametros)
+        return cursor
+    
+    if descubrimiento is None:
+        descubrimiento = {}
+    
+    entrada = descubrimiento.get(fuente_nombre)
+    if _entrada_vigente(entrada, tabla_o_consulta, columna_fecha, columnas):
+        try:
+            cursor.execute(entrada['consulta'], parametros)
+            print(f"     [CACHE] Consulta validada: {entrada['formato']}")
+            return cursor
+        except Exception as e:
+            print(f"     [CACHE] La consulta guardada falló ({e}), probando variantes...")
+            cursor = conn.cursor()
+    descubrimiento.pop(fuente_nombre, None)
+    
+    # Construir consulta con la tabla ajustada
+    resultado_consulta = construir_consulta(tabla_o_consulta, columna_fecha, columnas)
+    
+    # Probar diferentes formatos en orden de preferencia
+    # Orden: primero sin corchetes, luego con corchetes
+    formatos_ordenados = sorted([k for k in resultado_consulta.keys()], 
+                               key=lambda x: ('con_corchetes' not in x, x))
+    
+    ultimo_error = None
+    for formato in formatos_ordenados:
+        try:
+            cursor.execute(resultado_consulta[formato], parametros)
+            print(f"     [OK] Consulta exitosa con formato: {formato}")
+            descubrimiento[fuente_nombre] = {
+                'tabla': tabla_o_consulta,
+                'columna_fecha': columna_fecha,
+                'columnas_seleccionadas': columnas,
+                'formato': formato,
+                'consulta': resultado_consulta[formato],
+                'columnas': [columna[0] for columna in cursor.description],
+                'fecha_validacion': datetime.now().isoformat(),
+            }
+            return cursor
+        except Exception as e_intento:
+            ultimo_error = e_intento
+            continue
+    
+    raise ultimo_error if ultimo_error else Exception("No se pudo ejecutar ninguna variante de la consulta")
+
+def _lotes_anteriores(ruta_anterior, columna_fecha, marca_agua, tamaño_lote):
+    """Lotes de la partición anterior con fecha menor a la marca de agua"""
+    for lote in pq.ParquetFile(ruta_anterior).iter_batches(batch_size=tamaño_lote):
+        fechas = lote.column(columna_fecha)
+        yield lote.filter(pc.less(fechas, pa.scalar(marca_agua, type=fechas.type)))
+
+def _maximo(lote, columna_fecha, maximo_actual):
+    """Actualiza el máximo de la columna de fecha con un lote"""
+    if columna_fecha not in lote.schema.names:
+        return maximo_actual
+    maximo_lote = pc.max(lote.column(columna_fecha)).as_py()
+    if maximo_lote is None:
+        return maximo_actual
+    return maximo_lote if maximo_actual is None else max(maximo_actual, maximo_lote)
+
+def extraer_datos(conn, fuente_nombre, tabla_o_consulta, columna_fecha, año, mes, ruta_parquet,
+                  columnas=None, tamaño_lote=TAMANO_LOTE, base=None, descubrimiento=None, cancelado=None):
     """
-    Extrae datos de una fuente ODBC filtrando por mes actual
+    Extrae datos de una fuente ODBC filtrando por mes actual y los escribe por
+    lotes en ruta_parquet (un row group por lote)
+    
+    Args:
+        base: (ruta_parquet_anterior, marca_agua) para extracción incremental:
+            se conservan las filas anteriores con fecha < marca_agua y solo se
+            piden a la fuente las filas desde la marca de agua
+        descubrimiento: Caché de descubrimiento (se actualiza con la variante que funcione)
+        cancelado: threading.Event; si se activa, la lectura se abandona en el
+            siguiente lote (no interrumpe un fetchmany bloqueado en el driver)
+    
+    Returns:
+        (filas escritas, fecha máxima escrita). 0 filas si no hubo datos, la
+        consulta falló o la extracción se canceló
     """
     print(f"\n  [EXTRAYENDO] {fuente_nombre}:")
     
@@ -163,51 +405,80 @@ def extraer_datos(conn, fuente_nombre, tabla_o_consulta, columna_fecha, año, me
     # No necesita ajuste según la fuente, todas usan el mismo nombre
     tabla_ajustada = tabla_o_consulta
     
+    desde, hasta = rango_mes(año, mes)
+    if base is not None:
+        ruta_anterior, desde = base
+    
     print(f"     Tabla: {tabla_ajustada} (Fuente ODBC: {fuente_nombre})")
-    print(f"     Filtro: Mes {mes:02d}/{año}")
+    print(f"     Filtro: Mes {mes:02d}/{año}" + (f" desde {desde} (incremental)" if base is not None else ""))
+    
+    ruta_parquet = Path(ruta_parquet)
+    ruta_temporal = ruta_parquet.with_name(f".{ruta_parquet.name}.tmp")
+    escritor = None
+    esquema = None
+    total_filas = 0
+    filas_nuevas = 0
+    maximo = None
     
     try:
-        # Construir consulta con la tabla ajustada
-        resultado_consulta = construir_consulta(tabla_ajustada, columna_fecha, año, mes, columnas)
+        cursor = ejecutar_consulta(conn, tabla_ajustada, columna_fecha, desde, hasta, columnas,
+                                   fuente_nombre, descubrimiento)
         
-        # Si CONSULTA_SQL está definida, usar directamente (es un string)
-        if CONSULTA_SQL:
-            consulta = resultado_consulta
-            df = pd.read_sql(consulta, conn)
-        else:
-            # Probar diferentes formatos en orden de preferencia
-            # Orden: primero sin corchetes, luego con corchetes
-            formatos_ordenados = sorted([k for k in resultado_consulta.keys()], 
-                                       key=lambda x: ('con_corchetes' not in x, x))
-            
-            df = None
-            ultimo_error = None
-            consulta_exitosa = None
+        # Avisar si la fuente cambió de columnas desde la última validación
+        columnas_actuales = [columna[0] for columna in cursor.description]
+        columnas_anteriores = (descubrimiento or {}).get(fuente_nombre, {}).get('columnas')
+        if columnas_anteriores is not None and columnas_anteriores != columnas_actuales:
+            print(f"     [INFO] Las columnas de {fuente_nombre} cambiaron desde la última extracción")
+            descubrimiento[fuente_nombre]['columnas'] = columnas_actuales
+        ruta_parquet.parent.mkdir(parents=True, exist_ok=True)
+        
+        try:
+            # Incremental: primero las filas ya extraídas antes de la marca de agua
+            if base is not None:
+                esquema = pq.read_schema(ruta_anterior)
+                escritor = pq.ParquetWriter(ruta_temporal, esquema)
+                for lote in _lotes_anteriores(ruta_anterior, columna_fecha, desde, tamaño_lote):
+                    if lote.num_rows:
+                        escritor.write_batch(lote, row_group_size=tamaño_lote)
+                        total_filas += lote.num_rows
+                        maximo = _maximo(lote, columna_fecha, maximo)
             
-            for formato in formatos_ordenados:
-                try:
-                    consulta = resultado_consulta[formato]
-                    df = pd.read_sql(consulta, conn)
-                    consulta_exitosa = formato
-                    print(f"     [OK] Consulta exitosa con formato: {formato}")
+            while True:
+                filas = cursor.fetchmany(tamaño_lote)
+                if not filas:
                     break
-                except Exception as e_intento:
-                    ultimo_error = e_intento
-                    continue
-            
-            if df is None:
-                raise ultimo_error if ultimo_error else Exception("No se pudo ejecutar ninguna variante de la consulta")
+                if cancelado is not None and cancelado.is_set():
+                    raise TimeoutError(f"Extracción de {fuente_nombre} cancelada por tiempo de espera")
+                if escritor is None:
+                    esquema = inferir_esquema(cursor.description, filas)
+                    escritor = pq.ParquetWriter(ruta_temporal, esquema)
+                lote = lote_a_arrow(filas, esquema)
+                escritor.write_batch(lote, row_group_size=tamaño_lote)
+                total_filas += len(filas)
+                filas_nuevas += len(filas)
+                maximo = _maximo(lote, columna_fecha, maximo)
+        finally:
+            if escritor is not None:
+                escritor.close()
         
-        # Agregar columna con el nombre de la fuente
-        df['Fuente_ODBC'] = fuente_nombre
+        if escritor is not None:
+            ruta_temporal.replace(ruta_parquet)
         
-        print(f"     [OK] {len(df)} filas extraídas")
+        if base is not None:
+            print(f"     [OK] {filas_nuevas} filas nuevas, {total_filas} filas en total")
+        else:
+            print(f"     [OK] {total_filas} filas extraídas")
         
-        return df
+        return total_filas, maximo
         
     except Exception as e:
+        if ruta_temporal.exists():
+            ruta_temporal.unlink()
+        
         error_msg = str(e)
         print(f"     [ERROR] {error_msg}")
+        if cancelado is not None and cancelado.is_set():
+            return 0, None
         
         # Intentar listar tablas disponibles para ayudar al diagnóstico
         try:
@@ -226,12 +497,246 @@ def extraer_datos(conn, fuente_nombre, tabla_o_consulta, columna_fecha, año, me
         except:
             pass
         
-        # Retornar DataFrame vacío en lugar de fallar completamente
-        return pd.DataFrame()
+        # Retornar 0 filas en lugar de fallar completamente
+        return 0, None
+
+def ruta_particion(carpeta_dataset, fuente):
+    """Archivo parquet de la partición Fuente_ODBC=<fuente> del dataset"""
+    return Path(carpeta_dataset) / f"{COLUMNA_FUENTE}={fuente}" / "datos.parquet"
+
+def cargar_marcas_agua(carpeta_dataset):
+    """
+    Carga la marca de agua de cada fuente guardada en el dataset
+    (valores con el mismo tipo que la columna de fecha)
+    """
+    try:
+        with open(Path(carpeta_dataset) / ARCHIVO_MARCAS_AGUA, 'r', encoding='utf-8') as f:
+            guardadas = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    
+    marcas = {}
+    for fuente, marca in guardadas.items():
+        if marca['tipo'] == 'datetime':
+            marcas[fuente] = datetime.fromisoformat(marca['valor'])
+        elif marca['tipo'] == 'date':
+            marcas[fuente] = dt.date.fromisoformat(marca['valor'])
+        else:
+            marcas[fuente] = marca['valor']
+    return marcas
+
+def guardar_marcas_agua(carpeta_dataset, marcas):
+    """Guarda la marca de agua de cada fuente en el dataset"""
+    guardadas = {}
+    for fuente, valor in marcas.items():
+        if isinstance(valor, datetime):
+            guardadas[fuente] = {'tipo': 'datetime', 'valor': valor.isoformat()}
+        elif isinstance(valor, dt.date):
+            guardadas[fuente] = {'tipo': 'date', 'valor': valor.isoformat()}
+        else:
+            guardadas[fuente] = {'tipo': 'texto', 'valor': str(valor)}
+    
+    ruta = Path(carpeta_dataset) / ARCHIVO_MARCAS_AGUA
+    ruta_temporal = ruta.with_name(f".{ruta.name}.tmp")
+    with open(ruta_temporal, 'w', encoding='utf-8') as f:
+        json.dump(guardadas, f, indent=2, ensure_ascii=False)
+    os.replace(ruta_temporal, ruta)
+
+def extraer_fuente(fuente, año, mes, carpeta_dataset, conectar=conectar_odbc, tamaño_lote=TAMANO_LOTE, base=None,
+                   descubrimiento=None, cancelado=None):
+    """
+    Conecta a una fuente, escribe sus datos en su partición del dataset y
+    cierra la conexión. Se ejecuta en un hilo por fuente.
+    
+    Returns:
+        (filas escritas, fecha máxima escrita). 0 filas si no se extrajo nada
+    """
+    print(f"\n[CONECTANDO] {fuente}...")
+    conn = conectar(fuente)
+    try:
+        print(f"  [OK] Conectado a {fuente}")
+        
+        # Listar tablas (solo para la primera fuente, como referencia, si aún no está validada)
+        if fuente == FUENTES_ODBC[0] and fuente not in (descubrimiento or {}):
+            print("\n  Tablas disponibles (solo primera fuente como referencia):")
+            listar_tablas_disponibles(conn, fuente)
+        
+        return extraer_datos(
+            conn,
+            fuente,
+            TABLA_O_CONSULTA,
+            COLUMNA_FECHA,
+            año,
+            mes,
+            ruta_particion(carpeta_dataset, fuente),
+            COLUMNAS_SELECCIONADAS,
+            tamaño_lote,
+            base,
+            descubrimiento,
+            cancelado
+        )
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+def esquema_dataset(carpeta_dataset):
+    """
+    Esquema común de todas las particiones del dataset (más la columna
+    Fuente_ODBC). Las columnas se alinean por nombre: las que solo existen en
+    algunas fuentes se conservan y los tipos distintos se promueven.
+    """
+    esquemas = [pq.read_schema(archivo)
+                for archivo in sorted(Path(carpeta_dataset).glob(f"{COLUMNA_FUENTE}=*/*.parquet"))]
+    esquemas.append(pa.schema([(COLUMNA_FUENTE, pa.string())]))
+    return pa.unify_schemas(esquemas, promote_options='permissive')
+
+def iterar_lotes_dataset(carpeta_dataset, tamaño_lote=TAMANO_LOTE):
+    """
+    Recorre el dataset parquet por lotes (DataFrames con la columna Fuente_ODBC)
+    sin cargarlo completo en memoria. Todos los lotes tienen las mismas
+    columnas, en el mismo orden y con el mismo tipo (esquema_dataset), aunque
+    las fuentes devuelvan columnas distintas o en otro orden.
+    """
+    esquema = esquema_dataset(carpeta_dataset)
+    for carpeta_particion in sorted(Path(carpeta_dataset).glob(f"{COLUMNA_FUENTE}=*")):
+        fuente = carpeta_particion.name.split("=", 1)[1]
+        for archivo in sorted(carpeta_particion.glob("*.parquet")):
+            for lote in pq.ParquetFile(archivo).iter_batches(batch_size=tamaño_lote):
+                columnas = []
+                for campo in esquema:
+                    if campo.name == COLUMNA_FUENTE:
+                        columnas.append(pa.array([fuente] * lote.num_rows, type=campo.type))
+                    elif campo.name in lote.schema.names:
+                        columnas.append(lote.column(campo.name).cast(campo.type))
+                    else:
+                        columnas.append(pa.nulls(lote.num_rows, type=campo.type))
+                yield pa.Table.from_arrays(columnas, schema=esquema).to_pandas()
+
+def extraer_fuentes(fuentes, año, mes, carpeta_dataset, conectar=conectar_odbc, max_hilos=MAX_HILOS_FUENTES,
+                    tamaño_lote=TAMANO_LOTE, incremental=False, ruta_descubrimiento=None):
+    """
+    Extrae todas las fuentes en paralelo; cada una escribe por lotes su
+    partición del dataset parquet (sin concatenar en memoria).
+    
+    En modo incremental, cada fuente con partición y marca de agua previas
+    solo pide las filas desde su marca de agua; si una fuente falla, se
+    conserva su partición anterior.
+    
+    Cada hilo escribe en una carpeta de trabajo propia de esta ejecución y su
+    partición se mueve al dataset nuevo solo cuando termina bien. Una fuente
+    que agota el tiempo de espera sigue corriendo hasta el timeout del driver
+    (el proceso no puede terminar antes), pero lo que escriba se descarta.
+    
+    Args:
+        fuentes: Lista de nombres DSN
+        año, mes: Período a extraer
+        carpeta_dataset: Carpeta del dataset parquet (se reemplaza completa)
+        conectar: Función que abre la conexión de una fuente (por defecto ODBC)
+        max_hilos: Fuentes extraídas a la vez
+        tamaño_lote: Filas por fetchmany / row group
+        incremental: Extraer solo desde la marca de agua de cada fuente
+        ruta_descubrimiento: Archivo del caché de descubrimiento (None = sin caché)
+    
+    Returns:
+        (filas_por_fuente, fuentes_fallidas)
+    """
+    carpeta_dataset = Path(carpeta_dataset)
+    carpeta_temporal = carpeta_dataset.with_name(f".{carpeta_dataset.name}.tmp")
+    if carpeta_temporal.exists():
+        shutil.rmtree(carpeta_temporal)
+    carpeta_temporal.mkdir(parents=True)
+    
+    # Carpetas de trabajo de ejecuciones anteriores que no alcanzaron a limpiarse
+    for carpeta_vieja in carpeta_dataset.parent.glob(f".{carpeta_dataset.name}.*.trabajo"):
+        shutil.rmtree(carpeta_vieja, ignore_errors=True)
+    carpeta_trabajo = Path(tempfile.mkdtemp(prefix=f".{carpeta_dataset.name}.", suffix=".trabajo",
+                                            dir=carpeta_dataset.parent))
+    cancelado = threading.Event()
+    
+    filas_por_fuente = {}
+    fuentes_fallidas = []
+    
+    # Base de cada fuente para el modo incremental: (partición anterior, marca de agua)
+    marcas_anteriores = cargar_marcas_agua(carpeta_dataset) if incremental else {}
+    bases = {
+        fuente: (ruta_particion(carpeta_dataset, fuente), marcas_anteriores[fuente])
+        for fuente in fuentes
+        if fuente in marcas_anteriores and ruta_particion(carpeta_dataset, fuente).exists()
+    }
+    marcas = {}
+    
+    # Cada hilo actualiza solo la entrada de su fuente
+    descubrimiento = cargar_descubrimiento(ruta_descubrimiento)
+    
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_hilos, len(fuentes))))
+    futuros = {
+        executor.submit(extraer_fuente, fuente, año, mes, carpeta_trabajo, conectar, tamaño_lote,
+                        bases.get(fuente), descubrimiento, cancelado): fuente
+        for fuente in fuentes
+    }
+    try:
+        # Ninguna fuente debería tardar más que su conexión + su consulta
+        tandas = -(-len(fuentes) // max(1, min(max_hilos, len(fuentes))))
+        for futuro in as_completed(futuros, timeout=tandas * (TIMEOUT_CONEXION + TIMEOUT_CONSULTA)):
+            fuente = futuros[futuro]
+            try:
+                filas, marcas[fuente] = futuro.result()
+            except Exception as e:
+                fuentes_fallidas.append(fuente)
+                print(f"  [ERROR] {fuente}: Error - {str(e)}")
+                continue
+            
+            if not filas:
+                fuentes_fallidas.append(fuente)
+                print(f"  [ADVERTENCIA] {fuente}: No se extrajeron datos")
+                continue
+            
+            ruta_nueva = ruta_particion(carpeta_temporal, fuente)
+            ruta_nueva.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(ruta_particion(carpeta_trabajo, fuente), ruta_nueva)
+            filas_por_fuente[fuente] = filas
+            print(f"  [OK] {fuente}: {filas} filas escritas en el dataset")
+    except FuturesTimeoutError:
+        # Los hilos bloqueados en el driver no se pueden detener: se les pide
+        # parar en el siguiente lote y su carpeta de trabajo se descarta
+        cancelado.set()
+        for futuro, fuente in futuros.items():
+            if fuente not in filas_por_fuente and fuente not in fuentes_fallidas:
+                futuro.cancel()
+                futuro.add_done_callback(lambda _: shutil.rmtree(carpeta_trabajo, ignore_errors=True))
+                fuentes_fallidas.append(fuente)
+                print(f"  [ERROR] {fuente}: Tiempo de espera agotado "
+                      f"(el hilo termina cuando el driver corte la consulta, hasta {TIMEOUT_CONSULTA}s)")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        shutil.rmtree(carpeta_trabajo, ignore_errors=True)
+    
+    # Incremental: las fuentes que fallaron conservan su partición y marca anteriores
+    for fuente in fuentes_fallidas:
+        if fuente in bases:
+            ruta_anterior, marca_anterior = bases[fuente]
+            ruta_nueva = ruta_particion(carpeta_temporal, fuente)
+            ruta_nueva.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(ruta_anterior, ruta_nueva)
+            marcas[fuente] = marca_anterior
+            print(f"  [ADVERTENCIA] {fuente}: Se conserva la partición anterior (hasta {marca_anterior})")
+    
+    # Las entradas cuya consulta falló ya se descartaron en ejecutar_consulta
+    guardar_descubrimiento(ruta_descubrimiento, dict(descubrimiento))
+    guardar_marcas_agua(carpeta_temporal, {fuente: marca for fuente, marca in marcas.items() if marca is not None})
+    
+    # Reemplazar el dataset anterior solo cuando la extracción terminó
+    if carpeta_dataset.exists():
+        shutil.rmtree(carpeta_dataset)
+    carpeta_temporal.rename(carpeta_dataset)
+    
+    return filas_por_fuente, fuentes_fallidas
 
-def guardar_resultado(df, año, mes):
+def guardar_resultado(carpeta_dataset, año, mes, exportar_csv=EXPORTAR_CSV, exportar_excel=EXPORTAR_EXCEL):
     """
-    Guarda el resultado en C:\data
+    Exporta el dataset parquet a CSV (por lotes) y opcionalmente a Excel en C:\data
     """
     print("\n" + "=" * 60)
     print("GUARDANDO RESULTADO")
@@ -244,35 +749,39 @@ def guardar_resultado(df, año, mes):
     except Exception as e:
         raise ValueError(f"No se pudo crear la carpeta C:\\data: {str(e)}")
     
-    # Nombre del archivo con fecha
-    fecha_hora = datetime.now().strftime("%Y%m%d_%H%M%S")
-    nombre_archivo = f"Extraccion_Access_{año}{mes:02d}.xlsx"
-    archivo_salida = CARPETA_SALIDA / nombre_archivo
+    nombre_archivo = f"Extraccion_Access_{año}{mes:02d}"
+    archivo_salida = Path(carpeta_dataset)
     
     try:
-        # Guardar en Excel
-        with pd.ExcelWriter(archivo_salida, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Datos', index=False)
+        if exportar_csv:
+            archivo_csv = CARPETA_SALIDA / f"{nombre_archivo}.csv"
+            total_filas = 0
+            with open(archivo_csv, 'w', encoding='utf-8-sig', newline='') as f:
+                for df in iterar_lotes_dataset(carpeta_dataset):
+                    df.to_csv(f, index=False, header=(total_filas == 0))
+                    total_filas += len(df)
+            print(f"  [OK] Archivo CSV guardado: {archivo_csv} ({total_filas} filas)")
+            archivo_salida = archivo_csv
         
-        print(f"  [OK] Archivo guardado: {archivo_salida}")
-        print(f"  [OK] Total de filas: {len(df)}")
-        print(f"  [OK] Total de columnas: {len(df.columns)}")
-        
-        # También guardar en CSV
-        archivo_csv = CARPETA_SALIDA / nombre_archivo.replace('.xlsx', '.csv')
-        df.to_csv(archivo_csv, index=False, encoding='utf-8-sig')
-        print(f"  [OK] Archivo CSV guardado: {archivo_csv}")
+        if exportar_excel:
+            # Fila por fila (xlsxwriter constant_memory): el dataset no se carga completo
+            archivo_excel = CARPETA_SALIDA / f"{nombre_archivo}.xlsx"
+            with LibroExcel(archivo_excel) as libro:
+                total_filas = libro.escribir_hoja('Datos', iterar_lotes_dataset(carpeta_dataset))
+            
+            print(f"  [OK] Archivo guardado: {archivo_excel}")
+            print(f"  [OK] Total de filas: {total_filas}")
+            archivo_salida = archivo_excel
         
         return archivo_salida
         
     except Exception as e:
         raise ValueError(f"Error guardando archivo: {str(e)}")
 
-def main():
+def main(exportar_csv=EXPORTAR_CSV, exportar_excel=EXPORTAR_EXCEL, tamaño_lote=TAMANO_LOTE, incremental=False):
     """
     Función principal
     """
-    conexiones = []
     try:
         # Obtener mes actual
         año, mes = obtener_mes_actual()
@@ -282,66 +791,35 @@ def main():
         print(f"Filtro: Mes actual = {mes:02d}/{año}")
         print(f"Fuentes ODBC: {', '.join(FUENTES_ODBC)}")
         print(f"Tabla/Consulta: {TABLA_O_CONSULTA}")
-        print(f"Columna de fecha: {COLUMNA_FECHA}\n")
-        
-        # Lista para almacenar todos los DataFrames
-        dataframes = []
-        fuentes_exitosas = []
-        fuentes_fallidas = []
+        print(f"Columna de fecha: {COLUMNA_FECHA}")
+        print(f"Fuentes en paralelo: {MAX_HILOS_FUENTES}")
+        print(f"Filas por lote: {tamaño_lote}")
+        print(f"Modo: {'incremental (desde la marca de agua)' if incremental else 'completo'}\n")
         
         # Conectar y extraer de cada fuente ODBC
         print("=" * 60)
         print("CONECTANDO Y EXTRAYENDO DATOS")
         print("=" * 60)
         
-        for fuente in FUENTES_ODBC:
-            conn = None
-            try:
-                # Conectar
-                print(f"\n[CONECTANDO] {fuente}...")
-                conn = conectar_odbc(fuente)
-                conexiones.append((fuente, conn))
-                print(f"  [OK] Conectado a {fuente}")
-                
-                # Listar tablas (solo para la primera fuente, como referencia)
-                if fuente == FUENTES_ODBC[0]:
-                    print("\n  Tablas disponibles (solo primera fuente como referencia):")
-                    listar_tablas_disponibles(conn, fuente)
-                
-                # Extraer datos
-                df = extraer_datos(
-                    conn,
-                    fuente,
-                    TABLA_O_CONSULTA,
-                    COLUMNA_FECHA,
-                    año,
-                    mes,
-                    COLUMNAS_SELECCIONADAS
-                )
-                
-                if not df.empty:
-                    dataframes.append(df)
-                    fuentes_exitosas.append(fuente)
-                else:
-                    fuentes_fallidas.append(fuente)
-                    print(f"  [ADVERTENCIA] {fuente}: No se extrajeron datos")
-                    
-            except Exception as e:
-                fuentes_fallidas.append(fuente)
-                print(f"  [ERROR] {fuente}: Error - {str(e)}")
-                # Continuar con la siguiente fuente
-                continue
+        CARPETA_SALIDA.mkdir(parents=True, exist_ok=True)
+        carpeta_dataset = CARPETA_SALIDA / f"Extraccion_Access_{año}{mes:02d}"
+        filas_por_fuente, fuentes_fallidas = extraer_fuentes(
+            FUENTES_ODBC, año, mes, carpeta_dataset, tamaño_lote=tamaño_lote, incremental=incremental,
+            ruta_descubrimiento=CARPETA_SALIDA / ARCHIVO_DESCUBRIMIENTO
+        )
         
-        # Combinar todos los DataFrames
+        # Combinar todos los resultados
         print("\n" + "=" * 60)
         print("COMBINANDO RESULTADOS")
         print("=" * 60)
         
-        if not dataframes:
+        if not filas_por_fuente:
             raise ValueError("No se pudo extraer datos de ninguna fuente ODBC")
         
-        df_final = pd.concat(dataframes, ignore_index=True)
+        fuentes_exitosas = [fuente for fuente in FUENTES_ODBC if fuente in filas_por_fuente]
+        fuentes_fallidas = [fuente for fuente in FUENTES_ODBC if fuente in fuentes_fallidas]
         
+        print(f"  [OK] Dataset parquet: {carpeta_dataset}")
         print(f"  [OK] Total de fuentes exitosas: {len(fuentes_exitosas)}")
         print(f"    {', '.join(fuentes_exitosas)}")
         
@@ -349,24 +827,22 @@ def main():
             print(f"  [ADVERTENCIA] Fuentes con problemas: {len(fuentes_fallidas)}")
             print(f"    {', '.join(fuentes_fallidas)}")
         
-        print(f"\n  [OK] Total de filas combinadas: {len(df_final)}")
-        print(f"  [OK] Total de columnas: {len(df_final.columns)}")
+        total_filas = sum(filas_por_fuente.values())
+        print(f"\n  [OK] Total de filas combinadas: {total_filas}")
         
         # Resumen por fuente
-        if 'Fuente_ODBC' in df_final.columns:
-            print("\n  Resumen por fuente:")
-            resumen = df_final['Fuente_ODBC'].value_counts().sort_index()
-            for fuente, cantidad in resumen.items():
-                print(f"    {fuente}: {cantidad} filas")
+        print("\n  Resumen por fuente:")
+        for fuente in fuentes_exitosas:
+            print(f"    {fuente}: {filas_por_fuente[fuente]} filas")
         
         # Guardar resultado
-        archivo = guardar_resultado(df_final, año, mes)
+        archivo = guardar_resultado(carpeta_dataset, año, mes, exportar_csv, exportar_excel)
         
         print("\n" + "=" * 60)
         print("PROCESO COMPLETADO EXITOSAMENTE")
         print("=" * 60)
         print(f"Archivo guardado en: {archivo}")
-        print(f"Total de registros: {len(df_final)}")
+        print(f"Total de registros: {total_filas}")
         print(f"Fuentes procesadas: {len(fuentes_exitosas)}/{len(FUENTES_ODBC)}")
         
         return 0
@@ -379,18 +855,17 @@ def main():
         import traceback
         traceback.print_exc()
         return 1
-        
-    finally:
-        # Cerrar todas las conexiones
-        for fuente, conn in conexiones:
-            try:
-                conn.close()
-            except:
-                pass
-        if conexiones:
-            print("\n  [OK] Todas las conexiones cerradas")
 
 if __name__ == "__main__":
-    exit(main())
+    parser = argparse.ArgumentParser(description="Extrae el mes de las fuentes ODBC de RoadShow a parquet")
+    parser.add_argument("--excel", action="store_true", help="Exportar también a Excel")
+    parser.add_argument("--sin-csv", action="store_true", help="No exportar a CSV (solo dataset parquet)")
+    parser.add_argument("--tamano-lote", type=int, default=TAMANO_LOTE, help="Filas por lote de lectura")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Extraer solo las filas nuevas desde la última extracción del mes")
+    args = parser.parse_args()
+    
+    exit(main(exportar_csv=not args.sin_csv, exportar_excel=EXPORTAR_EXCEL or args.excel,
+              tamaño_lote=args.tamano_lote, incremental=args.incremental))
 
 
@@ -0,0 +1,321 @@
+"""
+Motor de transferencia FTP para las cargas de RoadShow
+
+- Pool pequeño de conexiones reutilizables: varios archivos se suben a la vez
+- Cada archivo se sube como <nombre>.part y se renombra al nombre final solo
+  después de verificar el tamaño (y el MD5 si el servidor soporta XMD5), así
+  SAP nunca toma un archivo a medias
+- Si una subida se corta, el reintento continúa desde lo ya subido (REST)
+- Un diario de transferencias registra cada archivo enviado (destino + SHA-256)
+  para que al volver a ejecutar solo se envíe lo que falta
+
+Nota: ftplib.storbinary siempre pasa a TYPE I (binario), por lo que el
+'TYPE A' de los scripts originales no tenía efecto; el tamaño remoto se
+compara en binario.
+"""
+
+import ftplib
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+# Conexiones FTP simultáneas (= archivos subidos a la vez)
+MAX_CONEXIONES = 4
+TIMEOUT_FTP = 30
+
+# Reintentos por archivo (cada reintento continúa desde lo ya subido)
+MAX_REINTENTOS = 3
+ESPERA_BASE_REINTENTO = 2.0
+
+SUFIJO_PARCIAL = ".part"
+TAMANO_BLOQUE = 64 * 1024
+
+# Diario de transferencias (en el directorio de trabajo)
+ARCHIVO_DIARIO = "diario_transferencias.json"
+
+class ErrorVerificacion(Exception):
+    """El archivo remoto no coincide con el local después de subirlo."""
+
+def calcular_huellas(ruta):
+    """Calcula (md5, sha256) de un archivo en una sola lectura."""
+    md5 = hashlib.md5()
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(TAMANO_BLOQUE), b''):
+            md5.update(bloque)
+            sha.update(bloque)
+    return md5.hexdigest(), sha.hexdigest()
+
+# ==================== POOL DE CONEXIONES ====================
+
+class PoolFTP:
+    """
+    Pool de conexiones FTP con login hecho. Cada conexión la usa un solo hilo
+    a la vez; una conexión que falla se descarta y se abre otra.
+    """
+
+    def __init__(self, host, usuario, password, max_conexiones=MAX_CONEXIONES, timeout=TIMEOUT_FTP):
+        self.host = host
+        self.usuario = usuario
+        self.password = password
+        self.max_conexiones = max_conexiones
+        self.timeout = timeout
+        self.soporta_xmd5 = True
+        self._libres = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(max_conexiones)
+        self._lock = threading.Lock()
+        self._carpetas_listas = set()
+        self._locks_carpeta = {}
+        self._inicio = {}
+
+    def _conectar(self):
+        ftp = ftplib.FTP(timeout=self.timeout)
+        ftp.connect(self.host)
+        ftp.login(self.usuario, self.password)
+        ftp.voidcmd('TYPE I')
+        self._inicio[id(ftp)] = ftp.pwd().rstrip('/')
+        return ftp
+
+    @contextmanager
+    def conexion(self):
+        """Presta una conexión del pool (la abre si no hay libres)."""
+        with self._cupos:
+            try:
+                ftp = self._libres.get_nowait()
+            except queue.Empty:
+                ftp = self._conectar()
+            try:
+                yield ftp
+            except BaseException:
+                self._descartar(ftp)
+                raise
+            else:
+                self._libres.put(ftp)
+
+    def _descartar(self, ftp):
+        self._inicio.pop(id(ftp), None)
+        try:
+            ftp.close()
+        except Exception:
+            pass
+
+    def ir_a(self, ftp, ruta_remota):
+        """
+        Cambia la conexión a la carpeta remota (relativa a la carpeta inicial
+        del usuario), creándola la primera vez si no existe. Un solo hilo por
+        carpeta la crea; los demás esperan y luego solo entran.
+        """
+        inicio = self._inicio[id(ftp)]
+        ruta_remota = ruta_remota.replace("\\", "/").strip("/")
+        with self._lock:
+            lista = ruta_remota in self._carpetas_listas
+            lock_carpeta = self._locks_carpeta.setdefault(ruta_remota, threading.Lock())
+        if not lista:
+            with lock_carpeta:
+                with self._lock:
+                    lista = ruta_remota in self._carpetas_listas
+                if not lista:
+                    ftp.cwd(inicio or "/")
+                    asegurar_ruta_remota(ftp, ruta_remota)
+                    with self._lock:
+                        self._carpetas_listas.add(ruta_remota)
+                    return
+        ftp.cwd(f"{inicio}/{ruta_remota}")
+
+    def cerrar(self):
+        while True:
+            try:
+                ftp = self._libres.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                ftp.quit()
+            except Exception:
+                self._descartar(ftp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+def asegurar_ruta_remota(ftp, ruta):
+    """
+    Asegura que el path remoto exista navegando y creándolo si hace falta.
+    ruta: "RoadShow/SncaSubeRS"
+    """
+    for parte in ruta.replace("\\", "/").split("/"):
+        if not parte:
+            continue
+        try:
+            ftp.cwd(parte)
+        except ftplib.error_perm:
+            # Intentar crear y luego entrar. Si mkd falla, otra conexión pudo
+            # haberla creado al mismo tiempo (550 File exists): se reintenta cwd
+            error_mkd = None
+            try:
+                ftp.mkd(parte)
+            except ftplib.error_perm as e:
+                error_mkd = e
+            try:
+                ftp.cwd(parte)
+            except ftplib.error_perm as e:
+                raise RuntimeError(f"No se pudo acceder/crear el directorio remoto '{parte}': {error_mkd or e}")
+
+# ==================== DIARIO DE TRANSFERENCIAS ====================
+
+class DiarioTransferencias:
+    """Registro persistente de los archivos ya enviados a cada destino."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                self._entradas = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entradas = {}
+
+    @staticmethod
+    def _clave(ruta_remota, nombre):
+        return f"{ruta_remota.strip('/')}/{nombre}"
+
+    def ya_enviado(self, ruta_remota, nombre, sha256):
+        entrada = self._entradas.get(self._clave(ruta_remota, nombre))
+        return entrada is not None and entrada.get('sha256') == sha256
+
+    def registrar(self, ruta_remota, nombre, sha256, tamaño):
+        with self._lock:
+            self._entradas[self._clave(ruta_remota, nombre)] = {
+                'sha256': sha256,
+                'tamaño': tamaño,
+                'fecha': datetime.now().isoformat(),
+            }
+            ruta_temporal = f"{self.ruta}.tmp"
+            with open(ruta_temporal, 'w', encoding='utf-8') as f:
+                json.dump(self._entradas, f, indent=2, ensure_ascii=False)
+            os.replace(ruta_temporal, self.ruta)
+
+# ==================== SUBIDA ====================
+
+def _tamaño_remoto(ftp, nombre):
+    try:
+        return ftp.size(nombre)
+    except ftplib.error_perm:
+        return None
+
+def _subir_archivo(pool, ruta_local, ruta_remota, tamaño, md5):
+    """
+    Sube un archivo (continuando un .part previo si existe), lo verifica y lo
+    renombra al nombre final. Retorna los bytes que ya estaban subidos.
+    """
+    nombre = os.path.basename(ruta_local)
+    parcial = nombre + SUFIJO_PARCIAL
+
+    with pool.conexion() as ftp:
+        pool.ir_a(ftp, ruta_remota)
+
+        desde = _tamaño_remoto(ftp, parcial) or 0
+        if desde > tamaño:
+            ftp.delete(parcial)
+            desde = 0
+
+        with open(ruta_local, 'rb') as fp:
+            if desde:
+                try:
+                    fp.seek(desde)
+                    ftp.storbinary(f"STOR {parcial}", fp, TAMANO_BLOQUE, rest=desde)
+                except ftplib.error_perm:
+                    # El servidor no acepta REST: subir completo
+                    desde = 0
+            if not desde:
+                fp.seek(0)
+                ftp.storbinary(f"STOR {parcial}", fp, TAMANO_BLOQUE)
+
+        tamaño_remoto = _tamaño_remoto(ftp, parcial)
+        if tamaño_remoto != tamaño:
+            raise ErrorVerificacion(f"{nombre}: tamaño remoto {tamaño_remoto} != local {tamaño}")
+
+        if pool.soporta_xmd5:
+            try:
+                respuesta = ftp.sendcmd(f"XMD5 {parcial}")
+                if md5 not in respuesta.lower():
+                    ftp.delete(parcial)
+                    raise ErrorVerificacion(f"{nombre}: MD5 remoto no coincide")
+            except ftplib.error_perm:
+                pool.soporta_xmd5 = False
+
+        if _tamaño_remoto(ftp, nombre) is not None:
+            ftp.delete(nombre)
+        ftp.rename(parcial, nombre)
+
+    return desde
+
+def _transferir(pool, diario, ruta_local, ruta_remota, informar):
+    """Sube un archivo a un destino con reintentos; retorna 'omitido' o 'subido'."""
+    nombre = os.path.basename(ruta_local)
+    tamaño = os.path.getsize(ruta_local)
+    md5, sha256 = calcular_huellas(ruta_local)
+
+    if diario is not None and diario.ya_enviado(ruta_remota, nombre, sha256):
+        informar(f"    - Omitido (ya enviado): {nombre} -> {ruta_remota}")
+        return 'omitido'
+
+    intento = 0
+    while True:
+        intento += 1
+        try:
+            inicio = time.perf_counter()
+            desde = _subir_archivo(pool, ruta_local, ruta_remota, tamaño, md5)
+            duracion = time.perf_counter() - inicio
+            reanudado = f", reanudado desde {desde} bytes" if desde else ""
+            informar(f"    - Subido: {nombre} -> {ruta_remota} ({tamaño / 1024:.1f} KB en {duracion:.1f}s{reanudado})")
+            break
+        except (ftplib.error_perm, RuntimeError):
+            raise
+        except (*ftplib.all_errors, ErrorVerificacion) as e:
+            if intento > MAX_REINTENTOS:
+                raise
+            espera = ESPERA_BASE_REINTENTO * 2 ** (intento - 1)
+            informar(f"    - [REINTENTO] {nombre}: {e} (intento {intento}, esperando {espera:.0f}s)")
+            time.sleep(espera)
+
+    if diario is not None:
+        diario.registrar(ruta_remota, nombre, sha256, tamaño)
+    return 'subido'
+
+def subir_archivos(pool, trabajos, ruta_diario=None, informar=print):
+    """
+    Sube varios archivos en paralelo usando las conexiones del pool.
+
+    Args:
+        pool: PoolFTP
+        trabajos: Lista de (ruta_local, ruta_remota)
+        ruta_diario: Archivo del diario de transferencias (None = sin diario)
+        informar: Función para los mensajes de estado
+
+    Returns:
+        dict {(ruta_local, ruta_remota): 'subido' | 'omitido' | 'ERROR: ...'}
+    """
+    diario = DiarioTransferencias(ruta_diario) if ruta_diario else None
+    resultados = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(pool.max_conexiones, len(trabajos)))) as executor:
+        futuros = {
+            executor.submit(_transferir, pool, diario, ruta_local, ruta_remota, informar): (ruta_local, ruta_remota)
+            for ruta_local, ruta_remota in trabajos
+        }
+        for futuro, trabajo in futuros.items():
+            try:
+                resultados[trabajo] = futuro.result()
+            except Exception as e:
+                resultados[trabajo] = f"ERROR: {e}"
+                informar(f"    - ERROR al subir {os.path.basename(trabajo[0])} -> {trabajo[1]}: {e}")
+
+    return resultados
@@ -1,10 +1,12 @@
 import pandas as pd
 import os
+import sys
 from pathlib import Path
 import logging
 import gc
 
-# Importar módulo de configuración
+# Importar módulo de configuración (compartido con la app web, en scripts/utilidades)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utilidades"))
 try:
     from configuracion_sistema import cargar_configuracion, obtener_ruta_archivo, obtener_carpeta_salida, verificar_configuracion
 except ImportError:
@@ -45,6 +47,138 @@ logger = logging.getLogger(__name__)
 # Solo configurar nivel INFO para el logger principal
 logger.setLevel(logging.INFO)
 
+# Sufijos de los joins en orden de preferencia al buscar una columna del
+# archivo unido: primero la versión de REP PLR (base de los joins, nunca
+# vacía), luego la de VOL_PORTAFOLIO y al final la de NO_ENTREGAS, que es
+# nula en las entregas sin no-entrega. Es el mismo orden que usa
+# resolver_columna() en app.py, para que el cubo y el dataset completo
+# respondan igual.
+SUFIJOS_COLUMNA = ('_rep_plr', '_completos', '', '_vol_portafolio', '_no_entregas')
+
+def candidatas_columna(nombre):
+    """Nombres posibles de una columna en el archivo unido, en orden de preferencia."""
+    return [f"{nombre}{sufijo}" for sufijo in SUFIJOS_COLUMNA]
+
+# Cubo de agregados OTIF: dimensiones (columna lógica -> columnas candidatas
+# en el archivo unido, en orden de preferencia) y métricas a sumar
+DIMENSIONES_CUBO = {
+    nombre: candidatas_columna(nombre)
+    for nombre in ['Fe.Entrega', 'Centro', 'Zona', 'Familia', 'Macro Canal']
+}
+METRICAS_CUBO = {
+    nombre: candidatas_columna(nombre)
+    for nombre in ['Entregas', 'No Entrega', 'Cajas Equiv.', 'Cajas Equiv NE']
+}
+
+def guardar_parquet_atomico(df, ruta):
+    """
+    Guarda un DataFrame como parquet (snappy) escribiendo primero un archivo
+    temporal y reemplazando el destino, para que los lectores y las copias
+    publicadas por hardlink nunca vean un archivo a medio escribir.
+    """
+    ruta = Path(ruta)
+    ruta_temporal = ruta.with_name(f".{ruta.name}.tmp")
+    try:
+        df.to_parquet(
+            ruta_temporal,
+            index=False,
+            compression='snappy',
+            engine='pyarrow'
+        )
+        os.replace(ruta_temporal, ruta)
+    finally:
+        if ruta_temporal.exists():
+            ruta_temporal.unlink()
+
+def _primera_columna_existente(df, candidatas):
+    """Retorna la primera columna de la lista que exista en el DataFrame o None."""
+    for col in candidatas:
+        if col in df.columns:
+            return col
+    return None
+
+def generar_cubo_otif(df_final_unido, archivo_cubo):
+    """
+    Genera el cubo de agregados OTIF (día × Centro × Zona × Familia × Macro Canal)
+    con la suma de Entregas, No Entrega y cajas, y lo guarda como parquet.
+
+    La actualización es incremental por día: los días presentes en los datos
+    actuales reemplazan su partición en el cubo existente y los demás días
+    del cubo anterior se conservan.
+
+    Args:
+        df_final_unido (pd.DataFrame): Datos unidos con las columnas de conteo
+        archivo_cubo (Path): Ruta del parquet del cubo
+
+    Returns:
+        pd.DataFrame: Cubo guardado
+
+    Raises:
+        ValueError: Si alguna dimensión declarada no existe en los datos unidos
+                    (un cubo sin esa dimensión respondería mal a las consultas)
+    """
+    logger.info("🧊 Generando cubo de agregados OTIF...")
+
+    columnas = {}
+    faltantes = []
+    for nombre, candidatas in DIMENSIONES_CUBO.items():
+        col = _primera_columna_existente(df_final_unido, candidatas)
+        if col is None:
+            faltantes.append(f"'{nombre}' (candidatas: {', '.join(candidatas)})")
+        else:
+            columnas[nombre] = col
+    if faltantes:
+        raise ValueError(f"Dimensiones del cubo no encontradas: {'; '.join(faltantes)}")
+
+    for nombre, candidatas in METRICAS_CUBO.items():
+        col = _primera_columna_existente(df_final_unido, candidatas)
+        if col is None:
+            logger.warning(f"⚠️ Métrica '{nombre}' no encontrada, se omite del cubo")
+        else:
+            columnas[nombre] = col
+
+    dimensiones = list(DIMENSIONES_CUBO)
+    metricas = [m for m in METRICAS_CUBO if m in columnas]
+
+    df_cubo = df_final_unido[[columnas[c] for c in dimensiones + metricas]].copy()
+    df_cubo.columns = dimensiones + metricas
+    df_cubo['Fe.Entrega'] = pd.to_datetime(df_cubo['Fe.Entrega'], errors='coerce').dt.normalize()
+    for metrica in metricas:
+        df_cubo[metrica] = pd.to_numeric(df_cubo[metrica], errors='coerce').fillna(0)
+
+    cubo = (
+        df_cubo.groupby(dimensiones, observed=True, dropna=False, sort=False)[metricas]
+        .sum()
+        .reset_index()
+    )
+    del df_cubo
+
+    # Actualización incremental: reemplazar solo los días recalculados
+    dias_conservados = 0
+    if archivo_cubo.exists():
+        try:
+            cubo_anterior = pd.read_parquet(archivo_cubo, engine='pyarrow')
+            if list(cubo_anterior.columns) == list(cubo.columns):
+                dias_actuales = cubo['Fe.Entrega'].unique()
+                cubo_anterior = cubo_anterior[~cubo_anterior['Fe.Entrega'].isin(dias_actuales)]
+                dias_conservados = cubo_anterior['Fe.Entrega'].nunique()
+                cubo = pd.concat([cubo_anterior, cubo], ignore_index=True)
+            else:
+                logger.warning("⚠️ El cubo existente tiene otra estructura, se regenera completo")
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo leer el cubo existente, se regenera completo: {e}")
+
+    for dimension in dimensiones[1:]:
+        cubo[dimension] = cubo[dimension].astype('string').astype('category')
+    cubo = cubo.sort_values(dimensiones, ignore_index=True)
+
+    guardar_parquet_atomico(cubo, archivo_cubo)
+
+    logger.info(f"✅ Cubo OTIF guardado: {archivo_cubo}")
+    logger.info(f"  • Filas: {len(cubo):,} | Días: {cubo['Fe.Entrega'].nunique():,} (conservados del cubo anterior: {dias_conservados:,})")
+    logger.info(f"  • Tamaño: {archivo_cubo.stat().st_size / 1024:.1f} KB")
+    return cubo
+
 def unificar_datos_completos():
     """
     Crea los 3 archivos principales y une vol_portafolio con rep_plr por Entrega
@@ -96,12 +230,7 @@ def unificar_datos_completos():
         # Verificar si el archivo ya existe
         archivo_existe = archivo_rep_plr_final.exists()
         
-        df_rep_plr.to_parquet(
-            archivo_rep_plr_final, 
-            index=False,
-            compression='snappy',
-            engine='pyarrow'
-        )
+        guardar_parquet_atomico(df_rep_plr, archivo_rep_plr_final)
         
         if archivo_existe:
             logger.info(f"✅ Archivo REP_PLR actualizado: {archivo_rep_plr_final}")
@@ -130,12 +259,7 @@ def unificar_datos_completos():
         # Verificar si el archivo ya existe
         archivo_existe = archivo_no_entregas_final.exists()
         
-        df_no_entregas.to_parquet(
-            archivo_no_entregas_final, 
-            index=False,
-            compression='snappy',
-            engine='pyarrow'
-        )
+        guardar_parquet_atomico(df_no_entregas, archivo_no_entregas_final)
         
         if archivo_existe:
             logger.info(f"✅ Archivo NO_ENTREGAS actualizado: {archivo_no_entregas_final}")
@@ -164,12 +288,7 @@ def unificar_datos_completos():
         # Verificar si el archivo ya existe
         archivo_existe = archivo_vol_portafolio_final.exists()
         
-        df_vol_portafolio.to_parquet(
-            archivo_vol_portafolio_final, 
-            index=False,
-            compression='snappy',
-            engine='pyarrow'
-        )
+        guardar_parquet_atomico(df_vol_portafolio, archivo_vol_portafolio_final)
         
         if archivo_existe:
             logger.info(f"✅ Archivo VOL_PORTAFOLIO actualizado: {archivo_vol_portafolio_final}")
@@ -356,18 +475,19 @@ def unificar_datos_completos():
         # Verificar si el archivo ya existe
         archivo_existe = archivo_final_unido.exists()
         
-        df_final_unido.to_parquet(
-            archivo_final_unido, 
-            index=False,
-            compression='snappy',
-            engine='pyarrow'
-        )
+        guardar_parquet_atomico(df_final_unido, archivo_final_unido)
         
         if archivo_existe:
             logger.info(f"✅ Archivo final unido actualizado con nuevas columnas: {archivo_final_unido}")
         else:
             logger.info(f"✅ Archivo final unido creado con nuevas columnas: {archivo_final_unido}")
         
+        # 7. CUBO DE AGREGADOS OTIF
+        try:
+            generar_cubo_otif(df_final_unido, carpeta_salida / "cubo_otif.parquet")
+        except Exception as e:
+            logger.error(f"❌ Error al generar el cubo OTIF: {str(e)}")
+        
         # Mostrar las columnas del archivo final unido
         logger.info("📋 Columnas del archivo final unido:")
         for i, col in enumerate(df_final_unido.columns, 1):
@@ -385,6 +505,7 @@ def unificar_datos_completos():
         logger.info(f"  • {carpeta_salida}/no_entregas.parquet") 
         logger.info(f"  • {carpeta_salida}/vol_portafolio.parquet")
         logger.info(f"  • {carpeta_salida}/datos_completos_con_no_entregas.parquet (CON NUEVAS COLUMNAS)")
+        logger.info(f"  • {carpeta_salida}/cubo_otif.parquet (AGREGADOS POR DÍA)")
         logger.info("")
         logger.info("🆕 Nuevas columnas agregadas a datos_completos_con_no_entregas.parquet:")
         logger.info("  • 'Entregas': Conta 1 solo para la primera ocurrencia de cada combinación única de Entrega + Familia")
@@ -29,6 +29,9 @@ PARENT_DIR = SCRIPT_DIR.parent  # scripts/sap/
 REPORTES_DIR = PARENT_DIR / "Reportes_Ultima_Hora"
 if str(REPORTES_DIR) not in sys.path:
     sys.path.insert(0, str(REPORTES_DIR))
+sys.path.insert(0, str(PARENT_DIR.resolve().parent / "utilidades"))
+
+from escritura_excel import escribir_excel
 
 def load_credentials() -> dict:
     """Carga credenciales desde credentials.ini ubicado junto a este script.
@@ -214,7 +217,7 @@ def process_tab_file(input_path: Path, output_path: Path) -> None:
         processed = [[col for i, col in enumerate(row) if i not in (0, 2)] for row in data]
         df = pd.DataFrame(processed)
         ensure_dir(output_path.parent)
-        df.to_excel(output_path, index=False, engine="openpyxl")
+        escribir_excel(output_path, df)
         logger.info("Archivo procesado: %s", output_path)
     except Exception as e:
         raise RuntimeError(f"Error al procesar archivo tabulado: {e}")
@@ -226,7 +229,7 @@ def drop_first_5_rows_inplace(xlsx_path: Path) -> None:
         if len(df.index) <= 5:
             logger.warning("El archivo tiene %d filas; se eliminarán todas o quedará vacío.", len(df.index))
         df = df.iloc[5:].reset_index(drop=True)
-        df.to_excel(xlsx_path, index=False, header=False, engine="openpyxl")
+        escribir_excel(xlsx_path, df, header=False)
         logger.info("Se eliminaron las primeras 5 filas y se sobrescribió: %s", xlsx_path)
     except Exception as e:
         raise RuntimeError(f"Error al eliminar las primeras 5 filas del Excel: {e}")
@@ -277,30 +280,6 @@ def run_once(cfg: RunConfig) -> Path:
     # Eliminar primeras 5 filas del Excel
     drop_first_5_rows_inplace(xlsx_path)
 
-    # Generar reporte con gráficos y enviar correo
-    # Usa el archivo Excel procesado (después de TXT->XLSX y eliminar primeras 5 filas)
-    try:
-        logger.info("Generando reporte con gráficos...")
-        import subprocess
-        script_graficos = Path(__file__).parent / "generar_reporte_graficos.py"
-        if script_graficos.exists():
-            result = subprocess.run(
-                [sys.executable, str(script_graficos), "--archivo", str(xlsx_path)],
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
-            if result.returncode == 0:
-                logger.info("[OK] Reporte con gráficos generado y correo enviado")
-            else:
-                logger.warning(f"[ADVERTENCIA]  El script de gráficos terminó con código {result.returncode}")
-                if result.stderr:
-                    logger.warning(f"Error: {result.stderr}")
-        else:
-            logger.warning("[ADVERTENCIA]  No se encontró el script generar_reporte_graficos.py")
-    except Exception as e:
-        logger.warning(f"[ADVERTENCIA]  Error al generar reporte con gráficos: {e}")
-    
     # Generar dashboard regional
     try:
         logger.info("Generando dashboard regional por zonas...")
@@ -333,6 +312,30 @@ def run_once(cfg: RunConfig) -> Path:
     except Exception as e:
         logger.warning(f"[ADVERTENCIA] Error al generar dashboard regional: {e}")
 
+    # Generar reporte con gráficos y enviar correo
+    # Usa el archivo Excel procesado (después de TXT->XLSX y eliminar primeras 5 filas)
+    try:
+        logger.info("Generando reporte con gráficos...")
+        import subprocess
+        script_graficos = Path(__file__).parent / "generar_reporte_graficos.py"
+        if script_graficos.exists():
+            result = subprocess.run(
+                [sys.executable, str(script_graficos), "--archivo", str(xlsx_path)],
+                capture_output=True,
+                text=True,
+                timeout=300
+            )
+            if result.returncode == 0:
+                logger.info("[OK] Reporte con gráficos generado y correo enviado")
+            else:
+                logger.warning(f"[ADVERTENCIA]  El script de gráficos terminó con código {result.returncode}")
+                if result.stderr:
+                    logger.warning(f"Error: {result.stderr}")
+        else:
+            logger.warning("[ADVERTENCIA]  No se encontró el script generar_reporte_graficos.py")
+    except Exception as e:
+        logger.warning(f"[ADVERTENCIA]  Error al generar reporte con gráficos: {e}")
+
     return txt_path
 
 def main() -> int:
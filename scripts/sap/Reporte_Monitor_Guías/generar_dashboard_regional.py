@@ -8,6 +8,9 @@ Descripción:
 """
 
 import sys
+import json
+import time
+import shutil
 import argparse
 from pathlib import Path
 from datetime import datetime
@@ -29,7 +32,9 @@ try:
     from configuracion_regiones import (
         REGIONES_CONFIG, 
         REGIONES_ORDEN,
-        mapear_zona_a_region
+        mapear_zona_a_region,
+        mapear_serie,
+        extraer_hora_serie
     )
     print("[OK] Configuracion de regiones cargada correctamente")
 except ImportError as e:
@@ -53,6 +58,30 @@ except ImportError as e:
                 return region
         return 'SIN_ZONA'
 
+    def mapear_serie(serie):
+        return serie.map(mapear_zona_a_region)
+
+    def extraer_hora_serie(serie):
+        horas = pd.to_datetime(serie.astype(str).str.strip(), format='mixed', errors='coerce').dt.hour
+        return horas.map(lambda h: f"{int(h):02d}:00", na_action='ignore').astype(object).where(horas.notna(), None)
+
+from renderizado_dashboards import (
+    renderizar_imagenes,
+    calcular_hash_agregados,
+    imagenes_vigentes,
+    registrar_imagenes,
+    renderizar_plantilla,
+    rasterizar_html,
+    MAX_PROCESOS_RENDER
+)
+
+# Manifiesto de las imágenes generadas (junto al dashboard completo)
+ARCHIVO_MANIFIESTO = "manifiesto_dashboard_monitor.json"
+
+# Renderizado HTML/SVG: plantilla de templates/ y contexto que usa la app web
+PLANTILLA_HTML = "dashboard_monitor_guias.html"
+ARCHIVO_CONTEXTO_HTML = "dashboard_monitor_guias.json"
+
 def leer_excel_procesado(xlsx_path: Path) -> pd.DataFrame:
     """Lee el archivo Excel procesado y prepara los datos"""
     try:
@@ -72,29 +101,7 @@ def leer_excel_procesado(xlsx_path: Path) -> pd.DataFrame:
         df['Zona'] = df.iloc[:, columna_zona_idx]
         
         # Extraer hora
-        import re
-        def extraer_hora(val):
-            if pd.isna(val):
-                return None
-            val_str = str(val).strip()
-            if not val_str or val_str == 'nan':
-                return None
-            
-            try:
-                dt = pd.to_datetime(val_str, errors='coerce')
-                if pd.notna(dt):
-                    return dt.strftime('%H:00')
-            except:
-                pass
-            
-            match = re.search(r'(\d{1,2}):(\d{2})', val_str)
-            if match:
-                hora = int(match.group(1))
-                if 0 <= hora <= 23:
-                    return f"{hora:02d}:00"
-            return None
-        
-        df['Hora'] = df.iloc[:, columna_hora_idx].apply(extraer_hora)
+        df['Hora'] = extraer_hora_serie(df.iloc[:, columna_hora_idx])
         df = df[df['Hora'].notna()].copy()
         
         if df.empty:
@@ -102,13 +109,13 @@ def leer_excel_procesado(xlsx_path: Path) -> pd.DataFrame:
         
         # Filtro columna F: solo valores que inicien con '1'
         columna_f = df.iloc[:, columna_viaje_idx]
-        df = df[columna_f.apply(lambda val: str(val).strip().startswith('1') if pd.notna(val) else False)].copy()
+        df = df[columna_f.notna() & columna_f.astype(str).str.strip().str.startswith('1')].copy()
         
         if df.empty:
             raise ValueError("No se encontraron filas donde la columna F inicie con '1'")
         
         # Mapear zona a región
-        df['Region'] = df['Zona'].apply(mapear_zona_a_region)
+        df['Region'] = mapear_serie(df['Zona'])
         df = df[df['Region'] != 'SIN_ZONA'].copy()
         
         if df.empty:
@@ -118,17 +125,26 @@ def leer_excel_procesado(xlsx_path: Path) -> pd.DataFrame:
     except Exception as e:
         raise RuntimeError(f"Error al leer el archivo Excel: {e}")
 
-def generar_dashboard(df: pd.DataFrame, output_path: Path):
-    """Genera el dashboard estilo Tablero de Monitor de Guías"""
-    
-    print("[PROCESO] Generando dashboard Tablero de Monitor de Guias...")
-    
+# Colores de las tarjetas KPI
+COLORES_KPI = {
+    'GAM': '#1565C0',
+    'RURAL': '#2E7D32',
+    'VYD': '#6A1B9A',
+    'SPE': '#F57C00',
+    'Total': '#424242'
+}
+
+def calcular_agregados(df: pd.DataFrame) -> dict:
+    """
+    Calcula una sola vez los datos que usan todas las imágenes del dashboard
+    (KPIs, tabla zona x hora, resumen por región y tendencias)
+    """
     # Calcular estadísticas
     total_guias = len(df)
-    stats_por_region = df.groupby('Region').size().to_dict()
+    stats_por_region = df.groupby('Region', observed=True).size().to_dict()
     
     # Crear matriz zona x hora
-    stats_zona_hora = df.groupby(['Region', 'Zona', 'Hora']).size().reset_index(name='Cantidad')
+    stats_zona_hora = df.groupby(['Region', 'Zona', 'Hora'], observed=True).size().reset_index(name='Cantidad')
     
     # Crear pivot table completa
     pivot_detallado = stats_zona_hora.pivot_table(
@@ -136,7 +152,8 @@ def generar_dashboard(df: pd.DataFrame, output_path: Path):
         index=['Region', 'Zona'],
         columns='Hora',
         fill_value=0,
-        aggfunc='sum'
+        aggfunc='sum',
+        observed=True
     )
     
     # Ordenar columnas (horas)
@@ -147,12 +164,13 @@ def generar_dashboard(df: pd.DataFrame, output_path: Path):
         pass
     
     # Crear pivot por región (resumen)
-    pivot_region = stats_zona_hora.groupby(['Region', 'Hora'])['Cantidad'].sum().reset_index()
+    pivot_region = stats_zona_hora.groupby(['Region', 'Hora'], observed=True)['Cantidad'].sum().reset_index()
     pivot_region_tabla = pivot_region.pivot_table(
         values='Cantidad',
         index='Region',
         columns='Hora',
-        fill_value=0
+        fill_value=0,
+        observed=True
     )
     
     # Ordenar columnas
@@ -162,20 +180,6 @@ def generar_dashboard(df: pd.DataFrame, output_path: Path):
     except:
         pass
     
-    # Crear figura
-    fig = plt.figure(figsize=(20, 24), dpi=120, facecolor='white')
-    fig.suptitle('Tablero de Monitor de Guias', fontsize=20, fontweight='bold', y=0.99, color='#333')
-    
-    # Grid
-    gs = GridSpec(4, 1, figure=fig, hspace=0.3, height_ratios=[0.08, 0.50, 0.15, 0.27],
-                  top=0.96, bottom=0.02, left=0.05, right=0.97)
-    
-    # ==================== FILA 1: KPIs ====================
-    print("[KPI] Generando KPIs...")
-    
-    ax_kpis = fig.add_subplot(gs[0, 0])
-    ax_kpis.axis('off')
-    
     # Calcular valores para mostrar (GAM, RURAL, VYD, SPE, Total)
     kpis_valores = {
         'GAM': stats_por_region.get('GAM', 0),
@@ -185,46 +189,7 @@ def generar_dashboard(df: pd.DataFrame, output_path: Path):
         'Total': total_guias
     }
     
-    # Dibujar cajas KPI
-    num_kpis = len(kpis_valores)
-    box_width = 0.18
-    box_height = 0.7
-    spacing = 0.205
-    start_x = 0.02
-    
-    colores_kpi = {
-        'GAM': '#1565C0',
-        'RURAL': '#2E7D32',
-        'VYD': '#6A1B9A',
-        'SPE': '#F57C00',
-        'Total': '#424242'
-    }
-    
-    for i, (label, valor) in enumerate(kpis_valores.items()):
-        x_pos = start_x + (i * spacing)
-        
-        rect = mpatches.FancyBboxPatch((x_pos, 0.15), box_width, box_height,
-                                        boxstyle="round,pad=0.02",
-                                        facecolor=colores_kpi[label],
-                                        edgecolor='white', linewidth=2, alpha=0.9,
-                                        transform=ax_kpis.transAxes)
-        ax_kpis.add_patch(rect)
-        
-        # Texto
-        ax_kpis.text(x_pos + box_width/2, 0.7, label,
-                    ha='center', va='center', fontsize=14, fontweight='bold',
-                    color='white', transform=ax_kpis.transAxes)  # Aumentado de 12 a 14
-        ax_kpis.text(x_pos + box_width/2, 0.4, str(valor),
-                    ha='center', va='center', fontsize=22, fontweight='bold',
-                    color='white', transform=ax_kpis.transAxes)  # Aumentado de 18 a 22
-    
-    # ==================== FILA 2: TABLA DETALLADA ZONA x HORA ====================
-    print("[TABLA] Generando tabla detallada zona x hora...")
-    
-    ax_tabla = fig.add_subplot(gs[1, 0])
-    ax_tabla.axis('off')
-    
-    # Preparar datos para tabla
+    # Preparar datos para tabla detallada
     tabla_data = []
     headers = ['REGIÓN', 'ZONA'] + list(pivot_detallado.columns)
     
@@ -271,102 +236,126 @@ def generar_dashboard(df: pd.DataFrame, output_path: Path):
             fila = [nombre_region, zona] + list(zonas_region.loc[zona].values)
             tabla_data.append(fila)
     
-    # Crear tabla
-    if tabla_data:
-        tabla = ax_tabla.table(cellText=tabla_data,
-                              colLabels=headers,
-                              cellLoc='center',
-                              loc='upper center',
-                              bbox=[0, 0, 1, 1])
+    # Preparar datos para resumen
+    resumen_data = []
+    headers_resumen = ['Región'] + list(pivot_region_tabla.columns)
+    
+    for region in REGIONES_ORDEN:
+        if region in pivot_region_tabla.index:
+            fila = [region] + list(pivot_region_tabla.loc[region].values)
+            resumen_data.append(fila)
+    
+    return {
+        'total_guias': total_guias,
+        'stats_por_region': stats_por_region,
+        'pivot_detallado': pivot_detallado,
+        'pivot_region_tabla': pivot_region_tabla,
+        'kpis_valores': kpis_valores,
+        'tabla_data': tabla_data,
+        'headers': headers,
+        'resumen_data': resumen_data,
+        'headers_resumen': headers_resumen
+    }
+
+# ==================== PLANTILLAS DE DIBUJO ====================
+
+def _dibujar_kpis(ax, kpis_valores: dict):
+    """Dibuja las cajas KPI (GAM, RURAL, VYD, SPE, Total)"""
+    ax.axis('off')
+    
+    box_width = 0.18
+    box_height = 0.7
+    spacing = 0.205
+    start_x = 0.02
+    
+    for i, (label, valor) in enumerate(kpis_valores.items()):
+        x_pos = start_x + (i * spacing)
         
+        rect = mpatches.FancyBboxPatch((x_pos, 0.15), box_width, box_height,
+                                        boxstyle="round,pad=0.02",
+                                        facecolor=COLORES_KPI[label],
+                                        edgecolor='white', linewidth=2, alpha=0.9,
+                                        transform=ax.transAxes)
+        ax.add_patch(rect)
+        
+        # Texto
+        ax.text(x_pos + box_width/2, 0.7, label,
+                ha='center', va='center', fontsize=14, fontweight='bold',
+                color='white', transform=ax.transAxes)
+        ax.text(x_pos + box_width/2, 0.4, str(valor),
+                ha='center', va='center', fontsize=22, fontweight='bold',
+                color='white', transform=ax.transAxes)
+
+def _dibujar_tabla_detalle(ax, filas: list, headers: list, escala: float, titulo: str):
+    """Dibuja la tabla detallada zona x hora"""
+    ax.axis('off')
+    
+    if filas:
+        tabla = ax.table(cellText=filas, colLabels=headers,
+                         cellLoc='center', loc='upper center', bbox=[0, 0, 1, 1])
         tabla.auto_set_font_size(False)
-        tabla.set_fontsize(10)  # Aumentado de 8 a 10
-        tabla.scale(1, 1.8)  # Aumentado de 1.5 a 1.8
+        tabla.set_fontsize(10)
+        tabla.scale(1, escala)
         
         # Estilo de encabezados
         for i in range(len(headers)):
-            cell = tabla[(0, i)]
-            cell.set_facecolor('#4CAF50')
-            cell.set_text_props(weight='bold', color='white', fontsize=11)  # Aumentado de 9 a 11
+            tabla[(0, i)].set_facecolor('#4CAF50')
+            tabla[(0, i)].set_text_props(weight='bold', color='white', fontsize=11)
         
         # Estilo de celdas
-        for i in range(1, len(tabla_data) + 1):
+        for i in range(1, len(filas) + 1):
             # Columna Región
             tabla[(i, 0)].set_facecolor('#E8F5E9')
-            tabla[(i, 0)].set_text_props(weight='bold', fontsize=10)  # Añadido fontsize
+            tabla[(i, 0)].set_text_props(weight='bold', fontsize=10)
             # Columna Zona
             tabla[(i, 1)].set_facecolor('#F1F8E9')
-            tabla[(i, 1)].set_text_props(weight='bold', fontsize=10)  # Añadido weight y fontsize
+            tabla[(i, 1)].set_text_props(weight='bold', fontsize=10)
             # Valores numéricos - NEGRITAS Y MÁS GRANDES
             for j in range(2, len(headers)):
-                tabla[(i, j)].set_text_props(weight='bold', fontsize=11)  # Valores en negrita y más grandes
+                tabla[(i, j)].set_text_props(weight='bold', fontsize=11)
                 # Alternar color de filas
                 if i % 2 == 0:
                     tabla[(i, j)].set_facecolor('#FAFAFA')
     
-    ax_tabla.text(0.5, 1.02, 'Horas', ha='center', va='bottom',
-                 fontsize=16, fontweight='bold', transform=ax_tabla.transAxes)  # Aumentado de 14 a 16
-    
-    # ==================== FILA 3: TABLA RESUMEN POR REGIÓN ====================
-    print("[TABLA] Generando tabla resumen por region...")
-    
-    ax_resumen = fig.add_subplot(gs[2, 0])
-    ax_resumen.axis('off')
-    
-    # Preparar datos para resumen
-    resumen_data = []
-    headers_resumen = ['Región'] + list(pivot_region_tabla.columns)
-    
-    for region in REGIONES_ORDEN:
-        if region in pivot_region_tabla.index:
-            nombre_mostrar = region
-            if region == 'CT01':
-                nombre_mostrar = 'CT01'
-            elif region == 'CT02':
-                nombre_mostrar = 'CT02'
-            
-            fila = [nombre_mostrar] + list(pivot_region_tabla.loc[region].values)
-            resumen_data.append(fila)
+    ax.text(0.5, 1.02, titulo, ha='center', va='bottom',
+            fontsize=16, fontweight='bold', transform=ax.transAxes)
+
+def _dibujar_tabla_resumen(ax, filas: list, headers: list, loc: str, bbox: list, escala: float):
+    """Dibuja la tabla resumen por región x hora"""
+    ax.axis('off')
     
-    # Crear tabla resumen
-    if resumen_data:
-        tabla_resumen = ax_resumen.table(cellText=resumen_data,
-                                        colLabels=headers_resumen,
-                                        cellLoc='center',
-                                        loc='upper center',
-                                        bbox=[0, 0.3, 1, 0.7])
-        
-        tabla_resumen.auto_set_font_size(False)
-        tabla_resumen.set_fontsize(11)  # Aumentado de 9 a 11
-        tabla_resumen.scale(1, 2.2)  # Aumentado de 2 a 2.2
+    if filas:
+        tabla = ax.table(cellText=filas, colLabels=headers,
+                         cellLoc='center', loc=loc, bbox=bbox)
+        tabla.auto_set_font_size(False)
+        tabla.set_fontsize(11)
+        tabla.scale(1, escala)
         
         # Estilo de encabezados
-        for i in range(len(headers_resumen)):
-            cell = tabla_resumen[(0, i)]
-            cell.set_facecolor('#2196F3')
-            cell.set_text_props(weight='bold', color='white', fontsize=12)  # Aumentado de 10 a 12
+        for i in range(len(headers)):
+            tabla[(0, i)].set_facecolor('#2196F3')
+            tabla[(0, i)].set_text_props(weight='bold', color='white', fontsize=12)
         
         # Estilo de celdas de datos
-        for i in range(1, len(resumen_data) + 1):
+        for i in range(1, len(filas) + 1):
             # Primera columna (Región)
-            tabla_resumen[(i, 0)].set_facecolor('#E3F2FD')
-            tabla_resumen[(i, 0)].set_text_props(weight='bold', fontsize=11)  # Añadido fontsize
+            tabla[(i, 0)].set_facecolor('#E3F2FD')
+            tabla[(i, 0)].set_text_props(weight='bold', fontsize=11)
             
             # Resto de columnas - VALORES EN NEGRITA Y MÁS GRANDES
-            for j in range(1, len(headers_resumen)):
-                tabla_resumen[(i, j)].set_text_props(weight='bold', fontsize=12)  # Valores negritas y grandes
+            for j in range(1, len(headers)):
+                tabla[(i, j)].set_text_props(weight='bold', fontsize=12)
                 if i % 2 == 0:
-                    tabla_resumen[(i, j)].set_facecolor('#F5F5F5')
-    
-    # ==================== FILA 4: GRÁFICO DE TENDENCIAS ====================
-    print("[GRAFICO] Generando grafico de tendencias...")
-    
-    ax_grafico = fig.add_subplot(gs[3, 0])
+                    tabla[(i, j)].set_facecolor('#F5F5F5')
+
+def _dibujar_tendencias(ax, agregados: dict):
+    """Dibuja el gráfico de tendencias por región (sin CT02)"""
+    pivot_region_tabla = agregados['pivot_region_tabla']
+    stats_por_region = agregados['stats_por_region']
     
     # Excluir CT02 del gráfico
     regiones_para_grafico = [r for r in REGIONES_ORDEN if r != 'CT02']
     
-    # Preparar datos para gráfico
     for region in regiones_para_grafico:
         if region in pivot_region_tabla.index:
             horas = pivot_region_tabla.columns
@@ -374,245 +363,283 @@ def generar_dashboard(df: pd.DataFrame, output_path: Path):
             color = REGIONES_CONFIG[region]['color']
             
             # Dibujar línea
-            ax_grafico.plot(horas, valores, marker='o', linewidth=2, markersize=6,
-                          color=color, label=region, alpha=0.9)
+            ax.plot(horas, valores, marker='o', linewidth=2, markersize=6,
+                    color=color, label=region, alpha=0.9)
             
             # Agregar valores en cada punto
-            for i, (hora, valor) in enumerate(zip(horas, valores)):
-                ax_grafico.text(i, valor, str(int(valor)), 
-                              ha='center', va='bottom', fontsize=9, 
-                              fontweight='bold', color=color)
-    
-    ax_grafico.set_xlabel('Hora', fontsize=13, fontweight='bold')
-    ax_grafico.set_ylabel('Cantidad', fontsize=13, fontweight='bold')
-    ax_grafico.set_title('Tendencias por Región (GAM, RURAL, CT01)', fontsize=16, fontweight='bold', pad=15)
-    ax_grafico.legend(loc='upper left', fontsize=12, framealpha=0.9, prop={'weight': 'bold'})
-    ax_grafico.grid(True, alpha=0.3, linestyle='--')
-    plt.setp(ax_grafico.xaxis.get_majorticklabels(), rotation=45, ha='right', fontsize=11, weight='bold')
-    plt.setp(ax_grafico.yaxis.get_majorticklabels(), fontsize=11, weight='bold')
+            for i, valor in enumerate(valores):
+                ax.text(i, valor, str(int(valor)),
+                        ha='center', va='bottom', fontsize=9,
+                        fontweight='bold', color=color)
+    
+    ax.set_xlabel('Hora', fontsize=13, fontweight='bold')
+    ax.set_ylabel('Cantidad', fontsize=13, fontweight='bold')
+    ax.set_title('Tendencias por Región (GAM, RURAL, CT01)', fontsize=16, fontweight='bold', pad=15)
+    ax.legend(loc='upper left', fontsize=12, framealpha=0.9, prop={'weight': 'bold'})
+    ax.grid(True, alpha=0.3, linestyle='--')
+    plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right', fontsize=11, weight='bold')
+    plt.setp(ax.yaxis.get_majorticklabels(), fontsize=11, weight='bold')
     
     # Agregar margen superior para que los valores no se corten
-    ylim = ax_grafico.get_ylim()
-    ax_grafico.set_ylim(ylim[0], ylim[1] * 1.1)
+    ylim = ax.get_ylim()
+    ax.set_ylim(ylim[0], ylim[1] * 1.1)
     
     # Agregar cajas de información en el gráfico
-    info_text = f"VYD {stats_por_region.get('CT02', 0)}\nSPE {stats_por_region.get('CT01', 0)}\nTotal {total_guias}"
-    ax_grafico.text(0.02, 0.05, info_text,
-                   transform=ax_grafico.transAxes,
-                   fontsize=11, fontweight='bold', verticalalignment='bottom',
-                   bbox=dict(boxstyle='round,pad=0.5', facecolor='white', alpha=0.8, edgecolor='gray'))
+    info_text = f"VYD {stats_por_region.get('CT02', 0)}\nSPE {stats_por_region.get('CT01', 0)}\nTotal {agregados['total_guias']}"
+    ax.text(0.02, 0.05, info_text, transform=ax.transAxes,
+            fontsize=11, fontweight='bold', verticalalignment='bottom',
+            bbox=dict(boxstyle='round,pad=0.5', facecolor='white', alpha=0.8, edgecolor='gray'))
+
+# ==================== IMÁGENES ====================
+# Cada función recibe los agregados y la ruta de salida, y retorna la ruta.
+# Se definen a nivel de módulo para poder renderizarlas en otros procesos.
+
+def renderizar_dashboard_completo(agregados: dict, ruta: Path) -> Path:
+    """Dashboard completo: KPIs, tabla detallada, resumen y tendencias"""
+    fig = plt.figure(figsize=(20, 24), dpi=120, facecolor='white')
+    fig.suptitle('Tablero de Monitor de Guias', fontsize=20, fontweight='bold', y=0.99, color='#333')
     
-    # Guardar figura completa
-    print(f"[GUARDANDO] Guardando dashboard completo en: {output_path}")
-    plt.savefig(output_path, dpi=150, bbox_inches='tight',
-                facecolor='white', edgecolor='none')
-    plt.close()
+    # Grid
+    gs = GridSpec(4, 1, figure=fig, hspace=0.3, height_ratios=[0.08, 0.50, 0.15, 0.27],
+                  top=0.96, bottom=0.02, left=0.05, right=0.97)
+    
+    _dibujar_kpis(fig.add_subplot(gs[0, 0]), agregados['kpis_valores'])
+    _dibujar_tabla_detalle(fig.add_subplot(gs[1, 0]), agregados['tabla_data'], agregados['headers'],
+                           escala=1.8, titulo='Horas')
+    _dibujar_tabla_resumen(fig.add_subplot(gs[2, 0]), agregados['resumen_data'], agregados['headers_resumen'],
+                           loc='upper center', bbox=[0, 0.3, 1, 0.7], escala=2.2)
+    _dibujar_tendencias(fig.add_subplot(gs[3, 0]), agregados)
+    
+    fig.savefig(ruta, dpi=150, bbox_inches='tight', facecolor='white', edgecolor='none')
+    plt.close(fig)
+    print(f"[OK] Dashboard completo guardado: {ruta.name}")
+    return ruta
+
+def renderizar_parte1a(agregados: dict, ruta: Path) -> Path:
+    """Imagen 1A: KPIs + Tabla detallada GAM"""
+    tabla_data_gam = [fila for fila in agregados['tabla_data'] if fila[0] == 'GAM']
+    
+    fig = plt.figure(figsize=(20, 12), dpi=120, facecolor='white')
+    fig.suptitle('Tablero de Monitor de Guias - Detalle GAM',
+                 fontsize=20, fontweight='bold', y=0.98, color='#333')
+    gs = GridSpec(2, 1, figure=fig, hspace=0.2, height_ratios=[0.15, 0.85],
+                  top=0.96, bottom=0.02, left=0.05, right=0.97)
+    
+    _dibujar_kpis(fig.add_subplot(gs[0, 0]), agregados['kpis_valores'])
+    _dibujar_tabla_detalle(fig.add_subplot(gs[1, 0]), tabla_data_gam, agregados['headers'],
+                           escala=2.0, titulo='Horas - GAM')
+    
+    fig.savefig(ruta, dpi=150, bbox_inches='tight', facecolor='white')
+    plt.close(fig)
+    print(f"[OK] Imagen 1A guardada: {ruta.name}")
+    return ruta
+
+def renderizar_parte1b(agregados: dict, ruta: Path) -> Path:
+    """Imagen 1B: KPIs + Tabla detallada RURAL + CT"""
+    tabla_data_resto = [fila for fila in agregados['tabla_data'] if fila[0] in ['RURAL', 'RURAL 3', 'CT01', 'CT02']]
+    
+    fig = plt.figure(figsize=(20, 14), dpi=120, facecolor='white')
+    fig.suptitle('Tablero de Monitor de Guias - Detalle RURAL y CT',
+                 fontsize=20, fontweight='bold', y=0.98, color='#333')
+    gs = GridSpec(2, 1, figure=fig, hspace=0.2, height_ratios=[0.12, 0.88],
+                  top=0.96, bottom=0.02, left=0.05, right=0.97)
     
-    print(f"[OK] Dashboard completo guardado: {output_path.name}")
+    _dibujar_kpis(fig.add_subplot(gs[0, 0]), agregados['kpis_valores'])
+    _dibujar_tabla_detalle(fig.add_subplot(gs[1, 0]), tabla_data_resto, agregados['headers'],
+                           escala=1.8, titulo='Horas - RURAL y CT')
     
-    # ==================== GENERAR 4 IMÁGENES SEPARADAS ====================
-    print("[PROCESO] Generando imagenes separadas...")
+    fig.savefig(ruta, dpi=150, bbox_inches='tight', facecolor='white')
+    plt.close(fig)
+    print(f"[OK] Imagen 1B guardada: {ruta.name}")
+    return ruta
+
+def renderizar_parte2(agregados: dict, ruta: Path) -> Path:
+    """Imagen 2: Tabla resumen completa (GAM, RURAL, CT01, CT02)"""
+    fig = plt.figure(figsize=(20, 6), dpi=120, facecolor='white')
+    fig.suptitle('Tablero de Monitor de Guias - Resumen por Region',
+                 fontsize=20, fontweight='bold', y=0.95, color='#333')
+    
+    _dibujar_tabla_resumen(fig.add_subplot(111), agregados['resumen_data'], agregados['headers_resumen'],
+                           loc='center', bbox=[0, 0, 1, 0.8], escala=2.5)
+    
+    fig.savefig(ruta, dpi=150, bbox_inches='tight', facecolor='white')
+    plt.close(fig)
+    print(f"[OK] Imagen 2 guardada: {ruta.name}")
+    return ruta
+
+def renderizar_parte3(agregados: dict, ruta: Path) -> Path:
+    """Imagen 3: Gráfico de tendencias"""
+    fig = plt.figure(figsize=(16, 10), dpi=120, facecolor='white')
+    fig.suptitle('Tablero de Monitor de Guias - Tendencias',
+                 fontsize=20, fontweight='bold', y=0.96, color='#333')
+    
+    _dibujar_tendencias(fig.add_subplot(111), agregados)
+    
+    fig.savefig(ruta, dpi=150, bbox_inches='tight', facecolor='white')
+    plt.close(fig)
+    print(f"[OK] Imagen 3 guardada: {ruta.name}")
+    return ruta
+
+# Imágenes separadas (para WhatsApp/correo) y su nombre de archivo
+IMAGENES_SEPARADAS = [
+    (renderizar_parte1a, "dashboard_parte1a_detalle_gam.png"),
+    (renderizar_parte1b, "dashboard_parte1b_detalle_rural_ct.png"),
+    (renderizar_parte2, "dashboard_parte2_resumen.png"),
+    (renderizar_parte3, "dashboard_parte3_tendencias.png")
+]
+
+# Sección de la plantilla HTML que corresponde a cada imagen separada
+SECCIONES_HTML = {
+    "dashboard_parte1a_detalle_gam.png": "#parte1a",
+    "dashboard_parte1b_detalle_rural_ct.png": "#parte1b",
+    "dashboard_parte2_resumen.png": "#parte2",
+    "dashboard_parte3_tendencias.png": "#parte3"
+}
+
+# ==================== RENDERIZADO HTML/SVG ====================
+
+def construir_contexto_html(agregados: dict) -> dict:
+    """Convierte los agregados a tipos simples (serializables a JSON) para la plantilla HTML"""
+    stats_por_region = agregados['stats_por_region']
+    pivot_region_tabla = agregados['pivot_region_tabla']
+    horas_resumen = [str(h) for h in pivot_region_tabla.columns]
+    
+    # Gráfico de tendencias como SVG (sin CT02, igual que en matplotlib)
+    ancho, alto = 1560, 480
+    x0, x1, y1, y0 = 70, ancho - 20, 40, alto - 70
+    series_valores = [
+        (region, [int(v) for v in pivot_region_tabla.loc[region].values])
+        for region in REGIONES_ORDEN
+        if region != 'CT02' and region in pivot_region_tabla.index
+    ]
+    maximo = max([max(valores) for _, valores in series_valores if valores] + [1]) * 1.1
+    paso_x = (x1 - x0) / max(len(horas_resumen), 1)
+    
+    def punto(i, valor):
+        x = round(x0 + (i + 0.5) * paso_x, 1)
+        y = round(y0 - valor / maximo * (y0 - y1), 1)
+        return {'x': x, 'y': y, 'xy': f"{x},{y}", 'valor': valor}
+    
+    tendencias = {
+        'ancho': ancho, 'alto': alto, 'x0': x0, 'x1': x1, 'y0': y0, 'y1': y1,
+        'ejes_x': [{'x': round(x0 + (i + 0.5) * paso_x, 1), 'hora': hora} for i, hora in enumerate(horas_resumen)],
+        'lineas_y': [
+            {'y': round(y0 - k / 5 * (y0 - y1), 1), 'valor': int(round(maximo * k / 5))}
+            for k in range(1, 6)
+        ],
+        'series': [
+            {'region': region, 'color': REGIONES_CONFIG[region]['color'],
+             'puntos': [punto(i, valor) for i, valor in enumerate(valores)]}
+            for region, valores in series_valores
+        ],
+        'info': {
+            'vyd': stats_por_region.get('CT02', 0),
+            'spe': stats_por_region.get('CT01', 0),
+            'total': agregados['total_guias']
+        }
+    }
     
-    archivos_generados = [output_path]
+    return {
+        'titulo': 'Tablero de Monitor de Guias',
+        'generado': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'kpis_valores': [
+            {'etiqueta': label, 'valor': int(valor), 'color': COLORES_KPI[label]}
+            for label, valor in agregados['kpis_valores'].items()
+        ],
+        'horas': [str(h) for h in agregados['headers'][2:]],
+        'filas_detalle': [
+            {'region': fila[0], 'zona': str(fila[1]), 'valores': [int(v) for v in fila[2:]]}
+            for fila in agregados['tabla_data']
+        ],
+        'horas_resumen': horas_resumen,
+        'filas_resumen': [
+            {'region': fila[0], 'valores': [int(v) for v in fila[1:]]}
+            for fila in agregados['resumen_data']
+        ],
+        'tendencias': tendencias
+    }
+
+def renderizar_dashboard_html(agregados: dict, output_path: Path, rasterizar: bool = True):
+    """
+    Genera el dashboard como HTML/SVG desde la plantilla de templates/ y guarda
+    su contexto en JSON para que la aplicación web lo muestre.
+    
+    Si rasterizar es True captura además el PNG completo y las 4 imágenes
+    separadas. Retorna la lista de archivos generados, o None si no se pudo
+    rasterizar (en ese caso se deben generar las imágenes con matplotlib).
+    """
+    inicio = time.perf_counter()
     output_dir = output_path.parent
+    contexto = construir_contexto_html(agregados)
     
-    # Separar tabla_data por región
-    tabla_data_gam = [fila for fila in tabla_data if fila[0] == 'GAM']
-    tabla_data_resto = [fila for fila in tabla_data if fila[0] in ['RURAL', 'RURAL 3', 'CT01', 'CT02']]
-    
-    # IMAGEN 1A: KPIs + Tabla Detallada GAM
-    print("[IMAGEN 1A] KPIs + Tabla detallada GAM...")
-    fig1a = plt.figure(figsize=(20, 12), dpi=120, facecolor='white')
-    fig1a.suptitle('Tablero de Monitor de Guias - Detalle GAM', 
-                  fontsize=20, fontweight='bold', y=0.98, color='#333')
-    gs1a = GridSpec(2, 1, figure=fig1a, hspace=0.2, height_ratios=[0.15, 0.85],
-                   top=0.96, bottom=0.02, left=0.05, right=0.97)
-    
-    # KPIs
-    ax1a_kpis = fig1a.add_subplot(gs1a[0, 0])
-    ax1a_kpis.axis('off')
-    for i, (label, valor) in enumerate(kpis_valores.items()):
-        x_pos = start_x + (i * spacing)
-        rect = mpatches.FancyBboxPatch((x_pos, 0.15), box_width, box_height,
-                                        boxstyle="round,pad=0.02",
-                                        facecolor=colores_kpi[label],
-                                        edgecolor='white', linewidth=2, alpha=0.9,
-                                        transform=ax1a_kpis.transAxes)
-        ax1a_kpis.add_patch(rect)
-        ax1a_kpis.text(x_pos + box_width/2, 0.7, label,
-                     ha='center', va='center', fontsize=14, fontweight='bold',
-                     color='white', transform=ax1a_kpis.transAxes)
-        ax1a_kpis.text(x_pos + box_width/2, 0.4, str(valor),
-                     ha='center', va='center', fontsize=22, fontweight='bold',
-                     color='white', transform=ax1a_kpis.transAxes)
-    
-    # Tabla Detallada GAM
-    ax1a_tabla = fig1a.add_subplot(gs1a[1, 0])
-    ax1a_tabla.axis('off')
-    if tabla_data_gam:
-        tabla1a = ax1a_tabla.table(cellText=tabla_data_gam, colLabels=headers,
-                                cellLoc='center', loc='upper center', bbox=[0, 0, 1, 1])
-        tabla1a.auto_set_font_size(False)
-        tabla1a.set_fontsize(10)
-        tabla1a.scale(1, 2.0)
-        for i in range(len(headers)):
-            tabla1a[(0, i)].set_facecolor('#4CAF50')
-            tabla1a[(0, i)].set_text_props(weight='bold', color='white', fontsize=11)
-        for i in range(1, len(tabla_data_gam) + 1):
-            tabla1a[(i, 0)].set_facecolor('#E8F5E9')
-            tabla1a[(i, 0)].set_text_props(weight='bold', fontsize=10)
-            tabla1a[(i, 1)].set_facecolor('#F1F8E9')
-            tabla1a[(i, 1)].set_text_props(weight='bold', fontsize=10)
-            for j in range(2, len(headers)):
-                tabla1a[(i, j)].set_text_props(weight='bold', fontsize=11)
-                if i % 2 == 0:
-                    tabla1a[(i, j)].set_facecolor('#FAFAFA')
-    ax1a_tabla.text(0.5, 1.02, 'Horas - GAM', ha='center', va='bottom',
-                  fontsize=16, fontweight='bold', transform=ax1a_tabla.transAxes)
-    
-    imagen1a_path = output_dir / "dashboard_parte1a_detalle_gam.png"
-    plt.savefig(imagen1a_path, dpi=150, bbox_inches='tight', facecolor='white')
-    plt.close()
-    archivos_generados.append(imagen1a_path)
-    print(f"[OK] Imagen 1A guardada: {imagen1a_path.name}")
-    
-    # IMAGEN 1B: KPIs + Tabla Detallada RURAL + CT
-    print("[IMAGEN 1B] KPIs + Tabla detallada RURAL + CT...")
-    fig1b = plt.figure(figsize=(20, 14), dpi=120, facecolor='white')
-    fig1b.suptitle('Tablero de Monitor de Guias - Detalle RURAL y CT', 
-                  fontsize=20, fontweight='bold', y=0.98, color='#333')
-    gs1b = GridSpec(2, 1, figure=fig1b, hspace=0.2, height_ratios=[0.12, 0.88],
-                   top=0.96, bottom=0.02, left=0.05, right=0.97)
-    
-    # KPIs
-    ax1b_kpis = fig1b.add_subplot(gs1b[0, 0])
-    ax1b_kpis.axis('off')
-    for i, (label, valor) in enumerate(kpis_valores.items()):
-        x_pos = start_x + (i * spacing)
-        rect = mpatches.FancyBboxPatch((x_pos, 0.15), box_width, box_height,
-                                        boxstyle="round,pad=0.02",
-                                        facecolor=colores_kpi[label],
-                                        edgecolor='white', linewidth=2, alpha=0.9,
-                                        transform=ax1b_kpis.transAxes)
-        ax1b_kpis.add_patch(rect)
-        ax1b_kpis.text(x_pos + box_width/2, 0.7, label,
-                     ha='center', va='center', fontsize=14, fontweight='bold',
-                     color='white', transform=ax1b_kpis.transAxes)
-        ax1b_kpis.text(x_pos + box_width/2, 0.4, str(valor),
-                     ha='center', va='center', fontsize=22, fontweight='bold',
-                     color='white', transform=ax1b_kpis.transAxes)
-    
-    # Tabla Detallada RURAL + CT
-    ax1b_tabla = fig1b.add_subplot(gs1b[1, 0])
-    ax1b_tabla.axis('off')
-    if tabla_data_resto:
-        tabla1b = ax1b_tabla.table(cellText=tabla_data_resto, colLabels=headers,
-                                cellLoc='center', loc='upper center', bbox=[0, 0, 1, 1])
-        tabla1b.auto_set_font_size(False)
-        tabla1b.set_fontsize(10)
-        tabla1b.scale(1, 1.8)
-        for i in range(len(headers)):
-            tabla1b[(0, i)].set_facecolor('#4CAF50')
-            tabla1b[(0, i)].set_text_props(weight='bold', color='white', fontsize=11)
-        for i in range(1, len(tabla_data_resto) + 1):
-            tabla1b[(i, 0)].set_facecolor('#E8F5E9')
-            tabla1b[(i, 0)].set_text_props(weight='bold', fontsize=10)
-            tabla1b[(i, 1)].set_facecolor('#F1F8E9')
-            tabla1b[(i, 1)].set_text_props(weight='bold', fontsize=10)
-            for j in range(2, len(headers)):
-                tabla1b[(i, j)].set_text_props(weight='bold', fontsize=11)
-                if i % 2 == 0:
-                    tabla1b[(i, j)].set_facecolor('#FAFAFA')
-    ax1b_tabla.text(0.5, 1.02, 'Horas - RURAL y CT', ha='center', va='bottom',
-                  fontsize=16, fontweight='bold', transform=ax1b_tabla.transAxes)
-    
-    imagen1b_path = output_dir / "dashboard_parte1b_detalle_rural_ct.png"
-    plt.savefig(imagen1b_path, dpi=150, bbox_inches='tight', facecolor='white')
-    plt.close()
-    archivos_generados.append(imagen1b_path)
-    print(f"[OK] Imagen 1B guardada: {imagen1b_path.name}")
-    
-    # IMAGEN 2: Tabla Resumen Completa (GAM, RURAL, CT01, CT02)
-    print("[IMAGEN 2] Tabla resumen completa...")
-    fig2 = plt.figure(figsize=(20, 6), dpi=120, facecolor='white')
-    fig2.suptitle('Tablero de Monitor de Guias - Resumen por Region', 
-                  fontsize=20, fontweight='bold', y=0.95, color='#333')
-    ax2 = fig2.add_subplot(111)
-    ax2.axis('off')
-    
-    if resumen_data:
-        tabla2 = ax2.table(cellText=resumen_data, colLabels=headers_resumen,
-                          cellLoc='center', loc='center', bbox=[0, 0, 1, 0.8])
-        tabla2.auto_set_font_size(False)
-        tabla2.set_fontsize(11)
-        tabla2.scale(1, 2.5)
-        for i in range(len(headers_resumen)):
-            tabla2[(0, i)].set_facecolor('#2196F3')
-            tabla2[(0, i)].set_text_props(weight='bold', color='white', fontsize=12)
-        for i in range(1, len(resumen_data) + 1):
-            tabla2[(i, 0)].set_facecolor('#E3F2FD')
-            tabla2[(i, 0)].set_text_props(weight='bold', fontsize=11)
-            for j in range(1, len(headers_resumen)):
-                tabla2[(i, j)].set_text_props(weight='bold', fontsize=12)
-                if i % 2 == 0:
-                    tabla2[(i, j)].set_facecolor('#F5F5F5')
+    ruta_html = output_path.with_suffix('.html')
+    ruta_html.write_text(renderizar_plantilla(PLANTILLA_HTML, incluir_partes=False, **contexto), encoding='utf-8')
+    with open(output_dir / ARCHIVO_CONTEXTO_HTML, 'w', encoding='utf-8') as f:
+        json.dump(contexto, f, ensure_ascii=False)
+    print(f"[TIEMPO] HTML generado en {(time.perf_counter() - inicio) * 1000:.0f} ms: {ruta_html.name}")
     
-    imagen2_path = output_dir / "dashboard_parte2_resumen.png"
-    plt.savefig(imagen2_path, dpi=150, bbox_inches='tight', facecolor='white')
-    plt.close()
-    archivos_generados.append(imagen2_path)
-    print(f"[OK] Imagen 2 guardada: {imagen2_path.name}")
+    if not rasterizar:
+        return [ruta_html]
     
-    # IMAGEN 3: Gráfico de Tendencias
-    print("[IMAGEN 3] Grafico de tendencias...")
-    fig3 = plt.figure(figsize=(16, 10), dpi=120, facecolor='white')
-    fig3.suptitle('Tablero de Monitor de Guias - Tendencias', 
-                  fontsize=20, fontweight='bold', y=0.96, color='#333')
-    ax3 = fig3.add_subplot(111)
+    capturas = {'#completo': output_path}
+    capturas.update({seccion: output_dir / nombre for nombre, seccion in SECCIONES_HTML.items()})
     
-    # Excluir CT02 del gráfico
-    regiones_para_grafico = [r for r in REGIONES_ORDEN if r != 'CT02']
+    inicio = time.perf_counter()
+    html_partes = renderizar_plantilla(PLANTILLA_HTML, incluir_partes=True, **contexto)
+    if not rasterizar_html(html_partes, capturas):
+        return None
+    print(f"[TIEMPO] {len(capturas)} imagenes rasterizadas en {time.perf_counter() - inicio:.1f}s")
     
-    for region in regiones_para_grafico:
-        if region in pivot_region_tabla.index:
-            horas = pivot_region_tabla.columns
-            valores = pivot_region_tabla.loc[region].values
-            color = REGIONES_CONFIG[region]['color']
-            
-            # Dibujar línea
-            ax3.plot(horas, valores, marker='o', linewidth=2, markersize=6,
-                    color=color, label=region, alpha=0.9)
-            
-            # Agregar valores en cada punto
-            for i, (hora, valor) in enumerate(zip(horas, valores)):
-                ax3.text(i, valor, str(int(valor)), 
-                        ha='center', va='bottom', fontsize=9, 
-                        fontweight='bold', color=color)
+    return list(capturas.values()) + [ruta_html]
+
+def generar_dashboard(df: pd.DataFrame, output_path: Path, max_procesos: int = MAX_PROCESOS_RENDER,
+                      forzar: bool = False, renderizador: str = 'matplotlib', rasterizar: bool = True):
+    """
+    Genera el dashboard estilo Tablero de Monitor de Guías y sus imágenes separadas.
     
-    ax3.set_xlabel('Hora', fontsize=13, fontweight='bold')
-    ax3.set_ylabel('Cantidad', fontsize=13, fontweight='bold')
-    ax3.set_title('Tendencias por Región (GAM, RURAL, CT01)', fontsize=16, fontweight='bold', pad=15)
-    ax3.legend(loc='upper left', fontsize=12, framealpha=0.9, prop={'weight': 'bold'})
-    ax3.grid(True, alpha=0.3, linestyle='--')
-    plt.setp(ax3.xaxis.get_majorticklabels(), rotation=45, ha='right', fontsize=11, weight='bold')
-    plt.setp(ax3.yaxis.get_majorticklabels(), fontsize=11, weight='bold')
+    Si los conteos zona x hora son los mismos de la ejecución anterior (según el
+    manifiesto) se reutilizan las imágenes existentes, salvo que forzar sea True.
     
-    # Agregar margen superior para que los valores no se corten
-    ylim = ax3.get_ylim()
-    ax3.set_ylim(ylim[0], ylim[1] * 1.1)
+    Con renderizador='html' el dashboard se genera como HTML/SVG y solo se
+    rasteriza a PNG si rasterizar es True (con matplotlib como respaldo).
+    """
     
-    info_text = f"VYD {stats_por_region.get('CT02', 0)}\nSPE {stats_por_region.get('CT01', 0)}\nTotal {total_guias}"
-    ax3.text(0.02, 0.05, info_text, transform=ax3.transAxes,
-            fontsize=11, fontweight='bold', verticalalignment='bottom',
-            bbox=dict(boxstyle='round,pad=0.5', facecolor='white', alpha=0.8, edgecolor='gray'))
+    print("[PROCESO] Generando dashboard Tablero de Monitor de Guias...")
+    inicio = time.perf_counter()
     
-    imagen3_path = output_dir / "dashboard_parte3_tendencias.png"
-    plt.savefig(imagen3_path, dpi=150, bbox_inches='tight', facecolor='white')
-    plt.close()
-    archivos_generados.append(imagen3_path)
-    print(f"[OK] Imagen 3 guardada: {imagen3_path.name}")
+    agregados = calcular_agregados(df)
     
-    print("[EXITO] Dashboard completo + 4 imagenes separadas generadas exitosamente")
+    output_dir = output_path.parent
+    ruta_manifiesto = output_dir / ARCHIVO_MANIFIESTO
+    variante = '' if renderizador == 'matplotlib' else f"{renderizador}-{'png' if rasterizar else 'solo'}"
+    hash_agregados = calcular_hash_agregados(agregados['pivot_detallado'], agregados['pivot_region_tabla'],
+                                             variante=variante)
+    
+    archivos_previos = None if forzar else imagenes_vigentes(ruta_manifiesto, hash_agregados)
+    if archivos_previos:
+        print("[CACHE] Los conteos zona x hora no cambiaron, se reutilizan las imagenes anteriores")
+        if archivos_previos[0].suffix == output_path.suffix and archivos_previos[0] != output_path.resolve():
+            shutil.copy2(archivos_previos[0], output_path)
+            archivos_previos[0] = output_path
+            registrar_imagenes(ruta_manifiesto, hash_agregados, archivos_previos)
+        return archivos_previos
+    
+    if renderizador == 'html':
+        archivos_generados = renderizar_dashboard_html(agregados, output_path, rasterizar)
+        if archivos_generados is not None:
+            registrar_imagenes(ruta_manifiesto, hash_agregados, archivos_generados)
+            print(f"[EXITO] Dashboard HTML generado en {time.perf_counter() - inicio:.1f}s")
+            return archivos_generados
+        print("[INFO] Se generan las imagenes con matplotlib")
+    
+    trabajos = [(renderizar_dashboard_completo, agregados, output_path)]
+    trabajos += [(funcion, agregados, output_dir / nombre) for funcion, nombre in IMAGENES_SEPARADAS]
+    
+    print(f"[PROCESO] Renderizando {len(trabajos)} imagenes ({max_procesos} procesos)...")
+    archivos_generados = renderizar_imagenes(trabajos, max_procesos)
+    registrar_imagenes(ruta_manifiesto, hash_agregados, archivos_generados)
+    
+    print(f"[EXITO] Dashboard completo + 4 imagenes separadas generadas en {time.perf_counter() - inicio:.1f}s")
     print("  - Imagen 1A: Detalle GAM")
     print("  - Imagen 1B: Detalle RURAL + CT")
     print("  - Imagen 2: Resumen completo")
@@ -623,6 +650,14 @@ def main():
     parser = argparse.ArgumentParser(description='Genera dashboard Tablero de Monitor de Guías')
     parser.add_argument('--archivo', required=True, help='Ruta al archivo Excel procesado')
     parser.add_argument('--output', help='Ruta de salida para la imagen (opcional)')
+    parser.add_argument('--procesos', type=int, default=MAX_PROCESOS_RENDER,
+                        help='Procesos para renderizar las imagenes en paralelo (1 = secuencial)')
+    parser.add_argument('--forzar', action='store_true',
+                        help='Regenerar las imagenes aunque los datos no hayan cambiado')
+    parser.add_argument('--renderizador', choices=['matplotlib', 'html'], default='matplotlib',
+                        help='Motor de renderizado (html usa la plantilla de templates/)')
+    parser.add_argument('--solo-html', action='store_true',
+                        help='Con --renderizador html, no rasterizar las imagenes PNG')
     
     args = parser.parse_args()
     
@@ -644,7 +679,8 @@ def main():
         df = leer_excel_procesado(archivo_excel)
         print(f"[OK] Datos cargados: {len(df)} guias")
         
-        archivos_generados = generar_dashboard(df, output_path)
+        archivos_generados = generar_dashboard(df, output_path, args.procesos, args.forzar,
+                                               args.renderizador, not args.solo_html)
         
         print("=" * 70)
         print("[EXITO] Dashboard generado exitosamente")
@@ -14,7 +14,6 @@ from __future__ import annotations
 import os
 import sys
 import smtplib
-import re
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.image import MIMEImage
@@ -36,7 +35,9 @@ try:
     from configuracion_regiones import (
         REGIONES_CONFIG,
         ZONAS_RURAL,
-        mapear_zona_a_region as mapear_zona
+        mapear_zona_a_region as mapear_zona,
+        mapear_serie,
+        extraer_hora_serie
     )
     print("[OK] Configuracion de regiones cargada")
 except ImportError:
@@ -59,6 +60,19 @@ except ImportError:
             return 'CT02'
         else:
             return 'SIN_ZONA'
+    
+    def mapear_serie(serie: pd.Series) -> pd.Series:
+        """Mapea una columna completa de zonas a su grupo correspondiente."""
+        return serie.map(mapear_zona)
+    
+    def extraer_hora_serie(serie: pd.Series) -> pd.Series:
+        """Extrae la hora ('HH:00') de una columna de horas; None si no es válida."""
+        horas = pd.to_datetime(serie.astype(str).str.strip(), format='mixed', errors='coerce').dt.hour
+        return horas.map(lambda h: f"{int(h):02d}:00", na_action='ignore').astype(object).where(horas.notna(), None)
+
+from renderizado_dashboards import (buscar_manifiesto_de_imagen, envio_pendiente, registrar_envio,
+                                    destinatarios_pendientes, preparar_imagenes_para_canal)
+from envio_notificaciones import CanalSMTP, despachar
 
 def cargar_configuracion_email() -> dict:
     """Carga configuración de email desde credentials.ini o variables de entorno."""
@@ -118,32 +132,7 @@ def leer_excel_procesado(xlsx_path: Path) -> pd.DataFrame:
         df['Zona'] = df.iloc[:, columna_zona_idx]
         
         # Extraer hora de la columna I
-        def extraer_hora(val):
-            """Extrae la hora de diferentes formatos posibles."""
-            if pd.isna(val):
-                return None
-            val_str = str(val).strip()
-            if not val_str or val_str == 'nan':
-                return None
-            
-            # Intentar parsear como datetime
-            try:
-                dt = pd.to_datetime(val_str, errors='coerce')
-                if pd.notna(dt):
-                    return dt.strftime('%H:00')
-            except:
-                pass
-            
-            # Buscar patrones HH:MM o HH:MM:SS en strings
-            match = re.search(r'(\d{1,2}):(\d{2})', val_str)
-            if match:
-                hora = int(match.group(1))
-                if 0 <= hora <= 23:
-                    return f"{hora:02d}:00"
-            
-            return None
-        
-        df['Hora'] = df.iloc[:, columna_hora_idx].apply(extraer_hora)
+        df['Hora'] = extraer_hora_serie(df.iloc[:, columna_hora_idx])
         
         # Filtrar filas con hora válida
         df = df[df['Hora'].notna()].copy()
@@ -153,22 +142,14 @@ def leer_excel_procesado(xlsx_path: Path) -> pd.DataFrame:
         
         # Filtro columna F: solo valores que inicien con '1'
         # Normalizar y comparar inicio con '1' (manejo de números y strings)
-        def inicia_con_uno(val) -> bool:
-            """Verifica si el valor inicia con '1'."""
-            if pd.isna(val):
-                return False
-            val_str = str(val).strip()
-            return val_str.startswith('1')
-        
-        # Aplicar filtro de columna F
         columna_f = df.iloc[:, columna_viaje_idx]
-        df = df[columna_f.apply(inicia_con_uno)].copy()
+        df = df[columna_f.notna() & columna_f.astype(str).str.strip().str.startswith('1')].copy()
         
         if df.empty:
             raise ValueError("No se encontraron filas donde la columna F inicie con '1'")
         
         # Mapear zona
-        df['Zona_Grupo'] = df['Zona'].apply(mapear_zona)
+        df['Zona_Grupo'] = mapear_serie(df['Zona'])
         
         # Limpiar datos - eliminar filas sin zona válida
         df = df[df['Zona_Grupo'] != 'SIN_ZONA'].copy()
@@ -182,7 +163,7 @@ def leer_excel_procesado(xlsx_path: Path) -> pd.DataFrame:
 
 def contar_por_zona_y_hora(df: pd.DataFrame) -> pd.DataFrame:
     """Cuenta las líneas por zona agrupada y por hora."""
-    conteo = df.groupby(['Zona_Grupo', 'Hora']).size().reset_index(name='Cantidad')
+    conteo = df.groupby(['Zona_Grupo', 'Hora'], observed=True).size().reset_index(name='Cantidad')
     return conteo
 
 # Función eliminada - ya no se generan gráficos individuales
@@ -191,7 +172,7 @@ def contar_por_zona_y_hora(df: pd.DataFrame) -> pd.DataFrame:
 def crear_resumen_html(conteo_df: pd.DataFrame) -> str:
     """Crea un resumen HTML con estadísticas."""
     total_lineas = conteo_df['Cantidad'].sum()
-    resumen_por_zona = conteo_df.groupby('Zona_Grupo')['Cantidad'].sum().sort_values(ascending=False)
+    resumen_por_zona = conteo_df.groupby('Zona_Grupo', observed=True)['Cantidad'].sum().sort_values(ascending=False)
     
     html = f"""
     <html>
@@ -251,31 +232,39 @@ def crear_resumen_html(conteo_df: pd.DataFrame) -> str:
     
     return html
 
-def enviar_correo(email_config: dict, rutas_graficos: List[Path], resumen_html: str, excel_path: Optional[Path] = None) -> bool:
-    """Envía correo con gráficos adjuntos."""
+def enviar_correo(email_config: dict, rutas_graficos: List[Path], resumen_html: str, excel_path: Optional[Path] = None,
+                  destinatarios: Optional[List[str]] = None) -> List[str]:
+    """
+    Envía correo con gráficos adjuntos a los destinatarios indicados (por
+    defecto, todos los de email_to).
+    
+    Returns:
+        Destinatarios que el servidor aceptó (vacío si no se pudo enviar)
+    """
     if not email_config.get('email_from'):
         print("ERROR: No se configuró 'email_from' en credentials.ini")
         print("Por favor agrega en la sección [EMAIL]:")
         print("  email_from = tu_email@gmail.com")
-        return False
+        return []
     
-    if not email_config.get('email_to'):
+    destinatarios = list(destinatarios if destinatarios is not None else email_config.get('email_to', []))
+    if not destinatarios:
         print("ERROR: No se configuró 'email_to' en credentials.ini")
         print("Por favor agrega en la sección [EMAIL]:")
         print("  email_to = destinatario@correo.com")
-        return False
+        return []
     
     if not email_config.get('email_password'):
         print("ERROR: No se configuró 'email_password' en credentials.ini")
         print("Por favor agrega en la sección [EMAIL]:")
         print("  email_password = tu_app_password")
-        return False
+        return []
     
     try:
         # Crear mensaje
         msg = MIMEMultipart('related')
         msg['From'] = email_config['email_from']
-        msg['To'] = ', '.join(email_config['email_to'])
+        msg['To'] = ', '.join(destinatarios)
         msg['Subject'] = f"Dashboard Monitor de Guias - Analisis Regional - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
         
         # Agregar HTML
@@ -285,6 +274,8 @@ def enviar_correo(email_config: dict, rutas_graficos: List[Path], resumen_html:
         
         # Adjuntar gráficos
         # El dashboard ya está al inicio de rutas_graficos si existe
+        # Se adjuntan las variantes comprimidas que caben en el presupuesto del correo
+        rutas_graficos = preparar_imagenes_para_canal([r for r in rutas_graficos if r.exists()], 'email')
         total_adjuntos = 0
         for i, ruta_grafico in enumerate(rutas_graficos):
             if ruta_grafico.exists():
@@ -315,41 +306,33 @@ def enviar_correo(email_config: dict, rutas_graficos: List[Path], resumen_html:
                 msg.attach(part)
             print(f"OK: Excel adjuntado: {excel_path.name}")
         
-        # Enviar correo
-        print(f"[EMAIL] Conectando al servidor SMTP: {email_config['smtp_server']}:{email_config['smtp_port']}")
-        server = smtplib.SMTP(email_config['smtp_server'], email_config['smtp_port'])
-        
-        print("[EMAIL] Iniciando TLS...")
-        server.starttls()
-        
-        print(f"[EMAIL] Autenticando con: {email_config['email_from']}")
-        server.login(email_config['email_from'], email_config['email_password'])
-        
-        print("[EMAIL] Enviando mensaje...")
-        server.send_message(msg)
-        server.quit()
+        # Un solo envío SMTP para todos; solo se reintentan los rechazados
+        canal = CanalSMTP(email_config['smtp_server'], email_config['smtp_port'],
+                          usuario=email_config['email_from'], password=email_config['email_password'])
+        resultados = despachar(canal, destinatarios, msg)
         
-        print(f"[EMAIL] [OK] Correo enviado exitosamente a: {', '.join(email_config['email_to'])}")
-        return True
+        enviados = [r.destinatario for r in resultados if r.exito]
+        if len(enviados) < len(resultados):
+            print(f"[EMAIL] ERROR: Correo enviado a {len(enviados)} de {len(resultados)} destinatario(s)")
+            if any('autenticación' in (r.error or '') for r in resultados):
+                print(f"  Verifica que el email_password sea correcto (App Password de Gmail)")
+        else:
+            print(f"[EMAIL] [OK] Correo enviado exitosamente a: {', '.join(enviados)}")
+        return enviados
         
-    except smtplib.SMTPAuthenticationError as e:
-        print(f"[EMAIL] ERROR: Error de autenticación SMTP")
-        print(f"  Verifica que el email_password sea correcto (App Password de Gmail)")
-        print(f"  Error detallado: {e}")
-        return False
     except smtplib.SMTPException as e:
         print(f"[EMAIL] ERROR: Error SMTP al enviar correo")
         print(f"  Error detallado: {e}")
-        return False
+        return []
     except Exception as e:
         print(f"[EMAIL] ERROR: Error inesperado al enviar correo")
         print(f"  Tipo de error: {type(e).__name__}")
         print(f"  Mensaje: {e}")
         import traceback
         traceback.print_exc()
-        return False
+        return []
 
-def main(xlsx_path: Optional[Path] = None, enviar_email: bool = True) -> int:
+def main(xlsx_path: Optional[Path] = None, enviar_email: bool = True, forzar_envio: bool = False) -> int:
     """Función principal."""
     try:
         # Determinar ruta del archivo Excel
@@ -404,8 +387,14 @@ def main(xlsx_path: Optional[Path] = None, enviar_email: bool = True) -> int:
         # Crear resumen HTML
         resumen_html = crear_resumen_html(conteo_df)
         
+        # Si las imágenes del dashboard ya se enviaron (mismos conteos), no reenviar
+        ruta_manifiesto = buscar_manifiesto_de_imagen(rutas_graficos[0]) if rutas_graficos else None
+        omitir_envio = enviar_email and not forzar_envio and not envio_pendiente(ruta_manifiesto, 'email')
+        
         # Enviar correo
-        if enviar_email:
+        if omitir_envio:
+            print("[EMAIL] Los datos no cambiaron desde el último envío, se omite el correo (usar --forzar-envio)")
+        elif enviar_email:
             print("\n[EMAIL] Preparando envío de correo...")
             email_config = cargar_configuracion_email()
             
@@ -417,10 +406,23 @@ def main(xlsx_path: Optional[Path] = None, enviar_email: bool = True) -> int:
             print(f"  Imágenes adjuntas: {len(rutas_graficos)}")
             print(f"  Excel adjunto: {'Sí' if xlsx_path and xlsx_path.exists() else 'No'}")
             
-            resultado_email = enviar_correo(email_config, rutas_graficos, resumen_html, excel_path=xlsx_path)
+            # Tras un envío parcial solo se reenvía a quienes no lo recibieron
+            destinatarios = email_config.get('email_to', [])
+            if not forzar_envio:
+                destinatarios = destinatarios_pendientes(ruta_manifiesto, 'email', destinatarios)
+                if len(destinatarios) < len(email_config.get('email_to', [])):
+                    print(f"[EMAIL] Pendientes de un envío parcial anterior: {', '.join(destinatarios)}")
+            
+            enviados = enviar_correo(email_config, rutas_graficos, resumen_html, excel_path=xlsx_path,
+                                     destinatarios=destinatarios)
             
-            if resultado_email:
+            if enviados and len(enviados) == len(destinatarios):
+                registrar_envio(ruta_manifiesto, 'email')
                 print("[EMAIL]  Correo enviado exitosamente")
+            elif enviados:
+                registrar_envio(ruta_manifiesto, 'email', destinatarios=enviados)
+                print("[EMAIL]  Correo enviado solo a una parte de los destinatarios; "
+                      "los demás se reintentan en la próxima ejecución")
             else:
                 print("[EMAIL]  No se pudo enviar el correo")
         else:
@@ -440,8 +442,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Genera reporte con gráficos por zona y hora")
     parser.add_argument("--archivo", type=str, help="Ruta al archivo Excel procesado")
     parser.add_argument("--no-email", action="store_true", help="No enviar correo")
+    parser.add_argument("--forzar-envio", action="store_true", help="Enviar el correo aunque los datos no hayan cambiado")
     args = parser.parse_args()
     
     xlsx_path = Path(args.archivo) if args.archivo else None
-    sys.exit(main(xlsx_path, enviar_email=not args.no_email))
+    sys.exit(main(xlsx_path, enviar_email=not args.no_email, forzar_envio=args.forzar_envio))
 
@@ -30,6 +30,9 @@ PARENT_DIR = SCRIPT_DIR.parent  # scripts/sap/
 REPORTES_DIR = PARENT_DIR / "Reportes_Ultima_Hora"
 if str(REPORTES_DIR) not in sys.path:
     sys.path.insert(0, str(REPORTES_DIR))
+sys.path.insert(0, str(PARENT_DIR.resolve().parent / "utilidades"))
+
+from escritura_excel import escribir_excel
 
 def load_credentials() -> dict:
     """Carga credenciales desde credentials.ini ubicado junto a este script.
@@ -280,7 +283,7 @@ def process_tab_file(input_path: Path, output_path: Path) -> None:
         
         # Guardar como Excel
         ensure_dir(output_path.parent)
-        df.to_excel(output_path, index=False, header=False, engine="openpyxl")
+        escribir_excel(output_path, df, header=False)
         logger.info(f"[OK] Archivo procesado y guardado: {output_path}")
     except Exception as e:
         raise RuntimeError(f"Error al procesar archivo tabulado: {e}")
@@ -357,7 +360,7 @@ def save_to_historical_file(xlsx_path: Path, output_dir: Path) -> None:
             df_combined = df_current
         
         # Guardar el archivo histórico
-        df_combined.to_excel(historico_path, index=False, header=False, engine="openpyxl")
+        escribir_excel(historico_path, df_combined, header=False)
         logger.info(f"[OK] Histórico guardado: {historico_path}")
         logger.info(f"[INFO] Total de registros en histórico: {len(df_combined)}")
         logger.info(f"[INFO] Nueva ejecución agregada: {fecha_ejecucion}")
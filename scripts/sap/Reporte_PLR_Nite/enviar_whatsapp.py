@@ -11,7 +11,15 @@ import argparse
 import configparser
 from pathlib import Path
 from datetime import datetime
-import time
+
+# Manifiesto de imágenes del dashboard (para no reenviar datos sin cambios)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from renderizado_dashboards import (buscar_manifiesto_de_imagen, envio_pendiente, registrar_envio,
+                                    preparar_imagen_para_canal)
+from envio_notificaciones import CanalWhatsApp, CanalWhatsAppSimulado, despachar
+
+# Pausa entre envíos con pywhatkit (cada envío abre una pestaña de WhatsApp Web)
+PAUSA_ENTRE_ENVIOS = 5
 
 def load_whatsapp_config():
     """Carga la configuración de WhatsApp desde credentials.ini"""
@@ -124,8 +132,10 @@ def main():
     parser.add_argument('--imagen', required=True, help='Ruta a la imagen del reporte')
     parser.add_argument('--numeros', help='Numeros separados por coma (ej: +50612345678,+50687654321)')
     parser.add_argument('--mensaje', default='Reporte PLR NITE', help='Mensaje a enviar')
-    parser.add_argument('--metodo', choices=['pywhatkit', 'web', 'manual'], 
+    parser.add_argument('--metodo', choices=['pywhatkit', 'web', 'manual', 'simulado'], 
                        default='manual', help='Metodo de envio')
+    parser.add_argument('--forzar', action='store_true',
+                       help='Enviar aunque la imagen ya se haya enviado con los mismos datos')
     
     args = parser.parse_args()
     
@@ -141,6 +151,12 @@ def main():
     print(f"[IMAGEN] {imagen_path}")
     print(f"[TAMAÑO] {imagen_path.stat().st_size / 1024:.1f} KB")
     
+    ruta_manifiesto = buscar_manifiesto_de_imagen(imagen_path)
+    if not args.forzar and not envio_pendiente(ruta_manifiesto, 'whatsapp'):
+        print("[OMITIDO] Los datos no cambiaron desde el ultimo envio (usar --forzar)")
+        print("=" * 60)
+        return 0
+    
     # Cargar configuración
     config = load_whatsapp_config()
     
@@ -163,26 +179,34 @@ def main():
     if config and config['mensaje']:
         mensaje = config['mensaje']
     
+    # Variante comprimida y reducida para móvil (el manifiesto sigue siendo el de la original)
+    imagen_envio = preparar_imagen_para_canal(imagen_path, 'whatsapp')
+    
     print(f"[METODO] {metodo}")
     print(f"[DESTINATARIOS] {len(numeros)} numero(s)")
     print("=" * 60)
     
     # Enviar según método
-    exitos = 0
-    for numero in numeros:
+    if metodo == 'manual':
+        # Una sola instrucción para todo el lote de destinatarios
+        exitos = len(numeros) if enviar_manual(imagen_envio, numeros, mensaje) else 0
+    else:
         if metodo == 'pywhatkit':
-            if enviar_con_pywhatkit(imagen_path, numero, mensaje):
-                exitos += 1
-                time.sleep(5)  # Esperar entre envíos
+            canal = CanalWhatsApp(enviar_con_pywhatkit, pausa_entre_envios=PAUSA_ENTRE_ENVIOS)
+            reintentos = 2
         elif metodo == 'web':
-            if enviar_con_whatsapp_web(imagen_path, numero, mensaje):
-                exitos += 1
-        elif metodo == 'manual':
-            if enviar_manual(imagen_path, [numero], mensaje):
-                exitos += 1
+            canal = CanalWhatsApp(enviar_con_whatsapp_web)
+            reintentos = 0  # Envío interactivo: no reintentar
+        else:
+            canal = CanalWhatsAppSimulado()
+            reintentos = 2
+        resultados = despachar(canal, numeros, (imagen_envio, mensaje), reintentos=reintentos)
+        exitos = sum(1 for r in resultados if r.exito)
     
     print("=" * 60)
     if exitos == len(numeros):
+        if metodo != 'simulado':
+            registrar_envio(ruta_manifiesto, 'whatsapp')
         print(f"[EXITO] Reporte enviado a {exitos} destinatario(s)")
     else:
         print(f"[PARCIAL] Enviado a {exitos} de {len(numeros)} destinatario(s)")
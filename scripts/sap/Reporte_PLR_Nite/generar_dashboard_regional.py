@@ -9,6 +9,7 @@ Descripción:
 """
 
 import sys
+import shutil
 import argparse
 from pathlib import Path
 from datetime import datetime
@@ -32,6 +33,7 @@ try:
         REGIONES_CONFIG,
         REGIONES_ORDEN,
         mapear_zona_a_region,
+        mapear_serie,
         obtener_color_region,
         obtener_nombre_region
     )
@@ -58,6 +60,20 @@ except ImportError as e:
                 return region
         return 'GAM'
 
+    def mapear_serie(serie):
+        return serie.map(mapear_zona_a_region)
+
+from renderizado_dashboards import (
+    renderizar_imagenes,
+    calcular_hash_agregados,
+    imagenes_vigentes,
+    registrar_imagenes,
+    MAX_PROCESOS_RENDER
+)
+
+# Manifiesto de las imágenes generadas (junto al dashboard)
+ARCHIVO_MANIFIESTO = "manifiesto_dashboard_plr.json"
+
 def leer_excel_procesado(xlsx_path: Path) -> pd.DataFrame:
     """Lee el archivo Excel procesado de PLR NITE"""
     try:
@@ -86,7 +102,7 @@ def leer_excel_procesado(xlsx_path: Path) -> pd.DataFrame:
             df['Hora'] = '12:00'  # Por defecto, ajustar si tienes columna de hora
         
         # Mapear zona a región
-        df['Region'] = df['Zona'].apply(mapear_zona_a_region)
+        df['Region'] = mapear_serie(df['Zona'])
         df = df[df['Region'] != 'SIN_ZONA'].copy()
         
         if df.empty:
@@ -121,24 +137,60 @@ def crear_kpi_card(ax, titulo, valor, porcentaje, color):
     ax.set_xlim(0, 1)
     ax.set_ylim(0, 1)
 
-def generar_dashboard(df: pd.DataFrame, output_path: Path):
-    """Genera el dashboard completo para PLR NITE"""
-    
-    print("[PROCESO] Generando dashboard regional PLR NITE...")
-    
+def crear_grafico_zona(ax, region_name, df_region_data, color_region):
+    """Crea el gráfico de barras por zona de una región"""
+    if df_region_data.empty:
+        ax.text(0.5, 0.5, f'No hay datos para {region_name}',
+               ha='center', va='center', transform=ax.transAxes,
+               fontsize=14, color='gray')
+        ax.axis('off')
+        return
+    
+    df_sorted = df_region_data.sort_values('Cantidad', ascending=True)
+    bars = ax.barh(df_sorted['Zona'], df_sorted['Cantidad'],
+                  color=color_region, alpha=0.8)
+    
+    ax.set_title(f'{region_name} - Distribucion por Zona',
+                fontsize=14, fontweight='bold', pad=15, color='#333',
+                bbox=dict(boxstyle='round,pad=0.5', facecolor=color_region, alpha=0.3))
+    ax.set_xlabel('Cantidad', fontsize=11, fontweight='bold')
+    ax.grid(axis='x', alpha=0.3, linestyle='--')
+    
+    # Agregar valores
+    for bar, val in zip(bars, df_sorted['Cantidad']):
+        ax.text(val, bar.get_y() + bar.get_height()/2.,
+               f' {val:,}', ha='left', va='center',
+               fontsize=10, fontweight='bold')
+
+def calcular_agregados(df: pd.DataFrame) -> dict:
+    """Calcula una sola vez las estadísticas que usa el dashboard"""
     # Calcular estadísticas
     total_guias = len(df)
-    stats_por_region = df.groupby('Region').size().to_dict()
-    stats_por_zona = df.groupby(['Region', 'Zona']).size().reset_index(name='Cantidad')
+    stats_por_region = df.groupby('Region', observed=True).size().to_dict()
+    stats_por_zona = df.groupby(['Region', 'Zona'], observed=True).size().reset_index(name='Cantidad')
     
     # Si hay columna de hora, calcular stats por hora
     if 'Hora' in df.columns:
-        stats_por_hora = df.groupby(['Region', 'Hora']).size().reset_index(name='Cantidad')
-        stats_zona_hora = df.groupby(['Region', 'Zona', 'Hora']).size().reset_index(name='Cantidad')
+        stats_por_hora = df.groupby(['Region', 'Hora'], observed=True).size().reset_index(name='Cantidad')
+        stats_zona_hora = df.groupby(['Region', 'Zona', 'Hora'], observed=True).size().reset_index(name='Cantidad')
     else:
         stats_por_hora = pd.DataFrame()
         stats_zona_hora = pd.DataFrame()
     
+    return {
+        'total_guias': total_guias,
+        'stats_por_region': stats_por_region,
+        'stats_por_zona': stats_por_zona,
+        'stats_por_hora': stats_por_hora,
+        'stats_zona_hora': stats_zona_hora
+    }
+
+def renderizar_dashboard(agregados: dict, output_path: Path) -> Path:
+    """Dibuja y guarda el dashboard a partir de los agregados"""
+    total_guias = agregados['total_guias']
+    stats_por_region = agregados['stats_por_region']
+    stats_por_zona = agregados['stats_por_zona']
+    
     # Crear figura
     fig = plt.figure(figsize=(24, 20), dpi=120, facecolor='#f5f5f5')
     fig.suptitle('DASHBOARD PLR NITE - ANALISIS REGIONAL POR ZONA',
@@ -180,31 +232,6 @@ def generar_dashboard(df: pd.DataFrame, output_path: Path):
     # ==================== FILAS 3-5: DISTRIBUCIÓN POR ZONA ====================
     print("[TABLA] Generando distribucion por zona...")
     
-    # Función para crear gráfico de barras por zona
-    def crear_grafico_zona(ax, region_name, df_region_data, color_region):
-        if df_region_data.empty:
-            ax.text(0.5, 0.5, f'No hay datos para {region_name}',
-                   ha='center', va='center', transform=ax.transAxes,
-                   fontsize=14, color='gray')
-            ax.axis('off')
-            return
-        
-        df_sorted = df_region_data.sort_values('Cantidad', ascending=True)
-        bars = ax.barh(df_sorted['Zona'], df_sorted['Cantidad'],
-                      color=color_region, alpha=0.8)
-        
-        ax.set_title(f'{region_name} - Distribucion por Zona',
-                    fontsize=14, fontweight='bold', pad=15, color='#333',
-                    bbox=dict(boxstyle='round,pad=0.5', facecolor=color_region, alpha=0.3))
-        ax.set_xlabel('Cantidad', fontsize=11, fontweight='bold')
-        ax.grid(axis='x', alpha=0.3, linestyle='--')
-        
-        # Agregar valores
-        for bar, val in zip(bars, df_sorted['Cantidad']):
-            ax.text(val, bar.get_y() + bar.get_height()/2.,
-                   f' {val:,}', ha='left', va='center',
-                   fontsize=10, fontweight='bold')
-    
     # RURAL
     ax_rural = fig.add_subplot(gs[2, :2])
     datos_rural = stats_por_zona[stats_por_zona['Region'] == 'RURAL']
@@ -266,17 +293,49 @@ def generar_dashboard(df: pd.DataFrame, output_path: Path):
     
     # Guardar
     print(f"[GUARDANDO] Guardando dashboard en: {output_path}")
-    plt.savefig(output_path, dpi=150, bbox_inches='tight',
+    fig.savefig(output_path, dpi=150, bbox_inches='tight',
                 facecolor='#f5f5f5', edgecolor='none')
-    plt.close()
+    plt.close(fig)
     
     print(f"[OK] Dashboard guardado exitosamente")
     return output_path
 
+def generar_dashboard(df: pd.DataFrame, output_path: Path, max_procesos: int = MAX_PROCESOS_RENDER,
+                      forzar: bool = False):
+    """
+    Genera el dashboard completo para PLR NITE.
+    
+    Si los conteos por zona son los mismos de la ejecución anterior (según el
+    manifiesto) se reutiliza la imagen existente, salvo que forzar sea True.
+    """
+    
+    print("[PROCESO] Generando dashboard regional PLR NITE...")
+    
+    agregados = calcular_agregados(df)
+    
+    ruta_manifiesto = output_path.parent / ARCHIVO_MANIFIESTO
+    hash_agregados = calcular_hash_agregados(agregados['stats_por_zona'], agregados['stats_zona_hora'])
+    
+    archivos_previos = None if forzar else imagenes_vigentes(ruta_manifiesto, hash_agregados)
+    if archivos_previos:
+        print("[CACHE] Los conteos por zona no cambiaron, se reutiliza el dashboard anterior")
+        if archivos_previos[0] != output_path.resolve():
+            shutil.copy2(archivos_previos[0], output_path)
+            registrar_imagenes(ruta_manifiesto, hash_agregados, [output_path])
+        return output_path
+    
+    resultado = renderizar_imagenes([(renderizar_dashboard, agregados, output_path)], max_procesos)[0]
+    registrar_imagenes(ruta_manifiesto, hash_agregados, [resultado])
+    return resultado
+
 def main():
     parser = argparse.ArgumentParser(description='Genera dashboard regional para PLR NITE')
     parser.add_argument('--archivo', required=True, help='Ruta al archivo Excel procesado')
     parser.add_argument('--output', help='Ruta de salida para la imagen (opcional)')
+    parser.add_argument('--procesos', type=int, default=MAX_PROCESOS_RENDER,
+                        help='Procesos para renderizar las imagenes en paralelo (1 = secuencial)')
+    parser.add_argument('--forzar', action='store_true',
+                        help='Regenerar el dashboard aunque los datos no hayan cambiado')
     
     args = parser.parse_args()
     
@@ -298,7 +357,7 @@ def main():
         df = leer_excel_procesado(archivo_excel)
         print(f"[OK] Datos cargados: {len(df)} registros")
         
-        resultado = generar_dashboard(df, output_path)
+        resultado = generar_dashboard(df, output_path, args.procesos, args.forzar)
         
         print("=" * 70)
         print("[EXITO] Dashboard generado exitosamente")
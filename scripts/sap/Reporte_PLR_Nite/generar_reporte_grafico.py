@@ -6,16 +6,23 @@ Descripción:
   - Crea una imagen estilo dashboard con múltiples gráficos
   - Optimizado para enviar por WhatsApp
   - Similar al dashboard de Power BI
+  - Los KPIs salen de un único agregado (CEDIS x región x canal x fuerza de
+    ventas x estatus) que se guarda en parquet junto al Excel
 """
 import sys
+import json
+import hashlib
 import argparse
 from pathlib import Path
 from datetime import datetime
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 from matplotlib.gridspec import GridSpec
 import seaborn as sns
+import numpy as np
 import warnings
 
 warnings.filterwarnings('ignore')
@@ -24,6 +31,10 @@ warnings.filterwarnings('ignore')
 plt.style.use('seaborn-v0_8-darkgrid')
 sns.set_palette("husl")
 
+# Importar configuración centralizada de regiones
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from configuracion_regiones import REGIONES_CONFIG, mapear_serie
+
 # Colores corporativos
 COLOR_PRIMARY = '#1f77b4'    # Azul
 COLOR_SECONDARY = '#ff7f0e'  # Naranja
@@ -32,6 +43,68 @@ COLOR_DANGER = '#d62728'     # Rojo
 COLOR_INFO = '#17becf'       # Cyan
 COLOR_WARNING = '#bcbd22'    # Amarillo-verde
 
+# Columnas del reporte REP_PLR_NITE (se usa la primera que exista)
+COLUMNAS_REPORTE = {
+    'cedis': ['Centro', 'CEDIS', 'Cedis'],
+    'zona': ['Zona Vtas', 'Zona', 'Desc Zona Vtas'],
+    'macro_canal': ['Macro Canal', 'Macrocanal'],
+    'fuerza_ventas': ['Fuerza Ventas', 'Fuerza de Ventas'],
+    'region_venta': ['Region', 'Región'],
+    'estatus': ['Estatus Planificación', 'Estatus Planificacion', 'Estatus Plan'],
+    'guia': ['Guia Entrega', 'Guía Entrega', 'Guia'],
+    'viaje': ['Viaje', 'Ruta Dist.'],
+    'cajas_fisicas': ['Cajas Físicas', 'Cajas Fisicas'],
+    'cajas_equiv': ['Cajas Equiv.', 'Cajas Equivalentes'],
+}
+
+# Dimensiones y métricas del agregado
+DIMENSIONES_AGREGADO = ['CEDIS', 'Region', 'Macro Canal', 'Fuerza Ventas', 'Estatus']
+METRICAS_AGREGADO = ['Cajas Físicas', 'Cajas Equiv.']
+
+ESTATUS_PLANIFICACION = ['EN GUIA', 'EN MAPA', 'NO PLANIFICADO']
+SIN_DATO = 'SIN DATO'
+
+# El reporte REP_PLR no trae 'Macro Canal': el canal sale de la fuerza de
+# ventas ('FV Moderno', 'FV Tradicional GAM', ...), buscando estos textos en orden
+CANAL_POR_FUERZA_VENTAS = [
+    ('MODERNO', 'MODERNO'),
+    ('INDIRECT', 'INDIRECTO'),
+    ('DISTRIBUID', 'INDIRECTO'),
+    ('TRADICIONAL', 'TRADICIONAL'),
+    ('COMMERCE', 'E-COMMERCE'),
+    ('CUENTA CLAVE', 'CUENTA CLAVE'),
+]
+CANAL_OTROS = 'OTROS'
+
+# Canal del segundo comparativo por CEDIS (junto a MODERNO); si el reporte no
+# trae ventas de ese canal se usa el de respaldo
+CANAL_COMPARATIVO = 'INDIRECTO'
+CANAL_COMPARATIVO_RESPALDO = 'TRADICIONAL'
+
+# Si tampoco hay fuerza de ventas, el canal sale del código de región de
+# ventas (las demás regiones son de la fuerza de ventas tradicional)
+CANAL_POR_REGION_VENTA = {'RMD': 'MODERNO', 'ECM': 'E-COMMERCE', 'RCC': 'CUENTA CLAVE'}
+CANAL_REGION_DEFECTO = 'TRADICIONAL'
+
+# Capacidad de cada CD en cajas equivalentes, por código de CEDIS tal como
+# viene en la columna Centro (parámetro, no viene en el reporte)
+CAPACIDAD_CD = {
+    'CD01': 54000,  # GAM
+    'CD06': 14400,  # LIB
+    'CD07': 9000,   # NIC
+    'CD08': 10500,  # PUN
+    'CD04': 9000,   # SCA
+    'CD13': 8700,   # SIS
+    'CD10': 5700,   # CNL
+    'CD03': 11500,  # GUA
+    'CD14': 6200,   # LIM
+    'CT01': 30000,  # HA
+}
+
+# Versión del cálculo del agregado: subirla cuando cambie calcular_agregado()
+# para que no se reutilice un agregado en caché calculado con la lógica anterior
+VERSION_AGREGADO = 2
+
 def formato_miles(valor):
     """Formatea valores a formato 'K' (miles)"""
     if valor >= 1000:
@@ -48,9 +121,10 @@ def leer_datos_excel(archivo_excel):
         print(f"[INFO] Dimensiones: {df.shape[0]} filas x {df.shape[1]} columnas")
         print(f"[INFO] Primeras columnas: {list(df.columns[:5])}")
         
-        # Si la primera fila tiene nombres, úsala como encabezado
-        if df.iloc[0].dtype == 'object':
-            df.columns = df.iloc[0]
+        # Si la primera fila tiene los nombres de columna, úsala como encabezado
+        primera_fila = df.iloc[0].astype(str).str.strip()
+        if primera_fila.isin(COLUMNAS_REPORTE['cedis']).any():
+            df.columns = primera_fila
             df = df[1:].reset_index(drop=True)
             print(f"[OK] Encabezados detectados: {list(df.columns[:5])}")
         
@@ -83,54 +157,191 @@ def crear_kpi_card(ax, titulo, valor, color):
     ax.set_xlim(0, 1)
     ax.set_ylim(0, 1)
 
-def generar_datos_ejemplo(df):
+def _buscar_columna(df, clave):
+    """Retorna el nombre de la primera columna candidata que exista en el DataFrame (o None)"""
+    for candidata in COLUMNAS_REPORTE[clave]:
+        if candidata in df.columns:
+            return candidata
+    return None
+
+def _texto(serie):
+    """Normaliza una columna de texto (vacíos y nulos como SIN DATO)"""
+    texto = serie.astype(str).str.strip().str.upper()
+    return texto.mask(serie.isna() | texto.isin(['', 'NAN', 'NONE']), SIN_DATO)
+
+def _numero(serie):
+    """Convierte una columna a número (el Excel de SAP trae texto con espacios y separador de miles)"""
+    if serie.dtype.kind in 'iuf':
+        return serie.fillna(0)
+    texto = serie.astype(str).str.strip().str.replace(',', '', regex=False)
+    return pd.to_numeric(texto, errors='coerce').fillna(0)
+
+def _canal(df, columnas):
+    """
+    Macro canal de cada fila: la columna 'Macro Canal' si existe; si no, se
+    deriva de la fuerza de ventas o, en último caso, de la región de ventas.
+    """
+    if columnas['macro_canal'] is not None:
+        return _texto(df[columnas['macro_canal']])
+    
+    if columnas['fuerza_ventas'] is not None:
+        fuerza = _texto(df[columnas['fuerza_ventas']])
+        condiciones = [fuerza.str.contains(clave, regex=False) for clave, _ in CANAL_POR_FUERZA_VENTAS]
+        canal = np.select(condiciones, [c for _, c in CANAL_POR_FUERZA_VENTAS], default=CANAL_OTROS)
+        return pd.Series(canal, index=df.index).mask(fuerza.eq(SIN_DATO), SIN_DATO)
+    
+    if columnas['region_venta'] is not None:
+        region = _texto(df[columnas['region_venta']])
+        canal = region.map(CANAL_POR_REGION_VENTA).fillna(CANAL_REGION_DEFECTO)
+        return canal.mask(region.eq(SIN_DATO), SIN_DATO)
+    
+    return pd.Series(SIN_DATO, index=df.index)
+
+def calcular_agregado(df):
+    """
+    Agrega el reporte en una sola pasada: suma de cajas físicas y equivalentes
+    por CEDIS x región x macro canal x fuerza de ventas x estatus de planificación.
+    
+    El estatus sale de la columna de estatus de planificación si existe; si no,
+    se deriva: con guía de entrega = EN GUIA, con viaje/ruta = EN MAPA y el
+    resto NO PLANIFICADO. El macro canal se deriva como se indica en _canal().
+    """
+    df.columns = [str(c).strip() for c in df.columns]
+    
+    columnas = {clave: _buscar_columna(df, clave) for clave in COLUMNAS_REPORTE}
+    faltantes = [clave for clave in ('cedis', 'cajas_fisicas', 'cajas_equiv') if columnas[clave] is None]
+    if faltantes:
+        raise ValueError(f"No se encontraron las columnas requeridas: {faltantes} (columnas: {list(df.columns)})")
+    
+    base = pd.DataFrame({'CEDIS': _texto(df[columnas['cedis']])})
+    
+    if columnas['zona'] is not None:
+        base['Region'] = mapear_serie(df[columnas['zona']]).astype(str)
+    else:
+        base['Region'] = mapear_serie(df[columnas['cedis']]).astype(str)
+    
+    base['Macro Canal'] = _canal(df, columnas)
+    base['Fuerza Ventas'] = df[columnas['fuerza_ventas']].astype(str).str.strip() if columnas['fuerza_ventas'] else SIN_DATO
+    
+    if columnas['estatus'] is not None:
+        base['Estatus'] = _texto(df[columnas['estatus']])
+    else:
+        con_guia = _texto(df[columnas['guia']]).ne(SIN_DATO) if columnas['guia'] else False
+        con_viaje = _texto(df[columnas['viaje']]).ne(SIN_DATO) if columnas['viaje'] else False
+        base['Estatus'] = np.select([con_guia, con_viaje], ['EN GUIA', 'EN MAPA'], default='NO PLANIFICADO')
+    
+    base['Cajas Físicas'] = _numero(df[columnas['cajas_fisicas']])
+    base['Cajas Equiv.'] = _numero(df[columnas['cajas_equiv']])
+    
+    agregado = base.groupby(DIMENSIONES_AGREGADO, observed=True, sort=False)[METRICAS_AGREGADO].sum().reset_index()
+    print(f"[OK] Agregado calculado: {len(df)} filas -> {len(agregado)} grupos")
+    return agregado
+
+def firma_calculo_agregado():
+    """
+    Huella de la lógica del agregado: su versión y la configuración que usa
+    (columnas, regiones y reglas de canal).
+    """
+    configuracion = {
+        'columnas': COLUMNAS_REPORTE,
+        'regiones': {region: datos['zonas'] for region, datos in REGIONES_CONFIG.items()},
+        'canal_fuerza_ventas': CANAL_POR_FUERZA_VENTAS,
+        'canal_otros': CANAL_OTROS,
+        'canal_region_venta': CANAL_POR_REGION_VENTA,
+        'canal_region_defecto': CANAL_REGION_DEFECTO,
+    }
+    huella = hashlib.md5(json.dumps(configuracion, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+    return f"v{VERSION_AGREGADO}-{huella}"
+
+def cargar_agregado(archivo_excel):
     """
-    Genera datos de ejemplo basados en el DataFrame.
-    NOTA: Esta función debe ser adaptada según la estructura real de tus datos.
+    Retorna el agregado del reporte, usando el parquet en caché si se generó a
+    partir de la misma versión del Excel (mismo tamaño y fecha de modificación)
+    y con la misma lógica de agregación (firma_calculo_agregado).
     """
-    # Si el DataFrame está vacío o no tiene los datos esperados,
-    # generamos datos de ejemplo para demostración
+    archivo_excel = Path(archivo_excel)
+    ruta_cache = archivo_excel.with_name(f"{archivo_excel.stem}_agregado.parquet")
+    stat = archivo_excel.stat()
+    firma = f"{stat.st_mtime_ns}-{stat.st_size}-{firma_calculo_agregado()}".encode('utf-8')
+    
+    if ruta_cache.exists():
+        tabla = pq.read_table(ruta_cache)
+        if (tabla.schema.metadata or {}).get(b'firma_origen') == firma:
+            print(f"[CACHE] Usando agregado en cache: {ruta_cache.name}")
+            return tabla.to_pandas()
+    
+    agregado = calcular_agregado(leer_datos_excel(archivo_excel))
+    
+    tabla = pa.Table.from_pandas(agregado, preserve_index=False)
+    tabla = tabla.replace_schema_metadata({**(tabla.schema.metadata or {}), b'firma_origen': firma})
+    ruta_temporal = ruta_cache.with_name(f".{ruta_cache.name}.tmp")
+    pq.write_table(tabla, ruta_temporal)
+    ruta_temporal.replace(ruta_cache)
+    print(f"[OK] Agregado guardado en cache: {ruta_cache.name}")
+    return agregado
+
+def construir_datos_reporte(agregado):
+    """Calcula todas las series de los gráficos a partir del agregado"""
+    equiv = 'Cajas Equiv.'
+    fisicas = 'Cajas Físicas'
+    
+    por_region = agregado.groupby('Region')[equiv].sum()
+    por_canal = agregado.groupby('Macro Canal')[equiv].sum()
+    
+    # CEDIS ordenados por ventas (cajas equivalentes)
+    por_cedis = agregado.groupby('CEDIS')[METRICAS_AGREGADO].sum().sort_values(equiv, ascending=False)
+    cedis = list(por_cedis.index)
+    
+    def por_cedis_de(mascara, metrica):
+        return agregado[mascara].groupby('CEDIS')[metrica].sum().reindex(cedis, fill_value=0).tolist()
+    
+    es_moderno = agregado['Macro Canal'].eq('MODERNO')
+    canal_comparativo = CANAL_COMPARATIVO if por_canal.get(CANAL_COMPARATIVO, 0) > 0 else CANAL_COMPARATIVO_RESPALDO
+    es_comparativo = agregado['Macro Canal'].eq(canal_comparativo)
+    
+    por_estatus_cedis = (agregado.groupby(['Estatus', 'CEDIS'])[fisicas].sum()
+                         .unstack(fill_value=0).reindex(index=ESTATUS_PLANIFICACION, columns=cedis, fill_value=0))
+    por_estatus = agregado.groupby('Estatus')[METRICAS_AGREGADO].sum().reindex(ESTATUS_PLANIFICACION, fill_value=0)
     
-    datos = {
+    return {
         'kpis': {
-            'TOTAL VENTA': 176900,
-            'RURAL': 84300,
-            'GAM': 63200,
-            'MODERNO': 45300,
-            'HA': 28200,
+            'TOTAL VENTA': agregado[equiv].sum(),
+            'RURAL': por_region.get('RURAL', 0),
+            'GAM': por_region.get('GAM', 0),
+            'MODERNO': por_canal.get('MODERNO', 0),
+            'HA': por_region.get('CT01', 0),  # HA es CT01 (SPE)
         },
-        'macrocanales': {
-            'OFF ABIERTO': 58000,
-            'ON PREMISE': 44000,
-            'INDIRECTO': 23000,
-            'MODERNO': 20000,
-            'WALMART': 21000,
-            'DERIVAR': 11000,
+        'macrocanales': por_canal.drop(SIN_DATO, errors='ignore').sort_values(ascending=False).to_dict(),
+        'fuerza_ventas': (agregado.groupby('Fuerza Ventas')[equiv].sum()
+                          .drop(SIN_DATO, errors='ignore').sort_values(ascending=False).to_dict()),
+        'cedis': {
+            'nombres': cedis,
+            'ventas': por_cedis[equiv].tolist(),
+            'capacidad': [CAPACIDAD_CD.get(nombre, np.nan) for nombre in cedis],
+            'cajas_fisicas': por_cedis[fisicas].tolist(),
         },
-        'fuerza_ventas': {
-            'FV Tradicional Rural': 79200,
-            'FV Moderno': 45300,
-            'FV Tradicional GAM': 45100,
-            'FV Cuenta Clave ON': 6900,
-            'FV E-Commerce': 400,
+        'moderno': {
+            'cajas_fisicas': por_cedis_de(es_moderno, fisicas),
+            'cajas_equiv': por_cedis_de(es_moderno, equiv),
+        },
+        'comparativo': {
+            'canal': canal_comparativo,
+            'cajas_fisicas': por_cedis_de(es_comparativo, fisicas),
+            'cajas_equiv': por_cedis_de(es_comparativo, equiv),
+        },
+        'estatus_cedis': {estatus: por_estatus_cedis.loc[estatus].tolist() for estatus in ESTATUS_PLANIFICACION},
+        'estatus_pais': {
+            'cajas_fisicas': por_estatus[fisicas].tolist(),
+            'cajas_equiv': por_estatus[equiv].tolist(),
         },
-        'cedis': {
-            'nombres': ['GAM', 'LIB', 'NIC', 'PUN', 'SCA', 'SIS', 'CNL', 'GUA', 'LIM', 'HA'],
-            'ventas': [63300, 18000, 12000, 10300, 12900, 7400, 5900, 12600, 5300, 28200],
-            'capacidad': [54000, 14400, 9000, 10500, 9000, 8700, 5700, 11500, 6200, 30000],
-            'cajas_fisicas': [55300, 15500, 11200, 9500, 11700, 6800, 5000, 11000, 4700, 25300],
-        }
     }
-    
-    return datos
 
-def crear_reporte_completo(df, output_path):
-    """Crea el reporte gráfico completo"""
+def crear_reporte_completo(agregado, output_path):
+    """Crea el reporte gráfico completo a partir del agregado del reporte"""
     
     print("[PROCESO] Generando reporte grafico...")
     
-    # Obtener datos (adaptar según estructura real)
-    datos = generar_datos_ejemplo(df)
+    datos = construir_datos_reporte(agregado)
     
     # Crear figura con tamaño adecuado para WhatsApp
     fig = plt.figure(figsize=(16, 20), dpi=100)
@@ -147,8 +358,10 @@ def crear_reporte_completo(df, output_path):
     colores_kpi = [COLOR_SUCCESS, COLOR_SECONDARY, COLOR_PRIMARY, 
                    COLOR_INFO, COLOR_WARNING]
     
+    # Una columna por KPI (son 5 y la grilla tiene 4)
+    gs_kpis = gs[0, :].subgridspec(1, len(kpis), wspace=0.15)
     for i, (titulo, valor) in enumerate(kpis.items()):
-        ax = fig.add_subplot(gs[0, i % 4])
+        ax = fig.add_subplot(gs_kpis[0, i])
         crear_kpi_card(ax, titulo, valor, colores_kpi[i % len(colores_kpi)])
     
     # ==================== FILA 2: Macrocanales y Fuerza de Ventas ====================
@@ -237,9 +450,8 @@ def crear_reporte_completo(df, output_path):
     x_pos_mod = range(len(cedis_nombres))
     width = 0.35
     
-    # Generar datos de ejemplo para Moderno
-    cajas_fis_mod = [v * 0.4 for v in datos['cedis']['cajas_fisicas']]
-    cajas_equiv_mod = [v * 0.42 for v in datos['cedis']['ventas']]
+    cajas_fis_mod = datos['moderno']['cajas_fisicas']
+    cajas_equiv_mod = datos['moderno']['cajas_equiv']
     
     bars5a = ax5.bar([x - width/2 for x in x_pos_mod], cajas_fis_mod,
                      width, label='Cajas Físicas', color=COLOR_PRIMARY, alpha=0.8)
@@ -254,19 +466,18 @@ def crear_reporte_completo(df, output_path):
     ax5.legend(loc='upper right', fontsize=9)
     ax5.grid(axis='y', alpha=0.3)
     
-    # Indirecto (Cajas Físicas vs Equiv)
+    # Indirecto, o Tradicional si el reporte no trae canal indirecto (Cajas Físicas vs Equiv)
     ax6 = fig.add_subplot(gs[3, 2:])
     
-    # Generar datos de ejemplo para Indirecto
-    cajas_fis_ind = [v * 0.2 for v in datos['cedis']['cajas_fisicas']]
-    cajas_equiv_ind = [v * 0.21 for v in datos['cedis']['ventas']]
+    cajas_fis_ind = datos['comparativo']['cajas_fisicas']
+    cajas_equiv_ind = datos['comparativo']['cajas_equiv']
     
     bars6a = ax6.bar([x - width/2 for x in x_pos_mod], cajas_fis_ind,
                      width, label='Cajas Físicas', color=COLOR_PRIMARY, alpha=0.8)
     bars6b = ax6.bar([x + width/2 for x in x_pos_mod], cajas_equiv_ind,
                      width, label='Cajas Equiv.', color=COLOR_SECONDARY, alpha=0.8)
     
-    ax6.set_title('INDIRECTO - Cajas Físicas vs Equiv.', fontsize=14, fontweight='bold', pad=10)
+    ax6.set_title(f"{datos['comparativo']['canal']} - Cajas Físicas vs Equiv.", fontsize=14, fontweight='bold', pad=10)
     ax6.set_xticks(x_pos_mod)
     ax6.set_xticklabels(cedis_nombres, rotation=45, ha='right', fontsize=9)
     ax6.set_ylabel('Cajas', fontsize=10)
@@ -280,10 +491,9 @@ def crear_reporte_completo(df, output_path):
     # Estatus Planificación por CEDIS (Barras apiladas)
     ax7 = fig.add_subplot(gs[4, :2])
     
-    # Datos de ejemplo para estatus
-    en_guia = [v * 0.95 for v in datos['cedis']['cajas_fisicas']]
-    en_mapa = [v * 0.03 for v in datos['cedis']['cajas_fisicas']]
-    no_plan = [v * 0.02 for v in datos['cedis']['cajas_fisicas']]
+    en_guia = datos['estatus_cedis']['EN GUIA']
+    en_mapa = datos['estatus_cedis']['EN MAPA']
+    no_plan = datos['estatus_cedis']['NO PLANIFICADO']
     
     bars7a = ax7.bar(cedis_nombres, en_guia, label='EN GUIA', 
                      color=COLOR_PRIMARY, alpha=0.8)
@@ -303,9 +513,9 @@ def crear_reporte_completo(df, output_path):
     # Estatus Planificación País (Horizontal)
     ax8 = fig.add_subplot(gs[4, 2:])
     
-    categorias = ['EN GUIA', 'EN MAPA', 'NO PLANIFICADO']
-    cajas_fis_pais = [150400, 6200, 600]
-    cajas_equiv_pais = [163500, 7800, 600]
+    categorias = ESTATUS_PLANIFICACION
+    cajas_fis_pais = datos['estatus_pais']['cajas_fisicas']
+    cajas_equiv_pais = datos['estatus_pais']['cajas_equiv']
     
     y_pos = range(len(categorias))
     bars8a = ax8.barh([y - width/2 for y in y_pos], cajas_fis_pais,
@@ -366,11 +576,11 @@ def main():
         print("[INICIO] Generacion de Reporte Grafico para WhatsApp")
         print("=" * 60)
         
-        # Leer datos
-        df = leer_datos_excel(archivo_excel)
+        # Agregado del reporte (desde caché si el Excel no cambió)
+        agregado = cargar_agregado(archivo_excel)
         
         # Crear reporte
-        resultado = crear_reporte_completo(df, output_path)
+        resultado = crear_reporte_completo(agregado, output_path)
         
         print("=" * 60)
         print("[EXITO] Reporte generado exitosamente")
@@ -26,6 +26,7 @@ SCRIPT_DIR = Path(__file__).parent
 REPORTES_DIR = SCRIPT_DIR / "Reportes_Ultima_Hora"
 if str(REPORTES_DIR) not in sys.path:
     sys.path.insert(0, str(REPORTES_DIR))
+sys.path.insert(0, str(SCRIPT_DIR.resolve().parent / "utilidades"))
 
 # Importar módulos auxiliares desde Reportes_Ultima_Hora
 try:
@@ -58,6 +59,8 @@ except ImportError:
     print("ERROR: No se pudo importar pandas. Instala con: pip install pandas openpyxl")
     sys.exit(1)
 
+from escritura_excel import escribir_excel
+
 # Logging
 LOG_FORMAT = "%(asctime)s | %(levelname)s | %(message)s"
 logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
@@ -353,7 +356,7 @@ def convertir_txt_a_excel(ruta_txt: Path, procesador_nombre: str) -> Path:
         
         # Generar archivo Excel
         ruta_excel = ruta_txt.with_suffix('.xlsx')
-        df_procesado.to_excel(ruta_excel, index=False, header=False, engine='openpyxl')
+        escribir_excel(ruta_excel, df_procesado, header=False)
         
         logger.info(f"  ✓ Excel generado: {ruta_excel.name}")
         return ruta_excel
@@ -24,12 +24,17 @@ Funcionalidades:
 
 import win32com.client
 import os
+import sys
 import time
 import pandas as pd
 import json
 from datetime import datetime, timedelta
+from pathlib import Path
 import logging
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utilidades"))
+from escritura_excel import escribir_excel
+
 # Configuración de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -640,7 +645,7 @@ class AutomatizacionSAP:
             
             # Guardar en múltiples formatos
             try:
-                df.to_excel(excel_path, index=False, engine='openpyxl')
+                escribir_excel(excel_path, df)
                 logger.info(f"[ARCHIVO] Excel guardado: {excel_path}")
             except Exception as e:
                 logger.warning(f"[ADVERTENCIA] Error guardando Excel: {e}")
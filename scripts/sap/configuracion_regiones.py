@@ -6,8 +6,16 @@ Este archivo define la segmentación de zonas por regiones
 para todos los reportes del sistema OTIF Master.
 
 Se importa desde todos los scripts para mantener consistencia.
+
+Benchmark (equivalencia y tiempos de las versiones vectorizadas):
+    python configuracion_regiones.py --benchmark 500000
 """
 
+import re
+import time
+import warnings
+from types import MappingProxyType
+
 # Configuración de regiones y sus zonas (actualizada según datos reales)
 REGIONES_CONFIG = {
     'GAM': {
@@ -49,6 +57,20 @@ ZONA_HA = ZONA_CT01       # Alias (antes SPE era HA, ahora es CT01)
 # Orden de regiones para reportes
 REGIONES_ORDEN = ['RURAL', 'GAM', 'CT01', 'CT02']
 
+# Región asignada a zonas vacías o que no pertenecen a ninguna región
+# (ya no usamos GAM como fallback)
+REGION_SIN_ZONA = 'SIN_ZONA'
+
+# Mapeo zona -> región precalculado al importar (inmutable)
+ZONA_A_REGION = MappingProxyType({
+    zona: region_key
+    for region_key, region_config in REGIONES_CONFIG.items()
+    for zona in region_config['zonas']
+})
+
+# Categorías de la columna de región, en el orden de los reportes
+CATEGORIAS_REGION = tuple(REGIONES_ORDEN) + (REGION_SIN_ZONA,)
+
 def mapear_zona_a_region(zona: str) -> str:
     """
     Mapea una zona individual a su región correspondiente.
@@ -62,18 +84,107 @@ def mapear_zona_a_region(zona: str) -> str:
     import pandas as pd
     
     if pd.isna(zona) or zona == '':
-        return 'SIN_ZONA'
+        return REGION_SIN_ZONA
+    
+    return ZONA_A_REGION.get(str(zona).strip().upper(), REGION_SIN_ZONA)
+
+def mapear_serie(serie):
+    """
+    Mapea una columna completa de zonas a su región.
+    
+    Cada zona distinta se resuelve una sola vez, así que el costo no depende
+    del número de filas sino de la cantidad de zonas diferentes.
+    
+    Args:
+        serie: pd.Series con códigos de zona
+    
+    Returns:
+        pd.Series categórica con categorías CATEGORIAS_REGION (RURAL, GAM,
+        CT01, CT02, SIN_ZONA), mismo índice y nombre que la serie original.
+        Al agrupar por ella usar observed=True.
+    """
+    import numpy as np
+    import pandas as pd
+    
+    codigos, zonas_unicas = pd.factorize(serie)
+    posicion = {region: i for i, region in enumerate(CATEGORIAS_REGION)}
+    
+    # Última posición para los nulos (código -1 en factorize)
+    codigos_region = np.array(
+        [posicion[mapear_zona_a_region(zona)] for zona in zonas_unicas] + [posicion[REGION_SIN_ZONA]],
+        dtype=np.int8
+    )
+    
+    regiones = pd.Categorical.from_codes(codigos_region[codigos], categories=list(CATEGORIAS_REGION))
+    return pd.Series(regiones, index=serie.index, name=serie.name)
+
+# Etiquetas 'HH:00' indexadas por número de hora
+ETIQUETAS_HORA = tuple(f"{h:02d}:00" for h in range(24))
+
+def extraer_hora(valor):
+    """
+    Extrae la hora ('HH:00') de un valor individual de hora o fecha/hora.
+    
+    Returns:
+        'HH:00' o None si el valor no tiene una hora válida
+    """
+    import pandas as pd
+    
+    if pd.isna(valor):
+        return None
+    texto = str(valor).strip()
+    if not texto or texto == 'nan':
+        return None
+    
+    fecha = pd.to_datetime(texto, errors='coerce')
+    if pd.notna(fecha):
+        return ETIQUETAS_HORA[fecha.hour]
     
-    zona_upper = str(zona).strip().upper()
+    coincidencia = re.search(r'(\d{1,2}):(\d{2})', texto)
+    if coincidencia and 0 <= int(coincidencia.group(1)) <= 23:
+        return ETIQUETAS_HORA[int(coincidencia.group(1))]
+    return None
+
+def extraer_hora_serie(serie):
+    """
+    Extrae la hora ('HH:00') de una columna completa de valores de hora.
+    
+    Mismo resultado que aplicar extraer_hora() fila por fila, pero cada valor
+    distinto se procesa una sola vez: primero con el formato típico del
+    reporte (HH:MM:SS), luego con cualquier otro formato de fecha/hora y por
+    último buscando un patrón HH:MM en el texto.
+    
+    Args:
+        serie: pd.Series con horas (time, datetime o texto)
+    
+    Returns:
+        pd.Series con 'HH:00' o None, mismo índice que la serie original
+    """
+    import numpy as np
+    import pandas as pd
+    
+    codigos, unicos = pd.factorize(serie)
+    texto = pd.Series(unicos, dtype=object).astype(str).str.strip()
+    texto = texto.where((texto != '') & (texto != 'nan'))
+    
+    fechas = pd.to_datetime(texto, format='%H:%M:%S', errors='coerce')
+    pendientes = fechas.isna() & texto.notna()
+    if pendientes.any():
+        fechas[pendientes] = pd.to_datetime(texto[pendientes], format='mixed', errors='coerce')
     
-    # Verificar cada región
-    for region_key, region_config in REGIONES_CONFIG.items():
-        if zona_upper in region_config['zonas']:
-            return region_key
+    numero_hora = fechas.dt.hour
     
-    # Si no está en ninguna región, retornar SIN_ZONA
-    # (ya no usamos GAM como fallback)
-    return 'SIN_ZONA'
+    pendientes = numero_hora.isna() & texto.notna()
+    if pendientes.any():
+        numero = pd.to_numeric(texto[pendientes].str.extract(r'(\d{1,2}):(\d{2})', expand=True)[0], errors='coerce')
+        numero_hora[pendientes] = numero.where(numero.between(0, 23))
+    
+    etiquetas = np.full(len(unicos) + 1, None, dtype=object)
+    validas = numero_hora.notna().to_numpy()
+    etiquetas[:-1][validas] = np.array(ETIQUETAS_HORA, dtype=object)[numero_hora[validas].astype(int).to_numpy()]
+    
+    # Los nulos tienen código -1 y toman la última posición (None)
+    return pd.Series(etiquetas[codigos], index=serie.index)
 
 def obtener_color_region(region: str) -> str:
     """Obtiene el color asociado a una región"""
@@ -100,7 +211,76 @@ def mapear_zona(zona: str) -> str:
     """Alias para compatibilidad con scripts antiguos"""
     return mapear_zona_a_region(zona)
 
+# ==================== BENCHMARK ====================
+
+def _datos_benchmark(filas: int):
+    """Columnas de hora y zona con la mezcla de valores que trae el reporte SAP."""
+    import datetime as dt
+    import numpy as np
+    import pandas as pd
+    
+    rng = np.random.default_rng(0)
+    horas = [dt.time(h, m, s) for h, m, s in rng.integers([0, 0, 0], [24, 60, 60], (1500, 3))]
+    valores = (
+        horas
+        + [dt.datetime(2025, 10, 3, t.hour, t.minute) for t in horas[:300]]
+        + [t.strftime('%H:%M:%S') for t in horas[:300]]
+        + [f"{t.hour}:{t.minute:02d}" for t in horas[:300]]
+        + ['25:10', '99:99', 'sin hora', '', ' ', None, np.nan]
+    )
+    zonas = list(ZONA_A_REGION) + [z.lower() for z in ZONA_A_REGION] + [' SJO ', 'EVE', 'TEL', '', None]
+    
+    indice_horas = rng.integers(0, len(valores), filas)
+    indice_zonas = rng.integers(0, len(zonas), filas)
+    return (pd.Series([valores[i] for i in indice_horas], dtype=object),
+            pd.Series([zonas[i] for i in indice_zonas], dtype=object))
+
+def benchmark(filas: int = 500_000) -> bool:
+    """
+    Verifica que las versiones vectorizadas den lo mismo que las de fila por
+    fila y compara tiempos. Retorna True si todos los resultados coinciden.
+    """
+    import pandas as pd
+    
+    horas, zonas = _datos_benchmark(filas)
+    print(f"Benchmark de hora y región: {filas:,} filas")
+    
+    pruebas = [
+        ('extraer_hora', lambda: horas.map(extraer_hora), lambda: extraer_hora_serie(horas)),
+        ('mapear_zona_a_region', lambda: zonas.map(mapear_zona_a_region),
+         lambda: mapear_serie(zonas).astype(object)),
+    ]
+    todo_igual = True
+    for nombre, por_fila, vectorizada in pruebas:
+        with warnings.catch_warnings():
+            # pd.to_datetime avisa en cada valor sin formato reconocible
+            warnings.simplefilter('ignore')
+            inicio = time.perf_counter()
+            esperado = por_fila()
+            segundos_fila = time.perf_counter() - inicio
+            
+            inicio = time.perf_counter()
+            obtenido = vectorizada()
+            segundos_vector = time.perf_counter() - inicio
+        
+        diferentes = esperado.ne(obtenido) & ~(esperado.isna() & obtenido.isna())
+        print(f"  {nombre:<22} fila por fila {segundos_fila:7.2f}s  vectorizado {segundos_vector:6.2f}s"
+              f"  {'[OK] iguales' if not diferentes.any() else f'[ERROR] {int(diferentes.sum())} diferencias'}")
+        if diferentes.any():
+            todo_igual = False
+            print(pd.DataFrame({'esperado': esperado[diferentes], 'obtenido': obtenido[diferentes]}).head(10))
+    return todo_igual
+
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Configuración de regiones y zonas")
+    parser.add_argument("--benchmark", type=int, metavar="FILAS", help="Verificar y medir la extracción de hora y región con N filas")
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        raise SystemExit(0 if benchmark(args.benchmark) else 1)
+    
     # Prueba del módulo
     print("=" * 60)
     print("Configuracion de Regiones y Zonas")
@@ -4,15 +4,33 @@
 Script para convertir archivos XLS a XLSX en la carpeta SAP_Extraction
 Autor: Sistema OTIF
 Fecha: 2025
+
+Los archivos se convierten en paralelo (un proceso por archivo, de todas las
+carpetas a la vez) y cada uno se guarda como XLSX y/o Parquet.
 """
 
+import argparse
 import os
+import sys
 import pandas as pd
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from typing import List, Dict
 import glob
 
+import pyarrow as pa
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utilidades"))
+from escritura_excel import escribir_excel
+
+# Máximo de archivos convertidos a la vez
+MAX_PROCESOS_CONVERSION = min(4, os.cpu_count() or 1)
+
+# Formatos generados por cada archivo convertido ('xlsx' y/o 'parquet')
+FORMATOS_SALIDA = ('xlsx', 'parquet')
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -26,18 +44,26 @@ logging.basicConfig(
 class ConvertidorXLS:
     """Clase para convertir archivos XLS a XLSX"""
     
-    def __init__(self, ruta_base: str = r"C:\data\SAP_Extraction"):
+    def __init__(self, ruta_base: str = r"C:\data\SAP_Extraction",
+                 formatos_salida=FORMATOS_SALIDA, max_procesos: int = MAX_PROCESOS_CONVERSION):
         """
         Inicializar el convertidor
         
         Args:
             ruta_base (str): Ruta base donde están las carpetas con archivos XLS
+            formatos_salida: Formatos a generar ('xlsx' y/o 'parquet')
+            max_procesos (int): Archivos convertidos a la vez (1 = secuencial)
         """
         self.ruta_base = Path(ruta_base)
+        self.formatos_salida = tuple(formatos_salida)
+        self.max_procesos = max_procesos
         self.archivos_procesados = []
         self.errores = []
         self.archivos_movidos = []
         
+        # Estructura del archivo final de cada carpeta (se lee una sola vez)
+        self._estructuras = {}
+        
         # Crear carpeta para archivos XLS convertidos
         self.carpeta_xls_convertidos = self.ruta_base / "XLS_Convertidos"
         self.carpeta_xls_convertidos.mkdir(exist_ok=True)
@@ -67,7 +93,8 @@ class ConvertidorXLS:
     
     def obtener_estructura_archivo_final(self, carpeta: str) -> Dict:
         """
-        Obtener la estructura del archivo final.xlsx de una carpeta
+        Obtener la estructura del archivo final.xlsx de una carpeta.
+        Solo se lee la fila de encabezado (y una fila de ejemplo), una vez por carpeta.
         
         Args:
             carpeta (str): Nombre de la carpeta
@@ -75,6 +102,9 @@ class ConvertidorXLS:
         Returns:
             Dict: Información sobre la estructura del archivo final
         """
+        if carpeta in self._estructuras:
+            return self._estructuras[carpeta]
+        
         carpeta_path = self.ruta_base / carpeta
         
         # Buscar archivos final.xlsx
@@ -82,12 +112,13 @@ class ConvertidorXLS:
         
         if not archivos_final:
             logging.warning(f"No se encontró archivo final.xlsx en {carpeta}")
+            self._estructuras[carpeta] = None
             return None
         
         archivo_final = archivos_final[0]  # Tomar el primero encontrado
         
         try:
-            df_final = pd.read_excel(archivo_final)
+            df_final = pd.read_excel(archivo_final, nrows=1)
             estructura = {
                 'archivo': str(archivo_final),
                 'columnas': list(df_final.columns),
@@ -96,10 +127,12 @@ class ConvertidorXLS:
                 'ejemplo_fila': df_final.iloc[0].to_dict() if len(df_final) > 0 else {}
             }
             logging.info(f"Estructura obtenida de {archivo_final.name}: {len(estructura['columnas'])} columnas")
+            self._estructuras[carpeta] = estructura
             return estructura
             
         except Exception as e:
             logging.error(f"Error leyendo archivo final {archivo_final.name}: {str(e)}")
+            self._estructuras[carpeta] = None
             return None
     
     def adaptar_dataframe_a_estructura(self, df: pd.DataFrame, estructura_final: Dict) -> pd.DataFrame:
@@ -349,26 +382,40 @@ class ConvertidorXLS:
             except Exception as e:
                 raise Exception(f"Error en métodos alternativos: {str(e)}")
 
+    def guardar_parquet(self, df: pd.DataFrame, ruta_parquet: Path):
+        """
+        Guardar el DataFrame como Parquet. Si alguna columna de texto mezcla
+        tipos (números y textos), esas columnas se guardan como texto.
+        """
+        try:
+            df.to_parquet(ruta_parquet, index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            columnas_texto = df.select_dtypes(include='object').columns
+            df = df.astype({col: str for col in columnas_texto})
+            df.to_parquet(ruta_parquet, index=False)
+            logging.info(f"Parquet guardado con {len(columnas_texto)} columnas de tipo mixto como texto")
+
     def convertir_archivo(self, archivo_xls: Path, carpeta_destino: Path, carpeta_nombre: str) -> bool:
         """
-        Convertir un archivo XLS a XLSX
+        Convertir un archivo XLS a XLSX y/o Parquet
         
         Args:
             archivo_xls (Path): Ruta del archivo XLS
-            carpeta_destino (Path): Carpeta donde guardar el XLSX
+            carpeta_destino (Path): Carpeta donde guardar el XLSX / Parquet
             carpeta_nombre (str): Nombre de la carpeta de origen
             
         Returns:
             bool: True si la conversión fue exitosa
         """
         try:
-            # Crear nombre del archivo XLSX
-            nombre_xlsx = archivo_xls.stem + ".xlsx"
-            ruta_xlsx = carpeta_destino / nombre_xlsx
+            # Crear nombre de los archivos de salida
+            ruta_xlsx = carpeta_destino / (archivo_xls.stem + ".xlsx")
+            ruta_parquet = carpeta_destino / (archivo_xls.stem + ".parquet")
             
-            logging.info(f"Convirtiendo {archivo_xls.name} a {nombre_xlsx}")
+            logging.info(f"Convirtiendo {archivo_xls.name} a {', '.join(self.formatos_salida)}")
             
             # Leer el archivo usando el método mejorado
+            formato_detectado = self.detectar_formato_archivo(archivo_xls)
             df = self.leer_archivo_como_dataframe(archivo_xls)
             
             # Obtener estructura del archivo final
@@ -382,16 +429,23 @@ class ConvertidorXLS:
                 df_adaptado = df
                 logging.warning("No se pudo obtener estructura del archivo final, manteniendo estructura original")
             
-            # Guardar como XLSX
-            df_adaptado.to_excel(ruta_xlsx, index=False, engine='openpyxl')
+            # Guardar como XLSX y/o Parquet
+            convertidos = []
+            if 'xlsx' in self.formatos_salida:
+                escribir_excel(ruta_xlsx, df_adaptado)
+                convertidos.append(ruta_xlsx)
+            if 'parquet' in self.formatos_salida:
+                self.guardar_parquet(df_adaptado, ruta_parquet)
+                convertidos.append(ruta_parquet)
             
-            logging.info(f"Archivo convertido exitosamente: {ruta_xlsx}")
+            logging.info(f"Archivo convertido exitosamente: {', '.join(str(r) for r in convertidos)}")
             self.archivos_procesados.append({
                 'original': str(archivo_xls),
-                'convertido': str(ruta_xlsx),
+                'convertido': str(convertidos[0]),
+                'parquet': str(ruta_parquet) if ruta_parquet in convertidos else None,
                 'filas': len(df_adaptado),
                 'columnas': len(df_adaptado.columns),
-                'formato_detectado': self.detectar_formato_archivo(archivo_xls),
+                'formato_detectado': formato_detectado,
                 'estructura_adaptada': estructura_final is not None
             })
             
@@ -439,6 +493,44 @@ class ConvertidorXLS:
             'total': len(archivos_xls)
         }
     
+    def convertir_en_paralelo(self, trabajos: List) -> List[bool]:
+        """
+        Convertir varios archivos en un pool de procesos
+        
+        Args:
+            trabajos (List): Lista de tuplas (nombre_carpeta, archivo_xls)
+            
+        Returns:
+            List[bool]: Resultado de cada trabajo, en el mismo orden
+        """
+        # La estructura de cada carpeta se lee una vez aquí y se envía a los procesos
+        estructuras = {carpeta: self.obtener_estructura_archivo_final(carpeta)
+                       for carpeta in dict.fromkeys(carpeta for carpeta, _ in trabajos)}
+        
+        if self.max_procesos <= 1 or len(trabajos) <= 1:
+            return [self.convertir_archivo(archivo_xls, self.ruta_base / carpeta, carpeta)
+                    for carpeta, archivo_xls in trabajos]
+        
+        try:
+            with ProcessPoolExecutor(max_workers=min(self.max_procesos, len(trabajos))) as executor:
+                futuros = [executor.submit(_convertir_en_proceso, str(self.ruta_base), self.formatos_salida,
+                                           carpeta, archivo_xls, estructuras[carpeta])
+                           for carpeta, archivo_xls in trabajos]
+                resultados = []
+                for futuro in futuros:
+                    exito, procesados, errores, movidos = futuro.result()
+                    self.archivos_procesados.extend(procesados)
+                    self.errores.extend(errores)
+                    self.archivos_movidos.extend(movidos)
+                    resultados.append(exito)
+                return resultados
+        except BrokenProcessPool as e:
+            logging.warning(f"No se pudo convertir en paralelo ({e}), convirtiendo en secuencia")
+            # Los archivos ya convertidos fueron movidos; solo quedan los pendientes
+            return [self.convertir_archivo(archivo_xls, self.ruta_base / carpeta, carpeta)
+                    if archivo_xls.exists() else True
+                    for carpeta, archivo_xls in trabajos]
+    
     def procesar_todos(self) -> Dict:
         """
         Procesar todos los archivos XLS encontrados
@@ -454,13 +546,26 @@ class ConvertidorXLS:
             logging.warning("No se encontraron archivos XLS para procesar")
             return {'total_carpetas': 0, 'total_archivos': 0}
         
+        # Los archivos de todas las carpetas se convierten a la vez
+        trabajos = [(nombre_carpeta, archivo_xls)
+                    for nombre_carpeta, archivos_xls in archivos_por_carpeta.items()
+                    for archivo_xls in archivos_xls]
+        resultados = self.convertir_en_paralelo(trabajos)
+        
         resumen_carpetas = []
         total_archivos = 0
         total_exitosos = 0
         total_fallidos = 0
         
         for nombre_carpeta, archivos_xls in archivos_por_carpeta.items():
-            resumen = self.procesar_carpeta(nombre_carpeta, archivos_xls)
+            exitosos = sum(1 for (carpeta, _), exito in zip(trabajos, resultados)
+                           if carpeta == nombre_carpeta and exito)
+            resumen = {
+                'carpeta': nombre_carpeta,
+                'exitosos': exitosos,
+                'fallidos': len(archivos_xls) - exitosos,
+                'total': len(archivos_xls)
+            }
             resumen_carpetas.append(resumen)
             
             total_archivos += resumen['total']
@@ -514,7 +619,17 @@ class ConvertidorXLS:
         
         print("="*60)
 
-def main():
+def _convertir_en_proceso(ruta_base: str, formatos_salida, carpeta: str, archivo_xls: Path, estructura: Dict):
+    """
+    Convierte un archivo dentro de un proceso del pool (con la estructura del
+    archivo final ya leída) y retorna lo registrado para unirlo en el proceso principal.
+    """
+    convertidor = ConvertidorXLS(ruta_base, formatos_salida=formatos_salida, max_procesos=1)
+    convertidor._estructuras[carpeta] = estructura
+    exito = convertidor.convertir_archivo(archivo_xls, convertidor.ruta_base / carpeta, carpeta)
+    return exito, convertidor.archivos_procesados, convertidor.errores, convertidor.archivos_movidos
+
+def main(formatos_salida=FORMATOS_SALIDA, max_procesos: int = MAX_PROCESOS_CONVERSION):
     """Función principal"""
     try:
         # Verificar que pandas esté instalado
@@ -530,7 +645,7 @@ def main():
             os.system("pip install openpyxl")
         
         # Crear instancia del convertidor
-        convertidor = ConvertidorXLS()
+        convertidor = ConvertidorXLS(formatos_salida=formatos_salida, max_procesos=max_procesos)
         
         # Procesar todos los archivos
         resumen = convertidor.procesar_todos()
@@ -548,4 +663,12 @@ def main():
         print(f"Error: {str(e)}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Convertir los archivos XLS de SAP_Extraction a XLSX / Parquet")
+    parser.add_argument("--solo-parquet", action="store_true",
+                        help="Generar solo Parquet (sin XLSX)")
+    parser.add_argument("--procesos", type=int, default=MAX_PROCESOS_CONVERSION,
+                        help=f"Archivos convertidos a la vez (por defecto {MAX_PROCESOS_CONVERSION}; 1 = secuencial)")
+    args = parser.parse_args()
+
+    main(formatos_salida=('parquet',) if args.solo_parquet else FORMATOS_SALIDA,
+         max_procesos=args.procesos)
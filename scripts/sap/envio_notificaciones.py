@@ -0,0 +1,303 @@
+"""
+Servicio de envío de notificaciones
+Cola de envío por lotes para distribuir los reportes por correo y WhatsApp.
+
+Cada canal sabe abrir y cerrar su conexión una sola vez por lote y enviar un
+mensaje a un destinatario. La función despachar() reparte los destinatarios
+del lote, en paralelo solo si el canal lo permite, reintenta los errores
+transitorios (también al abrir la conexión) con espera exponencial y registra
+la latencia de cada destinatario. Los canales con enviar_lote() mandan el
+mensaje una sola vez para todos y solo se reintentan los destinatarios
+rechazados con un error transitorio.
+
+- CanalSMTP: una sola transacción SMTP (TLS + login) para todos los destinatarios
+- CanalWhatsApp: automatización de WhatsApp Web (un envío a la vez)
+- CanalWhatsAppSimulado: canal de prueba que solo registra los envíos
+"""
+
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Reintentos por destinatario ante errores transitorios
+MAX_REINTENTOS = 3
+
+# Espera antes del primer reintento (se duplica en cada intento)
+ESPERA_BASE_REINTENTO = 2.0
+
+class ErrorEnvioPermanente(Exception):
+    """Error que no se corrige reintentando (destinatario inválido, credenciales...)."""
+
+@dataclass
+class ResultadoEnvio:
+    destinatario: str
+    exito: bool
+    intentos: int
+    latencia_s: float
+    error: Optional[str] = None
+
+# ==================== CANALES ====================
+
+class CanalSMTP:
+    """
+    Envía correos reutilizando una sola conexión SMTP para todo el lote. El
+    mensaje se sube una sola vez con todos los destinatarios (enviar_lote);
+    el servidor informa cuáles rechazó.
+    """
+    nombre = 'email'
+    max_paralelo = 1
+
+    def __init__(self, servidor: str, puerto: int, usuario: Optional[str] = None,
+                 password: Optional[str] = None, usar_tls: bool = True, timeout: float = 30):
+        self.servidor = servidor
+        self.puerto = puerto
+        self.usuario = usuario
+        self.password = password
+        self.usar_tls = usar_tls
+        self.timeout = timeout
+        self._conexion = None
+
+    def abrir(self):
+        print(f"[EMAIL] Conectando al servidor SMTP: {self.servidor}:{self.puerto}")
+        conexion = smtplib.SMTP(self.servidor, self.puerto, timeout=self.timeout)
+        try:
+            if self.usar_tls:
+                conexion.starttls()
+            if self.usuario and self.password:
+                conexion.login(self.usuario, self.password)
+        except smtplib.SMTPAuthenticationError as e:
+            conexion.close()
+            raise ErrorEnvioPermanente(f"Error de autenticación SMTP: {e}") from e
+        self._conexion = conexion
+
+    def cerrar(self):
+        if self._conexion is None:
+            return
+        try:
+            self._conexion.quit()
+        except smtplib.SMTPException:
+            self._conexion.close()
+        self._conexion = None
+
+    def enviar(self, destinatario: str, mensaje):
+        """Envía el mensaje (email.message) solo al destinatario indicado."""
+        rechazados = self.enviar_lote([destinatario], mensaje)
+        if destinatario in rechazados:
+            codigo, respuesta = rechazados[destinatario]
+            if codigo >= 500:
+                raise ErrorEnvioPermanente(f"Destinatario rechazado ({codigo}): {respuesta!r}")
+            raise smtplib.SMTPResponseException(codigo, respuesta)
+
+    def enviar_lote(self, destinatarios: List[str], mensaje) -> Dict[str, Tuple[int, bytes]]:
+        """
+        Envía el mensaje (email.message) en una sola transacción a todos los
+        destinatarios.
+
+        Returns:
+            {destinatario: (código SMTP, respuesta)} de los rechazados; vacío si
+            el servidor aceptó a todos
+        """
+        if self._conexion is None:
+            self.abrir()
+        try:
+            return self._conexion.send_message(mensaje, to_addrs=list(destinatarios))
+        except smtplib.SMTPRecipientsRefused as e:
+            # Todos rechazados: se informan igual que un rechazo parcial
+            return e.recipients
+        except smtplib.SMTPResponseException as e:
+            # Los códigos 5xx son definitivos; los 4xx se reintentan
+            if e.smtp_code >= 500:
+                raise ErrorEnvioPermanente(f"Rechazado por el servidor ({e.smtp_code}): {e.smtp_error!r}") from e
+            raise
+        except smtplib.SMTPServerDisconnected:
+            # El servidor cerró la conexión: se reabre en el siguiente intento
+            self._conexion = None
+            raise
+
+class CanalWhatsApp:
+    """
+    Envía por WhatsApp con una función de envío existente
+    (funcion_envio(imagen, numero, mensaje) -> bool). La automatización de
+    WhatsApp Web usa el navegador, así que los envíos van en secuencia con una
+    pausa entre cada uno.
+    """
+    nombre = 'whatsapp'
+    max_paralelo = 1
+
+    def __init__(self, funcion_envio: Callable, pausa_entre_envios: float = 0):
+        self.funcion_envio = funcion_envio
+        self.pausa_entre_envios = pausa_entre_envios
+        self._envios = 0
+
+    def abrir(self):
+        self._envios = 0
+
+    def cerrar(self):
+        pass
+
+    def enviar(self, destinatario: str, mensaje):
+        imagen, texto = mensaje
+        if self._envios and self.pausa_entre_envios:
+            time.sleep(self.pausa_entre_envios)
+        self._envios += 1
+        if not self.funcion_envio(imagen, destinatario, texto):
+            raise RuntimeError(f"No se pudo enviar a {destinatario}")
+
+class CanalWhatsAppSimulado:
+    """
+    Canal de prueba: no envía nada, solo registra los envíos (con una latencia
+    simulada). Permite probar la cola sin WhatsApp Web.
+    """
+    nombre = 'whatsapp'
+
+    def __init__(self, latencia_s: float = 0.0, fallos: Optional[dict] = None, max_paralelo: int = 4):
+        self.latencia_s = latencia_s
+        self.fallos = dict(fallos or {})
+        self.max_paralelo = max_paralelo
+        self.enviados = []
+        self._lock = threading.Lock()
+
+    def abrir(self):
+        pass
+
+    def cerrar(self):
+        pass
+
+    def enviar(self, destinatario: str, mensaje):
+        time.sleep(self.latencia_s)
+        with self._lock:
+            # fallos = {destinatario: cantidad de intentos que deben fallar}
+            if self.fallos.get(destinatario, 0) > 0:
+                self.fallos[destinatario] -= 1
+                raise ConnectionError(f"Fallo simulado para {destinatario}")
+            self.enviados.append((destinatario, mensaje))
+        print(f"[SIMULADO] Mensaje enviado a {destinatario}")
+
+# ==================== DESPACHO ====================
+
+def _enviar_con_reintentos(canal, destinatario, mensaje, reintentos, espera_base) -> ResultadoEnvio:
+    inicio = time.perf_counter()
+    intentos = 0
+    while True:
+        intentos += 1
+        try:
+            canal.enviar(destinatario, mensaje)
+            return ResultadoEnvio(destinatario, True, intentos, time.perf_counter() - inicio)
+        except ErrorEnvioPermanente as e:
+            return ResultadoEnvio(destinatario, False, intentos, time.perf_counter() - inicio, str(e))
+        except Exception as e:
+            if not _reintentar(intentos, reintentos, espera_base, f"{canal.nombre} -> {destinatario}", e):
+                return ResultadoEnvio(destinatario, False, intentos, time.perf_counter() - inicio, str(e))
+
+def _reintentar(intentos, reintentos, espera_base, descripcion, error) -> bool:
+    """Espera antes del siguiente intento; False si ya no quedan reintentos."""
+    if intentos > reintentos:
+        return False
+    espera = espera_base * 2 ** (intentos - 1)
+    print(f"[REINTENTO] {descripcion}: {error} (intento {intentos}, esperando {espera:.1f}s)")
+    time.sleep(espera)
+    return True
+
+def _abrir_con_reintentos(canal, reintentos, espera_base) -> Optional[str]:
+    """Abre la conexión del canal reintentando los errores transitorios. Retorna el error o None."""
+    intentos = 0
+    while True:
+        intentos += 1
+        try:
+            canal.abrir()
+            return None
+        except ErrorEnvioPermanente as e:
+            return str(e)
+        except Exception as e:
+            if not _reintentar(intentos, reintentos, espera_base, f"{canal.nombre} (conexión)", e):
+                return str(e)
+
+def _enviar_lote_con_reintentos(canal, destinatarios, mensaje, reintentos, espera_base) -> List[ResultadoEnvio]:
+    """
+    Envía un solo mensaje a todos los destinatarios con canal.enviar_lote().
+    En cada reintento solo van los destinatarios que aún no se aceptaron.
+    """
+    inicio = time.perf_counter()
+    resultados = {}
+    pendientes = list(destinatarios)
+    intentos = 0
+    while pendientes:
+        intentos += 1
+        try:
+            rechazados = canal.enviar_lote(pendientes, mensaje)
+        except ErrorEnvioPermanente as e:
+            rechazados = {destinatario: (550, str(e)) for destinatario in pendientes}
+        except Exception as e:
+            if _reintentar(intentos, reintentos, espera_base, f"{canal.nombre} -> {len(pendientes)} destinatario(s)", e):
+                continue
+            rechazados = {destinatario: (550, str(e)) for destinatario in pendientes}
+        
+        latencia = time.perf_counter() - inicio
+        transitorios = []
+        for destinatario in pendientes:
+            if destinatario not in rechazados:
+                resultados[destinatario] = ResultadoEnvio(destinatario, True, intentos, latencia)
+                continue
+            codigo, respuesta = rechazados[destinatario]
+            if isinstance(respuesta, bytes):
+                respuesta = respuesta.decode('utf-8', errors='replace')
+            error = f"Destinatario rechazado ({codigo}): {respuesta}"
+            # Los códigos 5xx son definitivos; los 4xx se reintentan
+            if codigo < 500 and intentos <= reintentos:
+                transitorios.append(destinatario)
+            resultados[destinatario] = ResultadoEnvio(destinatario, False, intentos, latencia, error)
+        
+        pendientes = transitorios
+        if pendientes:
+            _reintentar(intentos, reintentos, espera_base, f"{canal.nombre} -> {', '.join(pendientes)}",
+                        "rechazo transitorio")
+    return [resultados[destinatario] for destinatario in destinatarios]
+
+def despachar(canal, destinatarios: List[str], mensaje, reintentos: int = MAX_REINTENTOS,
+              espera_base: float = ESPERA_BASE_REINTENTO) -> List[ResultadoEnvio]:
+    """
+    Envía el mismo mensaje a todos los destinatarios por el canal.
+
+    Args:
+        canal: Canal de envío (CanalSMTP, CanalWhatsApp, ...)
+        destinatarios: Lista de direcciones o números
+        mensaje: Mensaje en el formato que espera el canal
+        reintentos: Reintentos ante errores transitorios (por destinatario, o por
+            transacción en los canales con enviar_lote)
+        espera_base: Segundos antes del primer reintento (se duplica en cada uno)
+
+    Returns:
+        Lista de ResultadoEnvio en el mismo orden que los destinatarios
+    """
+    if not destinatarios:
+        return []
+
+    error = _abrir_con_reintentos(canal, reintentos, espera_base)
+    if error is not None:
+        print(f"[ERROR] {canal.nombre}: {error}")
+        return [ResultadoEnvio(destinatario, False, 0, 0.0, error) for destinatario in destinatarios]
+
+    try:
+        max_hilos = min(canal.max_paralelo, len(destinatarios))
+        if hasattr(canal, 'enviar_lote'):
+            resultados = _enviar_lote_con_reintentos(canal, destinatarios, mensaje, reintentos, espera_base)
+        elif max_hilos <= 1:
+            resultados = [_enviar_con_reintentos(canal, destinatario, mensaje, reintentos, espera_base)
+                          for destinatario in destinatarios]
+        else:
+            with ThreadPoolExecutor(max_workers=max_hilos) as executor:
+                resultados = list(executor.map(
+                    lambda destinatario: _enviar_con_reintentos(canal, destinatario, mensaje, reintentos, espera_base),
+                    destinatarios))
+    finally:
+        canal.cerrar()
+
+    for resultado in resultados:
+        if resultado.exito:
+            print(f"[OK] {canal.nombre} -> {resultado.destinatario} ({resultado.latencia_s:.2f}s, {resultado.intentos} intento(s))")
+        else:
+            print(f"[ERROR] {canal.nombre} -> {resultado.destinatario}: {resultado.error}")
+    return resultados
@@ -19,6 +19,7 @@ import sys
 import time
 import re
 from datetime import datetime
+from pathlib import Path
 
 try:
     import win32com.client  # type: ignore
@@ -27,6 +28,9 @@ except Exception:
 
 import pandas as pd
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utilidades"))
+from escritura_excel import escribir_excel
+
 # =========================== CONFIG ===========================
 AFTER_HOUR = 14  # Ejecutar sólo si la hora actual es >= 14
 CONNECTION_NAME = None  # p.ej. "PRD (ECC)". Si None, toma la primera sesión disponible
@@ -376,8 +380,7 @@ def transform_data_for_powerbi(df: pd.DataFrame) -> pd.DataFrame:
 def save_powerbi_files(df: pd.DataFrame, excel_path: str, csv_path: str, parquet_path: str) -> None:
     # Excel
     try:
-        with pd.ExcelWriter(excel_path, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Datos")
+        escribir_excel(excel_path, df, hoja="Datos")
         ts_print(f"[OK] Guardado Excel: {excel_path}")
     except Exception as e:
         ts_print(f"[ADVERTENCIA] No se pudo guardar Excel: {e}")
@@ -3,10 +3,42 @@
 Script especializado para procesar archivos SAP sin emojis
 """
 
+import numpy as np
 import pandas as pd
 import os
+import sys
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utilidades"))
+from escritura_excel import calcular_anchos_columnas, escribir_excel
+
+# Filas usadas para calcular el ancho de las columnas del Excel
+# (repartidas en todo el archivo; en archivos más chicos se usan todas)
+MAX_FILAS_ANCHO_COLUMNAS = 100_000
+
+# Formatos de fecha/hora del reporte SAP (DD.MM.YYYY / HH:MM:SS)
+SAP_DATE_FORMAT = '%d.%m.%Y'
+SAP_TIME_FORMAT = '%H:%M:%S'
+
+# Categorías de estatus (código SAP -> categoría)
+STATUS_CATEGORIES = {
+    '5': 'Entregado',
+    '1': 'En Proceso',
+    '2': 'En Proceso',
+    '3': 'En Proceso',
+    '4': 'Pendiente',
+}
+
+# Categorías de tipo de ruta (texto contenido en 'Tipo Ruta' -> categoría, en orden de prioridad)
+ROUTE_TYPE_CATEGORIES = {
+    'MODERNO': 'Moderno',
+    'TRADICIONAL': 'Tradicional',
+    'RURAL': 'Rural',
+}
 
 def process_sap_file_content(file_path, encodings_to_try):
     """
@@ -132,32 +164,23 @@ def transform_data_for_powerbi(df):
     df_clean.columns = df_clean.columns.str.strip()
     df_clean.columns = df_clean.columns.str.replace(r'\s+', ' ', regex=True)
     
-    # Convert date columns to proper datetime format
-    date_columns = ['Fe.Entrega', 'Fecha Guía', 'Creado el']
-    for col in date_columns:
-        if col in df_clean.columns:
-            try:
-                df_clean[col] = pd.to_datetime(df_clean[col], errors='coerce')
-            except:
-                print(f"Warning: Could not convert {col} to datetime")
+    # Convert date columns to proper datetime format (all columns parsed in one batch)
+    date_columns = [col for col in ['Fe.Entrega', 'Fecha Guía', 'Creado el'] if col in df_clean.columns]
+    if date_columns:
+        df_clean[date_columns] = parse_datetime_columns(df_clean, date_columns, SAP_DATE_FORMAT, dayfirst=True)
     
     # Convert time columns to proper time format
-    time_columns = ['Hora Guía', 'Hora']
-    for col in time_columns:
-        if col in df_clean.columns:
-            try:
-                df_clean[col] = pd.to_datetime(df_clean[col], format='%H:%M:%S', errors='coerce').dt.time
-            except:
-                print(f"Warning: Could not convert {col} to time")
+    time_columns = [col for col in ['Hora Guía', 'Hora'] if col in df_clean.columns]
+    if time_columns:
+        parsed = parse_datetime_columns(df_clean, time_columns, SAP_TIME_FORMAT)
+        for col in time_columns:
+            df_clean[col] = parsed[col].dt.time
     
     # Convert numeric columns
-    numeric_columns = ['Cajas R.S.', 'Cajas Físicas', 'Cajas Equiv.', 'Ruta', 'Entrega', 'Cliente']
-    for col in numeric_columns:
-        if col in df_clean.columns:
-            try:
-                df_clean[col] = pd.to_numeric(df_clean[col], errors='coerce')
-            except:
-                print(f"Warning: Could not convert {col} to numeric")
+    numeric_columns = [col for col in ['Cajas R.S.', 'Cajas Físicas', 'Cajas Equiv.', 'Ruta', 'Entrega', 'Cliente']
+                       if col in df_clean.columns]
+    if numeric_columns:
+        df_clean[numeric_columns] = df_clean[numeric_columns].apply(pd.to_numeric, errors='coerce')
     
     # Clean text columns - remove extra spaces
     text_columns = ['Centro', 'Nombre del Cliente', 'Estatus', 'Ruta Dist.', 'Camión', 
@@ -186,96 +209,123 @@ def transform_data_for_powerbi(df):
     
     # Add status categories for better filtering in Power BI
     if 'Estatus' in df_clean.columns:
-        df_clean['Estatus_Categoria'] = df_clean['Estatus'].apply(categorize_status)
+        df_clean['Estatus_Categoria'] = categorize_status(df_clean['Estatus'])
     
     # Add route type categories
     if 'Tipo Ruta' in df_clean.columns:
-        df_clean['Tipo_Ruta_Categoria'] = df_clean['Tipo Ruta'].apply(categorize_route_type)
+        df_clean['Tipo_Ruta_Categoria'] = categorize_route_type(df_clean['Tipo Ruta'])
     
     print(f"Data transformation completed. Final dataset shape: {df_clean.shape}")
     return df_clean
 
 
-def categorize_status(status):
-    """Categorize delivery status for better Power BI filtering"""
-    if pd.isna(status):
-        return 'Sin Estatus'
+def parse_datetime_columns(df, columns, date_format, dayfirst=False):
+    """
+    Parse several text columns to datetime in one batch: the columns are
+    stacked and each distinct value is parsed only once (SAP reports repeat
+    the same dates/times on thousands of rows).
+    Values that don't match date_format are retried as ISO 8601 and then with
+    a flexible parser, so a different export format still loads instead of
+    becoming NaT.
+    """
+    stacked = pd.concat([df[col] for col in columns], ignore_index=True)
+    codes, uniques = pd.factorize(stacked)
+    uniques = pd.Series(uniques, dtype=object)
     
-    status_str = str(status).strip()
-    if status_str in ['5']:
-        return 'Entregado'
-    elif status_str in ['1', '2', '3']:
-        return 'En Proceso'
-    elif status_str in ['4']:
-        return 'Pendiente'
-    else:
-        return 'Otro'
+    parsed = pd.to_datetime(uniques, format=date_format, errors='coerce')
+    text = uniques.astype(str).str.strip()
+    for fallback in ({'format': 'ISO8601'}, {'format': 'mixed', 'dayfirst': dayfirst}):
+        retry = parsed.isna() & ~text.isin(['', 'nan', 'None', 'NaT'])
+        if not retry.any():
+            break
+        parsed[retry] = pd.to_datetime(uniques[retry], errors='coerce', **fallback)
+    
+    # codes == -1 (missing values) -> NaT
+    values = parsed.to_numpy()
+    values = np.append(values, np.array(['NaT'], dtype=values.dtype))[codes]
+    rows = len(df)
+    return pd.DataFrame(
+        {col: values[i * rows:(i + 1) * rows] for i, col in enumerate(columns)},
+        index=df.index,
+    )
+
+
+def categorize_status(status):
+    """Categorize delivery status (Series) for better Power BI filtering"""
+    categories = ['Entregado', 'En Proceso', 'Pendiente', 'Otro', 'Sin Estatus']
+    result = status.astype(str).str.strip().map(STATUS_CATEGORIES).fillna('Otro')
+    result[status.isna()] = 'Sin Estatus'
+    return pd.Categorical(result, categories=categories)
 
 
 def categorize_route_type(route_type):
-    """Categorize route type for better Power BI analysis"""
-    if pd.isna(route_type):
-        return 'Sin Tipo'
-    
-    route_str = str(route_type).strip().upper()
-    if 'MODERNO' in route_str:
-        return 'Moderno'
-    elif 'TRADICIONAL' in route_str:
-        return 'Tradicional'
-    elif 'RURAL' in route_str:
-        return 'Rural'
-    else:
-        return 'Otro'
+    """Categorize route type (Series) for better Power BI analysis"""
+    categories = list(ROUTE_TYPE_CATEGORIES.values()) + ['Otro', 'Sin Tipo']
+    route_str = route_type.astype(str).str.strip().str.upper()
+    conditions = [route_type.isna().to_numpy()] + [
+        route_str.str.contains(keyword, regex=False).to_numpy() for keyword in ROUTE_TYPE_CATEGORIES
+    ]
+    choices = ['Sin Tipo'] + list(ROUTE_TYPE_CATEGORIES.values())
+    return pd.Categorical(np.select(conditions, choices, default='Otro'), categories=categories)
+
+
+def save_excel_file(df, excel_path):
+    """
+    Save the dataframe as Excel with column widths computed from the data
+    (the longest value per column, max 50) before writing
+    """
+    anchos = calcular_anchos_columnas(df, maximo=50, filas_muestra=MAX_FILAS_ANCHO_COLUMNAS)
+    escribir_excel(excel_path, df, hoja='REP_PLR_Data', anchos=anchos)
+    print(f"Excel file saved: {excel_path}")
+
+
+def save_csv_file(df, csv_path):
+    """Save as CSV with UTF-8 encoding (Power BI preferred)"""
+    df.to_csv(csv_path, index=False, encoding='utf-8-sig')
+    print(f"CSV file saved: {csv_path}")
+
+
+def save_parquet_file(df, parquet_path):
+    """Save as Parquet for better performance in Power BI"""
+    df.to_parquet(parquet_path, index=False)
+    print(f"Parquet file saved: {parquet_path}")
 
 
 def save_powerbi_files(df, excel_path, csv_path, parquet_path):
     """
-    Save the dataframe in multiple formats optimized for Power BI
+    Save the dataframe in multiple formats optimized for Power BI.
+    Each format (Excel, CSV, Parquet, metadata) is written in its own thread;
+    they only read the dataframe, so they can run at the same time.
     """
     print("Saving files in Power BI compatible formats...")
     
-    try:
-        # Save as Excel with proper formatting
-        with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='REP_PLR_Data', index=False)
-            
-            # Get the workbook and worksheet
-            workbook = writer.book
-            worksheet = writer.sheets['REP_PLR_Data']
-            
-            # Auto-adjust column widths
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-        
-        print(f"Excel file saved: {excel_path}")
-        
-        # Save as CSV with UTF-8 encoding (Power BI preferred)
-        df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-        print(f"CSV file saved: {csv_path}")
-        
-        # Save as Parquet for better performance in Power BI
-        df.to_parquet(parquet_path, index=False)
-        print(f"Parquet file saved: {parquet_path}")
-        
-        # Create a metadata file for Power BI
-        create_powerbi_metadata(df, os.path.dirname(excel_path))
-        
-        print("\nAll Power BI compatible files created successfully!")
-        print("Recommended file for Power BI: Use the .parquet file for best performance")
-        print("Use the .csv file if you need to import into other tools")
-        print("Use the .xlsx file for manual review and analysis")
-        
-    except Exception as e:
-        print(f"Error saving Power BI files: {e}")
+    writers = {
+        'Excel': (save_excel_file, excel_path),
+        'CSV': (save_csv_file, csv_path),
+        'Parquet': (save_parquet_file, parquet_path),
+        'Metadata': (create_powerbi_metadata, os.path.dirname(excel_path)),
+    }
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(writers)) as executor:
+        futures = {name: executor.submit(writer, df, path) for name, (writer, path) in writers.items()}
+    
+    failed = []
+    for name, future in futures.items():
+        try:
+            future.result()
+        except Exception as e:
+            failed.append(name)
+            print(f"Error saving Power BI {name} file: {e}")
+    
+    if failed:
+        print(f"\nPower BI files created with errors ({', '.join(failed)}) in {time.perf_counter() - start:.1f}s")
+        return
+    
+    print(f"\nAll Power BI compatible files created successfully! ({time.perf_counter() - start:.1f}s)")
+    print("Recommended file for Power BI: Use the .parquet file for best performance")
+    print("Use the .csv file if you need to import into other tools")
+    print("Use the .xlsx file for manual review and analysis")
 
 
 def create_powerbi_metadata(df, output_path):
@@ -15,6 +15,9 @@ from datetime import datetime
 import pandas as pd
 import logging
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utilidades"))
+from escritura_excel import escribir_excel
+
 # Logging
 LOG_FORMAT = "%(asctime)s | %(levelname)s | %(message)s"
 logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
@@ -283,7 +286,7 @@ def procesar_archivo(ruta_txt: Path, procesador_func) -> Path:
         ruta_excel = ruta_txt.with_suffix('.xlsx')
         
         # Guardar Excel
-        df_procesado.to_excel(ruta_excel, index=False, header=False, engine='openpyxl')
+        escribir_excel(ruta_excel, df_procesado, header=False)
         
         logger.info(f"  ✓ Excel generado: {ruta_excel.name}")
         logger.info(f"    Dimensiones finales: {len(df_procesado)} filas x {len(df_procesado.columns)} columnas")
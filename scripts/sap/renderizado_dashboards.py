@@ -0,0 +1,375 @@
+"""
+Servicio de renderizado de dashboards
+Renderiza en paralelo las imágenes de los dashboards regionales.
+
+Cada trabajo es una tupla (funcion, agregados, ruta): la función dibuja una
+imagen a partir de los agregados ya calculados y la guarda en la ruta. Las
+funciones deben estar definidas a nivel de módulo para poder enviarse a los
+procesos del pool, que usan siempre el backend Agg (sin pantalla).
+
+Para no volver a dibujar ni a enviar imágenes cuyos datos no cambiaron, cada
+dashboard guarda junto a sus imágenes un manifiesto JSON con el hash de los
+agregados que las produjeron y el hash ya enviado por cada canal.
+
+Como alternativa a matplotlib, un dashboard puede renderizarse como HTML/SVG
+con una plantilla Jinja de templates/ (la misma carpeta que usa la aplicación
+web) y rasterizarse a PNG solo cuando se necesita una imagen.
+
+Antes de distribuir las imágenes, cada canal (correo, WhatsApp) recibe una
+variante comprimida que cabe en su presupuesto de tamaño: PNG con paleta,
+JPEG o WebP y, si aun así no cabe, una versión reducida.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# Máximo de imágenes renderizadas a la vez
+MAX_PROCESOS_RENDER = min(4, os.cpu_count() or 1)
+
+# Carpeta de plantillas de la aplicación web
+CARPETA_PLANTILLAS = Path(__file__).resolve().parent.parent.parent / "templates"
+
+# Escala del navegador al rasterizar (1.5 ~ dpi 150 de matplotlib)
+ESCALA_RASTERIZADO = 1.5
+
+# Presupuesto de tamaño por canal de distribución
+# - formatos: en orden de preferencia (el primero que quepa se usa)
+# - max_ancho: ancho máximo en píxeles (None = sin límite)
+# - max_bytes_imagen: tamaño máximo de cada imagen
+# - max_bytes_total: tamaño máximo de todas las imágenes de un envío
+PRESUPUESTOS_CANAL = {
+    # Outlook no muestra WebP: solo PNG con paleta o JPEG
+    'email': {'formatos': ['png_paleta', 'jpeg'], 'max_ancho': None,
+              'max_bytes_imagen': 2 * 1024 * 1024, 'max_bytes_total': 8 * 1024 * 1024},
+    # WhatsApp recomprime a ~1600 px de ancho; se envía ya reducida para móvil
+    'whatsapp': {'formatos': ['jpeg', 'webp'], 'max_ancho': 1600,
+                 'max_bytes_imagen': 1024 * 1024, 'max_bytes_total': None},
+}
+
+# Parámetros de cada formato comprimido: (extensión, opciones de Pillow)
+FORMATOS_COMPRIMIDOS = {
+    'png_paleta': ('.png', {'format': 'PNG', 'optimize': True}),
+    'jpeg': ('.jpg', {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True}),
+    'webp': ('.webp', {'format': 'WEBP', 'quality': 80, 'method': 4}),
+}
+
+# Subcarpeta (junto a la imagen original) con las variantes por canal
+CARPETA_VARIANTES = "envio"
+
+# Factor de reducción en cada intento cuando ningún formato cabe, y ancho mínimo
+FACTOR_REDUCCION = 0.75
+ANCHO_MINIMO = 800
+
+_entorno_plantillas = None
+
+def _inicializar_proceso():
+    """Configura matplotlib sin interfaz gráfica en cada proceso del pool."""
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _renderizar_secuencial(trabajos):
+    return [funcion(agregados, ruta) for funcion, agregados, ruta in trabajos]
+
+def renderizar_imagenes(trabajos, max_procesos=MAX_PROCESOS_RENDER):
+    """
+    Ejecuta los trabajos de renderizado en un pool de procesos.
+
+    Args:
+        trabajos: Lista de tuplas (funcion, agregados, ruta)
+        max_procesos: Máximo de procesos simultáneos (1 = secuencial)
+
+    Returns:
+        Lista con el resultado de cada trabajo (la ruta generada), en el mismo
+        orden que los trabajos
+    """
+    if max_procesos <= 1 or len(trabajos) <= 1:
+        return _renderizar_secuencial(trabajos)
+
+    try:
+        with ProcessPoolExecutor(max_workers=min(max_procesos, len(trabajos)),
+                                 initializer=_inicializar_proceso) as executor:
+            futuros = [executor.submit(funcion, agregados, ruta) for funcion, agregados, ruta in trabajos]
+            return [futuro.result() for futuro in futuros]
+    except BrokenProcessPool as e:
+        print(f"[ADVERTENCIA] No se pudo renderizar en paralelo ({e}), renderizando en secuencia")
+        return _renderizar_secuencial(trabajos)
+
+# ==================== CACHÉ DE IMÁGENES ====================
+
+def calcular_hash_agregados(*tablas, variante: str = '') -> str:
+    """
+    Calcula un hash estable del contenido (valores, índice y columnas) de las
+    tablas. La variante distingue salidas distintas de los mismos datos
+    (por ejemplo, el renderizador usado).
+    """
+    sha = hashlib.sha256(variante.encode('utf-8'))
+    for tabla in tablas:
+        sha.update(repr(list(tabla.columns)).encode('utf-8'))
+        sha.update(pd.util.hash_pandas_object(tabla, index=True).values.tobytes())
+    return sha.hexdigest()
+
+def cargar_manifiesto_imagenes(ruta_manifiesto) -> dict:
+    """Carga el manifiesto de imágenes (vacío si no existe o está dañado)."""
+    try:
+        with open(ruta_manifiesto, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def guardar_manifiesto_imagenes(ruta_manifiesto, manifiesto: dict):
+    """Guarda el manifiesto de imágenes de forma atómica."""
+    ruta_manifiesto = Path(ruta_manifiesto)
+    ruta_temporal = ruta_manifiesto.with_name(f".{ruta_manifiesto.name}.tmp")
+    with open(ruta_temporal, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+    os.replace(ruta_temporal, ruta_manifiesto)
+
+def imagenes_vigentes(ruta_manifiesto, hash_agregados: str):
+    """
+    Retorna las imágenes del manifiesto si fueron generadas con los mismos
+    agregados y siguen existiendo con el mismo tamaño; en otro caso None.
+    """
+    manifiesto = cargar_manifiesto_imagenes(ruta_manifiesto)
+    if manifiesto.get('hash_agregados') != hash_agregados or not manifiesto.get('imagenes'):
+        return None
+
+    rutas = []
+    for imagen in manifiesto['imagenes']:
+        ruta = Path(imagen['ruta'])
+        if not ruta.exists() or ruta.stat().st_size != imagen['tamaño']:
+            return None
+        rutas.append(ruta)
+    return rutas
+
+def registrar_imagenes(ruta_manifiesto, hash_agregados: str, rutas):
+    """Registra en el manifiesto las imágenes generadas para un hash de agregados."""
+    manifiesto = cargar_manifiesto_imagenes(ruta_manifiesto)
+    manifiesto['hash_agregados'] = hash_agregados
+    manifiesto['fecha_generacion'] = datetime.now().isoformat()
+    manifiesto['imagenes'] = [
+        {'ruta': str(Path(ruta).resolve()), 'tamaño': Path(ruta).stat().st_size}
+        for ruta in rutas
+    ]
+    manifiesto.setdefault('envios', {})
+    guardar_manifiesto_imagenes(ruta_manifiesto, manifiesto)
+
+def buscar_manifiesto_de_imagen(ruta_imagen):
+    """Busca en la carpeta de la imagen el manifiesto de dashboard que la incluye."""
+    ruta_imagen = Path(ruta_imagen).resolve()
+    for ruta_manifiesto in ruta_imagen.parent.glob("manifiesto_dashboard*.json"):
+        imagenes = cargar_manifiesto_imagenes(ruta_manifiesto).get('imagenes', [])
+        if any(Path(imagen['ruta']) == ruta_imagen for imagen in imagenes):
+            return ruta_manifiesto
+    return None
+
+def envio_pendiente(ruta_manifiesto, canal: str) -> bool:
+    """Indica si las imágenes actuales del manifiesto aún no se enviaron por el canal."""
+    if ruta_manifiesto is None:
+        return True
+    manifiesto = cargar_manifiesto_imagenes(ruta_manifiesto)
+    hash_agregados = manifiesto.get('hash_agregados')
+    return hash_agregados is None or manifiesto.get('envios', {}).get(canal) != hash_agregados
+
+def destinatarios_pendientes(ruta_manifiesto, canal: str, destinatarios) -> list:
+    """
+    Destinatarios a los que aún no se enviaron las imágenes actuales del
+    manifiesto por el canal (descuenta los que ya las recibieron en un envío
+    parcial anterior).
+    """
+    if not envio_pendiente(ruta_manifiesto, canal):
+        return []
+    if ruta_manifiesto is None:
+        return list(destinatarios)
+    manifiesto = cargar_manifiesto_imagenes(ruta_manifiesto)
+    parcial = manifiesto.get('envios_parciales', {}).get(canal, {})
+    recibieron = set(parcial.get('destinatarios', [])) if parcial.get('hash') == manifiesto.get('hash_agregados') else set()
+    return [destinatario for destinatario in destinatarios if destinatario not in recibieron]
+
+def registrar_envio(ruta_manifiesto, canal: str, destinatarios=None):
+    """
+    Marca las imágenes actuales del manifiesto como enviadas por el canal.
+    Con destinatarios, el envío fue parcial: solo se registran esas
+    direcciones y las demás siguen pendientes para la próxima ejecución.
+    """
+    if ruta_manifiesto is None:
+        return
+    manifiesto = cargar_manifiesto_imagenes(ruta_manifiesto)
+    hash_agregados = manifiesto.get('hash_agregados')
+    if hash_agregados is None:
+        return
+    parciales = manifiesto.setdefault('envios_parciales', {})
+    if destinatarios is None:
+        manifiesto.setdefault('envios', {})[canal] = hash_agregados
+        parciales.pop(canal, None)
+    else:
+        parcial = parciales.get(canal, {})
+        anteriores = parcial.get('destinatarios', []) if parcial.get('hash') == hash_agregados else []
+        parciales[canal] = {'hash': hash_agregados, 'destinatarios': sorted(set(anteriores) | set(destinatarios))}
+    guardar_manifiesto_imagenes(ruta_manifiesto, manifiesto)
+
+# ==================== RENDERIZADO HTML ====================
+
+def renderizar_plantilla(nombre_plantilla: str, **contexto) -> str:
+    """Renderiza una plantilla Jinja de templates/ y retorna el HTML."""
+    global _entorno_plantillas
+    if _entorno_plantillas is None:
+        from jinja2 import Environment, FileSystemLoader, select_autoescape
+        _entorno_plantillas = Environment(loader=FileSystemLoader(str(CARPETA_PLANTILLAS)),
+                                          autoescape=select_autoescape(['html']))
+    return _entorno_plantillas.get_template(nombre_plantilla).render(**contexto)
+
+def rasterizar_html(html: str, capturas: dict) -> bool:
+    """
+    Rasteriza secciones de un HTML a PNG con un navegador headless (Playwright).
+
+    Args:
+        html: Documento HTML completo
+        capturas: {selector CSS: ruta PNG} de cada sección a capturar
+
+    Returns:
+        True si se generaron todas las imágenes, False si Playwright no está
+        disponible o la captura falla (el llamador debe usar matplotlib)
+    """
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        print("[INFO] Playwright no esta instalado, no se puede rasterizar el HTML")
+        return False
+
+    try:
+        with sync_playwright() as playwright:
+            navegador = playwright.chromium.launch()
+            try:
+                pagina = navegador.new_page(device_scale_factor=ESCALA_RASTERIZADO)
+                pagina.set_content(html)
+                for selector, ruta in capturas.items():
+                    pagina.locator(selector).screenshot(path=str(ruta))
+            finally:
+                navegador.close()
+        return True
+    except Exception as e:
+        print(f"[ADVERTENCIA] No se pudo rasterizar el HTML: {e}")
+        return False
+
+# ==================== COMPRESIÓN POR CANAL ====================
+
+def _codificar_imagen(imagen, formato: str) -> bytes:
+    """Codifica una imagen de Pillow en el formato comprimido indicado."""
+    import io
+    from PIL import Image
+
+    _extension, opciones = FORMATOS_COMPRIMIDOS[formato]
+    if formato == 'png_paleta':
+        # Los dashboards usan pocos colores planos: 256 colores sin pérdida visible
+        imagen = imagen.quantize(colors=256, method=Image.Quantize.FASTOCTREE)
+    buffer = io.BytesIO()
+    imagen.save(buffer, **opciones)
+    return buffer.getvalue()
+
+def _elegir_variante(imagen, formatos, max_bytes):
+    """
+    Retorna (formato, bytes) de la primera variante que cabe en max_bytes,
+    reduciendo la imagen si ningún formato cabe. Si ni al ancho mínimo cabe,
+    retorna la variante más pequeña.
+    """
+    from PIL import Image
+
+    mas_pequena = None
+    while True:
+        for formato in formatos:
+            datos = _codificar_imagen(imagen, formato)
+            if max_bytes is None or len(datos) <= max_bytes:
+                return formato, datos
+            if mas_pequena is None or len(datos) < len(mas_pequena[1]):
+                mas_pequena = (formato, datos)
+        ancho = int(imagen.width * FACTOR_REDUCCION)
+        if ancho < ANCHO_MINIMO:
+            return mas_pequena
+        imagen = imagen.resize((ancho, round(imagen.height * ancho / imagen.width)), Image.LANCZOS)
+
+def preparar_imagen_para_canal(ruta_imagen, canal: str, max_bytes=None) -> Path:
+    """
+    Genera (o reutiliza) la variante comprimida de una imagen para un canal.
+
+    Args:
+        ruta_imagen: Imagen original (PNG)
+        canal: Clave de PRESUPUESTOS_CANAL ('email', 'whatsapp')
+        max_bytes: Presupuesto de la imagen (por defecto el del canal)
+
+    Returns:
+        Ruta de la variante, o la imagen original si ya cabe en el presupuesto
+        sin cambios o si Pillow no está disponible
+    """
+    ruta_imagen = Path(ruta_imagen)
+    presupuesto = PRESUPUESTOS_CANAL[canal]
+    if max_bytes is None:
+        max_bytes = presupuesto['max_bytes_imagen']
+
+    try:
+        from PIL import Image
+    except ImportError:
+        print("[INFO] Pillow no esta instalado, se envia la imagen original")
+        return ruta_imagen
+
+    carpeta = ruta_imagen.parent / CARPETA_VARIANTES
+    base = f"{ruta_imagen.stem}_{canal}"
+    tamaño_original = ruta_imagen.stat().st_size
+
+    # Reutilizar la variante si es posterior a la imagen y cabe en el presupuesto
+    for existente in carpeta.glob(f"{base}.*"):
+        if (existente.stat().st_mtime_ns >= ruta_imagen.stat().st_mtime_ns
+                and (max_bytes is None or existente.stat().st_size <= max_bytes)):
+            return existente
+
+    with Image.open(ruta_imagen) as original:
+        imagen = original.convert('RGB')
+    if presupuesto['max_ancho'] and imagen.width > presupuesto['max_ancho']:
+        ancho = presupuesto['max_ancho']
+        imagen = imagen.resize((ancho, round(imagen.height * ancho / imagen.width)), Image.LANCZOS)
+
+    formato, datos = _elegir_variante(imagen, presupuesto['formatos'], max_bytes)
+    if len(datos) >= tamaño_original and not presupuesto['max_ancho']:
+        return ruta_imagen
+
+    carpeta.mkdir(exist_ok=True)
+    for anterior in carpeta.glob(f"{base}.*"):
+        anterior.unlink()
+    ruta_variante = carpeta / f"{base}{FORMATOS_COMPRIMIDOS[formato][0]}"
+    ruta_temporal = ruta_variante.with_name(f".{ruta_variante.name}.tmp")
+    ruta_temporal.write_bytes(datos)
+    os.replace(ruta_temporal, ruta_variante)
+
+    ahorro = 1 - len(datos) / tamaño_original
+    print(f"[COMPRESION] {ruta_imagen.name} -> {ruta_variante.name} ({canal}): "
+          f"{tamaño_original / 1024:.0f} KB -> {len(datos) / 1024:.0f} KB ({ahorro:.0%} menos)")
+    return ruta_variante
+
+def preparar_imagenes_para_canal(rutas, canal: str) -> list:
+    """
+    Prepara las imágenes de un envío para un canal, repartiendo el presupuesto
+    total del envío entre ellas, e informa los bytes ahorrados.
+    """
+    rutas = [Path(ruta) for ruta in rutas]
+    if not rutas:
+        return []
+
+    presupuesto = PRESUPUESTOS_CANAL[canal]
+    max_bytes = presupuesto['max_bytes_imagen']
+    if presupuesto['max_bytes_total']:
+        por_imagen = presupuesto['max_bytes_total'] // len(rutas)
+        max_bytes = min(max_bytes, por_imagen) if max_bytes else por_imagen
+
+    preparadas = [preparar_imagen_para_canal(ruta, canal, max_bytes) for ruta in rutas]
+
+    antes = sum(ruta.stat().st_size for ruta in rutas)
+    despues = sum(ruta.stat().st_size for ruta in preparadas)
+    print(f"[COMPRESION] {canal}: {len(rutas)} imagen(es), {antes / 1024:.0f} KB -> {despues / 1024:.0f} KB "
+          f"({(antes - despues) / 1024:.0f} KB ahorrados)")
+    return preparadas
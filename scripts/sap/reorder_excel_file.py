@@ -7,10 +7,14 @@ import sys
 import glob
 import re
 import unicodedata
+from pathlib import Path
 from typing import List
 import pandas as pd
 import traceback
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utilidades"))
+from escritura_excel import escribir_excel
+
 # ========= RUTAS FIJAS (opcional) =========
 # Deja None para usar parámetros de línea de comandos.
 FIXED_SRC_DIR = r"C:\data\SAP_Extraction\rep_plr"
@@ -186,8 +190,7 @@ def main():
             name, ext = os.path.splitext(base)
             out_path = os.path.join(out_dir, f"{name}{args.suffix}{ext}")
 
-            with pd.ExcelWriter(out_path, engine="openpyxl") as writer:
-                df_out.to_excel(writer, index=False, sheet_name="Hoja1")
+            escribir_excel(out_path, df_out, hoja="Hoja1")
 
             print(f" {base} -> {os.path.basename(out_path)} (filas: {len(df_out)})")
 
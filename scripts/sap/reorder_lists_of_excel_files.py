@@ -8,13 +8,27 @@ import glob
 import re
 import unicodedata
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 import pandas as pd
 import traceback
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "utilidades"))
+from escritura_excel import escribir_excel
+
 # Config por defecto: si usas siempre el mismo YAML, déjalo aquí
 DEFAULT_CONFIG_PATH = r"C:\Users\ELOPEZ21334\anaconda_projects\OTIF_Master\config\lista_excel_files.yaml"
 
+# Archivos procesados a la vez (de todos los jobs); 1 = secuencial
+DEFAULT_PROCESSES = min(4, os.cpu_count() or 1)
+
+# Manifiesto en cada carpeta de salida: firma de lo que generó cada archivo
+MANIFEST_NAME = "_manifest_reorder.json"
+
 # ----------------- Utiles de nombres/fechas -----------------
 def _strip_accents(s: str) -> str:
     if not isinstance(s, str):
@@ -62,20 +76,13 @@ def drop_header_like_rows(df: pd.DataFrame) -> pd.DataFrame:
     """
     if df.empty:
         return df
-    cols = list(df.columns)
-    to_drop = []
-    threshold = max(1, int(0.5 * len(cols)))
-    for idx, row in df.iterrows():
-        matches = 0
-        for c in cols:
-            cell = str(row[c]).strip()
-            if cell == str(c).strip():
-                matches += 1
-                if matches >= threshold:
-                    to_drop.append(idx)
-                    break
-    if to_drop:
-        df = df.drop(index=to_drop)
+    threshold = max(1, int(0.5 * len(df.columns)))
+    # Comparación de todo el bloque contra el vector de encabezados (por posición)
+    header = np.char.strip(np.array([str(c) for c in df.columns], dtype=str))
+    cells = np.char.strip(df.astype(str).to_numpy(dtype=str))
+    is_header_like = (cells == header).sum(axis=1) >= threshold
+    if is_header_like.any():
+        df = df[~is_header_like]
     return df
 
 # ----------------- Soporte de inicio flexible -----------------
@@ -115,17 +122,20 @@ def read_with_start(src_path: str,
     Retorna un DataFrame con columnas = encabezado detectado y datos desde la fila siguiente.
     """
     if start_cell or (start_col and header_row_1based):
-        # Leer sin encabezado para rebanar manualmente
-        df_raw = pd.read_excel(src_path, header=None, engine='openpyxl')
         if start_cell:
             header_row_idx, start_col_idx = parse_start_cell(start_cell)
         else:
             start_col_idx = col_letter_to_index(str(start_col))
             header_row_idx = max(0, int(header_row_1based) - 1)
 
+        # Una sola lectura sin encabezado desde la fila/columna de inicio
+        df_raw = pd.read_excel(src_path, header=None, engine='openpyxl',
+                               skiprows=header_row_idx,
+                               usecols=lambda col: col >= start_col_idx)
+
         # Construir encabezado y cuerpo desde ese punto
-        header_vals = list(df_raw.iloc[header_row_idx, start_col_idx:])
-        data = df_raw.iloc[header_row_idx + 1 :, start_col_idx:].copy()
+        header_vals = list(df_raw.iloc[0])
+        data = df_raw.iloc[1:].copy()
 
         # Limpiar encabezados vacíos (None/NaN) al final
         # (si hay columnas sin nombre, pandas las conserva como NaN; las dejamos, pero puedes quitarlas si quieres)
@@ -222,6 +232,100 @@ def load_jobs_from_config(config_path: str) -> List[Dict[str, Any]]:
             j["start_cell"] = str(j["start_cell"]).strip().upper()
     return jobs
 
+# ---------------------- Plantillas y manifiesto ----------------------
+_ref_columns_cache: Dict[str, List[str]] = {}
+
+def load_ref_columns(ref_path: str) -> List[str]:
+    """
+    Columnas de la plantilla de referencia. Solo se lee el encabezado, una vez
+    por plantilla aunque varios jobs la compartan.
+    """
+    key = os.path.abspath(ref_path)
+    if key not in _ref_columns_cache:
+        df_ref = pd.read_excel(ref_path, header=0, nrows=0, engine="openpyxl")
+        _ref_columns_cache[key] = list(df_ref.columns)
+    return _ref_columns_cache[key]
+
+def file_signature(path: str) -> List[int]:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def task_fingerprint(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Todo lo que determina el contenido de una salida: origen, plantilla y parámetros."""
+    return {
+        "src": file_signature(task["src_path"]),
+        "ref_cols": [str(c) for c in task["ref_cols"]],
+        "params": {k: task[k] for k in ("header_row", "keep_extras", "date_cols", "start_col", "start_cell")},
+    }
+
+def load_manifest(out_dir: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_manifest(out_dir: str, manifest: Dict[str, Any]):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+# ---------------------- Ejecución de tareas ----------------------
+def run_task(task: Dict[str, Any]) -> Tuple[int, float]:
+    """
+    Procesa un archivo y escribe su salida (se ejecuta en los procesos del pool).
+    Retorna (filas, segundos).
+    """
+    start = time.perf_counter()
+    df_out = process_file(
+        src_path=task["src_path"],
+        ref_cols=task["ref_cols"],
+        header_row_1based=task["header_row"],
+        keep_extras=task["keep_extras"],
+        forced_date_cols=task["date_cols"],
+        start_col=task["start_col"],
+        start_cell=task["start_cell"],
+    )
+    escribir_excel(task["out_path"], df_out, hoja="Hoja1")
+    return len(df_out), time.perf_counter() - start
+
+def run_tasks(tasks: List[Dict[str, Any]], processes: int):
+    """
+    Ejecuta las tareas en un pool de procesos (o en secuencia si processes <= 1)
+    y entrega (task, filas, segundos, error) a medida que terminan.
+    """
+    def _sequential(pending):
+        for task in pending:
+            try:
+                rows, seconds = run_task(task)
+                yield task, rows, seconds, None
+            except Exception as e:
+                yield task, 0, 0.0, e
+
+    if processes <= 1 or len(tasks) <= 1:
+        yield from _sequential(tasks)
+        return
+
+    done = set()
+    try:
+        with ProcessPoolExecutor(max_workers=min(processes, len(tasks))) as executor:
+            futures = {executor.submit(run_task, task): i for i, task in enumerate(tasks)}
+            for future in as_completed(futures):
+                i = futures[future]
+                done.add(i)
+                try:
+                    rows, seconds = future.result()
+                    yield tasks[i], rows, seconds, None
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    yield tasks[i], 0, 0.0, e
+    except BrokenProcessPool as e:
+        print(f"   [ADVERTENCIA] No se pudo procesar en paralelo ({e}), continuando en secuencia")
+        yield from _sequential([task for i, task in enumerate(tasks) if i not in done])
+
 # ----------------------------- MAIN -----------------------------
 def main():
     parser = argparse.ArgumentParser(
@@ -229,6 +333,10 @@ def main():
     )
     parser.add_argument("--config", default=None, help="Ruta a config YAML/JSON con 'jobs' múltiples.")
     parser.add_argument("--suffix", default=None, help="Sufijo global para los archivos de salida (opcional).")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES,
+                        help=f"Archivos procesados a la vez (por defecto {DEFAULT_PROCESSES}; 1 = secuencial).")
+    parser.add_argument("--force", action="store_true",
+                        help="Regenerar todas las salidas aunque el manifiesto indique que no cambiaron.")
     args = parser.parse_args()
 
     config_path = args.config or DEFAULT_CONFIG_PATH
@@ -244,7 +352,10 @@ def main():
         traceback.print_exc()
         sys.exit(1)
 
-    total_files = 0
+    run_start = time.perf_counter()
+    tasks = []
+    skipped = []
+    manifests = {}
     print(f"Se ejecutarán {len(jobs)} job(s) del archivo:\n  {config_path}\n")
     for idx, job in enumerate(jobs, 1):
         sd = job["src_dir"]; od = job["out_dir"]; rf = job["ref"]
@@ -255,8 +366,9 @@ def main():
         suffix = args.suffix if args.suffix is not None else job.get("suffix", "_REORDENADO")
         start_col = job.get("start_col")      # puede ser 'B'
         start_cell = job.get("start_cell")    # puede ser 'B5'
+        job_name = job.get('name', '(sin nombre)')
 
-        print(f"Job {idx}: {job.get('name', '(sin nombre)')}")
+        print(f"Job {idx}: {job_name}")
         print(f"  Origen : {sd}")
         print(f"  Salida : {od}")
         print(f"  Ref    : {rf}")
@@ -267,10 +379,9 @@ def main():
         print(f"  Inicio : start_cell={start_cell or '-'} | start_col={start_col or '-'}")
         print(f"  Sufijo : {suffix}")
 
-        # Cargar layout referencia
+        # Cargar layout referencia (solo encabezado, cacheado por plantilla)
         try:
-            df_ref = pd.read_excel(rf, header=0, engine="openpyxl")
-            ref_cols = list(df_ref.columns)
+            ref_cols = load_ref_columns(rf)
         except Exception as e:
             print(f"   Error leyendo referencia: {e}")
             traceback.print_exc()
@@ -285,31 +396,64 @@ def main():
             print(f"   No se encontraron archivos en {sd} con patrón {pattern}")
             continue
 
-        # Procesar
-        print(f"  Encontrados: {len(paths)} archivo(s)")
+        # Armar tareas; se omiten las salidas cuyo origen/plantilla/parámetros no cambiaron
+        manifest = manifests.setdefault(od, load_manifest(od))
+        pending = 0
         for src_path in paths:
-            base = os.path.basename(src_path)
-            try:
-                df_out = process_file(
-                    src_path=src_path,
-                    ref_cols=ref_cols,
-                    header_row_1based=header_row,
-                    keep_extras=keep_extras,
-                    forced_date_cols=date_cols,
-                    start_col=start_col,
-                    start_cell=start_cell,
-                )
-                name, ext = os.path.splitext(base)
-                out_path = os.path.join(od, f"{name}{suffix}{ext}")
-                with pd.ExcelWriter(out_path, engine="openpyxl") as writer:
-                    df_out.to_excel(writer, index=False, sheet_name="Hoja1")
-                total_files += 1
-                print(f"   {base} -> {os.path.basename(out_path)} (filas: {len(df_out)})")
-            except Exception as e:
-                print(f"   Error procesando {base}: {e}")
-                traceback.print_exc()
-
-    print(f"\nTerminado. Archivos generados: {total_files}")
+            name, ext = os.path.splitext(os.path.basename(src_path))
+            task = {
+                "job": job_name,
+                "src_path": src_path,
+                "out_path": os.path.join(od, f"{name}{suffix}{ext}"),
+                "out_dir": od,
+                "ref_cols": ref_cols,
+                "header_row": header_row,
+                "keep_extras": keep_extras,
+                "date_cols": date_cols,
+                "start_col": start_col,
+                "start_cell": start_cell,
+            }
+            task["fingerprint"] = task_fingerprint(task)
+            out_name = os.path.basename(task["out_path"])
+            if (not args.force and os.path.isfile(task["out_path"])
+                    and manifest.get(out_name) == task["fingerprint"]):
+                skipped.append(task)
+            else:
+                tasks.append(task)
+                pending += 1
+        print(f"  Encontrados: {len(paths)} archivo(s), a procesar: {pending}, sin cambios: {len(paths) - pending}")
+
+    # Procesar (todos los jobs a la vez)
+    if tasks:
+        print(f"\nProcesando {len(tasks)} archivo(s) con {min(args.processes, len(tasks))} proceso(s)...")
+    timings = []
+    for task, rows, seconds, error in run_tasks(tasks, args.processes):
+        base = os.path.basename(task["src_path"])
+        if error is not None:
+            print(f"   [{task['job']}] Error procesando {base}: {error}")
+            traceback.print_exception(type(error), error, error.__traceback__)
+            timings.append((task, "error", rows, seconds))
+            continue
+        manifest = manifests[task["out_dir"]]
+        manifest[os.path.basename(task["out_path"])] = task["fingerprint"]
+        save_manifest(task["out_dir"], manifest)
+        timings.append((task, "ok", rows, seconds))
+        print(f"   [{task['job']}] {base} -> {os.path.basename(task['out_path'])} (filas: {rows}, {seconds:.1f}s)")
+
+    # Resumen con tiempos por archivo
+    elapsed = time.perf_counter() - run_start
+    generated = sum(1 for _, status, _, _ in timings if status == "ok")
+    failed = len(timings) - generated
+    print("\nResumen por archivo:")
+    order = {id(task): i for i, task in enumerate(tasks)}
+    for task, status, rows, seconds in sorted(timings, key=lambda t: order[id(t[0])]):
+        print(f"  {task['job']:<18} {os.path.basename(task['src_path']):<40} {status:<6} {rows:>8} filas {seconds:>7.1f}s")
+    for task in skipped:
+        print(f"  {task['job']:<18} {os.path.basename(task['src_path']):<40} {'sin cambios':<6}")
+
+    cpu_total = sum(seconds for _, _, _, seconds in timings)
+    print(f"\nTerminado. Archivos generados: {generated}, sin cambios: {len(skipped)}, con error: {failed}")
+    print(f"Tiempo total: {elapsed:.1f}s (suma por archivo: {cpu_total:.1f}s)")
 
 if __name__ == "__main__":
     main()
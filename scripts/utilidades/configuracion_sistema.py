@@ -5,72 +5,199 @@
 
 Módulo para manejar la configuración del sistema OTIF Master.
 Proporciona funciones para cargar y usar la configuración de rutas.
+Es el servicio compartido por la aplicación web y los scripts de
+procesamiento: mantiene la configuración en caché (validada por mtime),
+la valida una sola vez por cambio y la guarda de forma atómica.
 
 Autor: OTIF Master
 Fecha: 2025
 """
 
+import copy
 import json
 import logging
+import os
+import tempfile
+import threading
 from pathlib import Path
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+ARCHIVO_CONFIGURACION = 'configuracion_rutas.json'
+
+RUTAS_REQUERIDAS = [
+    "rep_plr", "no_entregas", "vol_portafolio",
+    "output_unificado", "output_final"
+]
+
+CONFIGURACION_POR_DEFECTO = {
+    "rutas_archivos": {
+        "rep_plr": "Data/Rep PLR",
+        "no_entregas": "Data/No Entregas/2025",
+        "vol_portafolio": "Data/Vol_Portafolio",
+        "output_unificado": "Data/Output_Unificado",
+        "output_final": "Data/Output/calculo_otif"
+    },
+    "archivos_principales": [
+        "rep_plr.parquet",
+        "no_entregas.parquet", 
+        "vol_portafolio.parquet",
+        "datos_completos_con_no_entregas.parquet",
+        "cubo_otif.parquet"
+    ],
+    "ultima_actualizacion": None
+}
+
+# Caché en memoria validada por mtime/tamaño del archivo: la configuración
+# solo se vuelve a leer y validar cuando el archivo cambia en disco
+_cache = {'config': None, 'firma': None}
+_lock = threading.RLock()
+_observadores = []
+
+def _firma_archivo(ruta):
+    """Retorna (mtime_ns, tamaño) del archivo o None si no existe."""
+    try:
+        stat = os.stat(ruta)
+        return (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return None
+
+def validar_configuracion(config):
+    """
+    Valida la estructura de la configuración.
+
+    Args:
+        config (dict): Configuración a validar
+
+    Raises:
+        ValueError: Si falta alguna sección o ruta requerida, o los tipos no son válidos
+    """
+    if not isinstance(config, dict):
+        raise ValueError("La configuración debe ser un objeto JSON")
+
+    rutas = config.get("rutas_archivos")
+    if not isinstance(rutas, dict):
+        raise ValueError("Falta la sección 'rutas_archivos'")
+    faltantes = [ruta for ruta in RUTAS_REQUERIDAS if ruta not in rutas]
+    if faltantes:
+        raise ValueError(f"Rutas faltantes en configuración: {', '.join(faltantes)}")
+    if not all(isinstance(valor, str) for valor in rutas.values()):
+        raise ValueError("Todas las rutas de 'rutas_archivos' deben ser texto")
+
+    archivos = config.get("archivos_principales")
+    if not isinstance(archivos, list) or not all(isinstance(a, str) for a in archivos):
+        raise ValueError("'archivos_principales' debe ser una lista de nombres de archivo")
+
+def registrar_observador(callback):
+    """
+    Registra una función que se llama con la nueva configuración cada vez que
+    cambia (al guardarla o al detectar que el archivo se modificó en disco).
+    """
+    with _lock:
+        if callback not in _observadores:
+            _observadores.append(callback)
+
+def _notificar_cambio(config):
+    """Notifica a los observadores registrados que la configuración cambió."""
+    for callback in list(_observadores):
+        try:
+            callback(copy.deepcopy(config))
+        except Exception as e:
+            logger.error(f"❌ Error en observador de configuración: {str(e)}")
+
+def invalidar_cache():
+    """Fuerza a que la próxima llamada a cargar_configuracion() relea el archivo."""
+    with _lock:
+        _cache['config'] = None
+        _cache['firma'] = None
+
 def cargar_configuracion():
     """
     Carga la configuración de rutas desde el archivo JSON.
     Si no existe, crea una configuración por defecto.
+
+    El archivo solo se lee y valida cuando cambia su mtime/tamaño; el resto
+    de llamadas devuelve una copia de la configuración en caché. Si el
+    archivo es inválido se usa la configuración por defecto sin sobrescribirlo.
     """
-    try:
-        with open('configuracion_rutas.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            logger.info("✅ Configuración cargada desde configuracion_rutas.json")
-            return config
-    except FileNotFoundError:
-        logger.warning("⚠️ Archivo de configuración no encontrado. Creando configuración por defecto...")
-        return crear_configuracion_por_defecto()
-    except Exception as e:
-        logger.error(f"❌ Error al cargar configuración: {str(e)}")
-        logger.info("🔄 Usando configuración por defecto...")
-        return crear_configuracion_por_defecto()
+    with _lock:
+        firma = _firma_archivo(ARCHIVO_CONFIGURACION)
+
+        if _cache['config'] is not None and firma is not None and firma == _cache['firma']:
+            return copy.deepcopy(_cache['config'])
+
+        if firma is None:
+            logger.warning("⚠️ Archivo de configuración no encontrado. Creando configuración por defecto...")
+            return crear_configuracion_por_defecto()
+
+        habia_config = _cache['config'] is not None
+        try:
+            with open(ARCHIVO_CONFIGURACION, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            validar_configuracion(config)
+            logger.info(f"✅ Configuración cargada desde {ARCHIVO_CONFIGURACION}")
+        except Exception as e:
+            logger.error(f"❌ Error al cargar configuración: {str(e)}")
+            logger.info("🔄 Usando configuración por defecto (el archivo no se modifica)...")
+            config = copy.deepcopy(CONFIGURACION_POR_DEFECTO)
+
+        _cache['config'] = config
+        _cache['firma'] = firma
+
+    if habia_config:
+        _notificar_cambio(config)
+    return copy.deepcopy(config)
 
 def crear_configuracion_por_defecto():
     """
     Crea una configuración por defecto y la guarda en el archivo JSON.
     """
-    config_default = {
-        "rutas_archivos": {
-            "rep_plr": "Data/Rep PLR",
-            "no_entregas": "Data/No Entregas/2025",
-            "vol_portafolio": "Data/Vol_Portafolio",
-            "output_unificado": "Data/Output_Unificado",
-            "output_final": "Data/Output/calculo_otif"
-        },
-        "archivos_principales": [
-            "rep_plr.parquet",
-            "no_entregas.parquet", 
-            "vol_portafolio.parquet",
-            "datos_completos_con_no_entregas.parquet"
-        ],
-        "ultima_actualizacion": None
-    }
-    
-    guardar_configuracion(config_default)
-    logger.info("✅ Configuración por defecto creada y guardada")
-    return config_default
+    config_default = copy.deepcopy(CONFIGURACION_POR_DEFECTO)
+    try:
+        guardar_configuracion(config_default)
+        logger.info("✅ Configuración por defecto creada y guardada")
+    except OSError:
+        # Sin permisos de escritura se sigue trabajando con los valores por defecto
+        logger.warning("⚠️ Se usará la configuración por defecto sin guardarla")
+    return copy.deepcopy(config_default)
 
 def guardar_configuracion(config):
     """
     Guarda la configuración en el archivo JSON.
+
+    La escritura es atómica (archivo temporal + reemplazo) para que otros
+    procesos nunca lean un JSON a medio escribir.
+
+    Raises:
+        ValueError: Si la configuración no es válida
+        OSError: Si no se pudo escribir el archivo
     """
     try:
+        validar_configuracion(config)
         config["ultima_actualizacion"] = datetime.now().isoformat()
-        with open('configuracion_rutas.json', 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
-        logger.info("✅ Configuración guardada en configuracion_rutas.json")
+
+        ruta = Path(ARCHIVO_CONFIGURACION)
+        directorio = ruta.parent if str(ruta.parent) else Path('.')
+        with _lock:
+            fd, ruta_temporal = tempfile.mkstemp(prefix=f".{ruta.name}.", suffix='.tmp', dir=directorio)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(config, f, indent=2, ensure_ascii=False)
+                os.replace(ruta_temporal, ruta)
+            except Exception:
+                if os.path.exists(ruta_temporal):
+                    os.remove(ruta_temporal)
+                raise
+
+            _cache['config'] = copy.deepcopy(config)
+            _cache['firma'] = _firma_archivo(ruta)
+
+        logger.info(f"✅ Configuración guardada en {ARCHIVO_CONFIGURACION}")
+        _notificar_cambio(config)
     except Exception as e:
         logger.error(f"❌ Error al guardar configuración: {str(e)}")
+        raise
 
 def obtener_ruta_archivo(tipo_archivo):
     """
@@ -98,6 +225,8 @@ def obtener_ruta_archivo(tipo_archivo):
         return Path(config["rutas_archivos"]["output_unificado"]) / "vol_portafolio.parquet"
     elif tipo_archivo == "datos_completos":
         return Path(config["rutas_archivos"]["output_unificado"]) / "datos_completos_con_no_entregas.parquet"
+    elif tipo_archivo == "cubo_otif":
+        return Path(config["rutas_archivos"]["output_unificado"]) / "cubo_otif.parquet"
     else:
         raise ValueError(f"Tipo de archivo no reconocido: {tipo_archivo}")
 
@@ -155,12 +284,7 @@ def verificar_configuracion():
         config = cargar_configuracion()
         
         # Verificar que todas las rutas estén definidas
-        rutas_requeridas = [
-            "rep_plr", "no_entregas", "vol_portafolio", 
-            "output_unificado", "output_final"
-        ]
-        
-        for ruta in rutas_requeridas:
+        for ruta in RUTAS_REQUERIDAS:
             if ruta not in config["rutas_archivos"]:
                 logger.error(f"❌ Ruta faltante en configuración: {ruta}")
                 return False
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Escritura rápida de archivos Excel
+==================================
+
+Fachada común para guardar DataFrames en .xlsx. Las filas se escriben en
+secuencia con xlsxwriter en modo constant_memory: cada fila se vuelca al
+disco al terminarla, así que la memoria no crece con el tamaño del archivo
+(pandas.to_excel escribe por columnas y no puede usar ese modo).
+
+- Anchos de columna y formatos numéricos/de fecha se declaran por columna
+- Una hoja puede escribirse por lotes (iterable de DataFrames)
+- Sin xlsxwriter instalado se usa openpyxl en modo write_only (también en secuencia)
+- openpyxl normal solo se usa para reemplazar hojas de un libro existente (agregar=True)
+- Los valores ±inf se escriben como celdas de error en lugar de fallar
+
+Uso:
+    escribir_excel("salida.xlsx", df, hoja="Datos", anchos="auto",
+                   formatos={"Fecha": "dd/mm/yyyy", "Monto": "#,##0.00"})
+
+    with LibroExcel("consolidado.xlsx") as libro:
+        libro.escribir_hoja("Reg_1", df1)
+        libro.escribir_hoja("Reg_2", iterar_lotes())
+
+Benchmark:
+    python escritura_excel.py --benchmark 500000
+
+Autor: OTIF Master
+Fecha: 2025
+"""
+
+import argparse
+import datetime as dt
+import math
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import xlsxwriter
+    XLSXWRITER_DISPONIBLE = True
+except ImportError:
+    XLSXWRITER_DISPONIBLE = False
+
+# Formato de fechas por defecto (el mismo que usa pandas.to_excel)
+FORMATO_FECHA = "yyyy-mm-dd hh:mm:ss"
+
+# Formatos para celdas con objetos date / time de Python
+FORMATO_SOLO_FECHA = "yyyy-mm-dd"
+FORMATO_HORA = "hh:mm:ss"
+
+# Ancho máximo al calcular anchos automáticos
+ANCHO_MAXIMO = 50
+
+# Límite de filas de una hoja de Excel
+MAX_FILAS_EXCEL = 1_048_576
+
+# Filas convertidas a objetos de Python a la vez (limita la memoria por lote)
+FILAS_POR_BLOQUE = 50_000
+
+# Celda de error con la que se escriben los valores ±inf (Excel no los admite como número)
+ERROR_NO_FINITO = "#NUM!"
+
+DatosHoja = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+# ==================== UTILIDADES ====================
+
+def calcular_anchos_columnas(df: pd.DataFrame, maximo: int = ANCHO_MAXIMO,
+                             filas_muestra: Optional[int] = None) -> Dict[str, float]:
+    """
+    Calcula el ancho de cada columna: el texto más largo (encabezado o valor) + 2,
+    sin pasar de 'maximo'. Se calcula por columna completa, sin recorrer celdas.
+
+    Args:
+        df: DataFrame
+        maximo: Ancho máximo
+        filas_muestra: Usar como máximo N filas repartidas en todo el DataFrame (None = todas)
+    """
+    muestra = df
+    if filas_muestra is not None and len(df) > filas_muestra:
+        muestra = df.iloc[::math.ceil(len(df) / filas_muestra)]
+    anchos = {}
+    for columna, serie in muestra.items():
+        largo = len(str(columna))
+        if serie.dtype.kind == 'M':
+            # Las fechas se muestran con FORMATO_FECHA
+            largo = max(largo, len(FORMATO_FECHA))
+        elif len(serie):
+            largo_valores = serie[serie.notna()].astype(str).str.len().max()
+            if pd.notna(largo_valores):
+                largo = max(largo, int(largo_valores))
+        anchos[columna] = min(largo + 2, maximo)
+    return anchos
+
+def _valores_columna(serie: pd.Series) -> list:
+    """Valores de la columna como objetos de Python, con None en los vacíos."""
+    if isinstance(serie.dtype, pd.DatetimeTZDtype):
+        serie = serie.dt.tz_localize(None)
+    valores = serie.to_numpy(dtype=object)
+    vacios = serie.isna().to_numpy()
+    if vacios.any():
+        valores = np.where(vacios, None, valores)
+    return valores.tolist()
+
+def _filas(df: pd.DataFrame):
+    """Filas del DataFrame como tuplas de Python, convertidas por bloques."""
+    for inicio in range(0, len(df), FILAS_POR_BLOQUE):
+        bloque = df.iloc[inicio:inicio + FILAS_POR_BLOQUE]
+        yield from zip(*[_valores_columna(serie) for _, serie in bloque.items()])
+
+def _lotes(datos: DatosHoja):
+    if isinstance(datos, pd.DataFrame):
+        yield datos
+    else:
+        yield from datos
+
+def _infinitos_como_error(df: pd.DataFrame) -> pd.DataFrame:
+    """Reemplaza ±inf de las columnas float por la celda de error #NUM!."""
+    reemplazos = {}
+    for columna, serie in df.items():
+        if serie.dtype.kind == 'f':
+            infinitos = np.isinf(serie.to_numpy())
+            if infinitos.any():
+                reemplazos[columna] = serie.astype(object).mask(infinitos, ERROR_NO_FINITO)
+    return df.assign(**reemplazos) if reemplazos else df
+
+def _preparar(df: pd.DataFrame, index: bool) -> pd.DataFrame:
+    return df.reset_index() if index else df
+
+# ==================== LIBRO ====================
+
+class LibroExcel:
+    """
+    Libro .xlsx nuevo escrito fila por fila. Usar como context manager o
+    llamar a cerrar() al terminar.
+    """
+
+    def __init__(self, ruta, formato_fecha: str = FORMATO_FECHA, motor: Optional[str] = None):
+        """
+        Args:
+            ruta: Archivo .xlsx a crear (se reemplaza si existe)
+            formato_fecha: Formato de las celdas de fecha sin formato propio
+            motor: 'xlsxwriter' u 'openpyxl' (None = xlsxwriter si está instalado)
+        """
+        self.ruta = Path(ruta)
+        self.formato_fecha = formato_fecha
+        self.motor = motor or ('xlsxwriter' if XLSXWRITER_DISPONIBLE else 'openpyxl')
+
+        if self.motor == 'xlsxwriter':
+            self._libro = xlsxwriter.Workbook(str(self.ruta), {
+                'constant_memory': True,
+                'default_date_format': formato_fecha,
+                'remove_timezone': True,
+                'strings_to_urls': False,
+                'nan_inf_to_errors': True,
+            })
+            self._formato_encabezado = self._libro.add_format({'bold': True})
+            self._formatos = {}
+        else:
+            from openpyxl import Workbook
+            self._libro = Workbook(write_only=True)
+
+    # ---------- API ----------
+
+    def escribir_hoja(self, nombre: str, datos: DatosHoja, header: bool = True, index: bool = False,
+                      anchos: Union[None, str, Dict] = None, formatos: Optional[Dict[str, str]] = None) -> int:
+        """
+        Escribe una hoja completa.
+
+        Args:
+            nombre: Nombre de la hoja
+            datos: DataFrame o iterable de DataFrames (lotes con las mismas columnas;
+                   se alinean por nombre con las del primer lote)
+            header: Escribir la fila de encabezados
+            index: Incluir el índice como primera(s) columna(s)
+            anchos: None, 'auto' (según el primer lote) o {columna: ancho}
+            formatos: {columna: formato de número de Excel}, p.ej. {'Fecha': 'dd/mm/yyyy'}
+
+        Returns:
+            Número de filas de datos escritas
+        """
+        lotes = _lotes(datos)
+        primero = next(lotes, None)
+        if primero is None:
+            primero = pd.DataFrame()
+        primero = _preparar(primero, index)
+        columnas = list(primero.columns)
+
+        if anchos == 'auto':
+            anchos = calcular_anchos_columnas(primero)
+        anchos = {columnas.index(c): a for c, a in (anchos or {}).items() if c in columnas}
+        formatos = {columnas.index(c): f for c, f in (formatos or {}).items() if c in columnas}
+
+        def todos_los_lotes():
+            yield primero
+            for lote in lotes:
+                lote = _preparar(lote, index)
+                if list(lote.columns) != columnas:
+                    lote = lote.reindex(columns=columnas)
+                yield lote
+
+        if self.motor == 'xlsxwriter':
+            return self._escribir_xlsxwriter(nombre, columnas, todos_los_lotes(), header, anchos, formatos)
+        return self._escribir_openpyxl(nombre, columnas, todos_los_lotes(), header, anchos, formatos)
+
+    def cerrar(self):
+        if self._libro is None:
+            return
+        if self.motor == 'xlsxwriter':
+            self._libro.close()
+        else:
+            self._libro.save(str(self.ruta))
+        self._libro = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    # ---------- xlsxwriter ----------
+
+    def _formato(self, num_format):
+        if num_format not in self._formatos:
+            self._formatos[num_format] = self._libro.add_format({'num_format': num_format})
+        return self._formatos[num_format]
+
+    def _escritor_generico(self, hoja):
+        """
+        hoja.write para columnas de objetos: date/time con su propio formato y
+        como texto los valores que xlsxwriter no reconoce (bytes, etc.).
+        """
+        def escribir(fila, columna, valor, formato=None):
+            if formato is None and isinstance(valor, (dt.date, dt.time)) and not isinstance(valor, dt.datetime):
+                formato = self._formato(FORMATO_HORA if isinstance(valor, dt.time) else FORMATO_SOLO_FECHA)
+            elif isinstance(valor, (bytes, bytearray)):
+                return hoja.write_string(fila, columna, valor.decode('utf-8', errors='replace'), formato)
+            try:
+                return hoja.write(fila, columna, valor, formato)
+            except TypeError:
+                return hoja.write_string(fila, columna, str(valor), formato)
+        return escribir
+
+    def _escribir_xlsxwriter(self, nombre, columnas, lotes, header, anchos, formatos):
+        hoja = self._libro.add_worksheet(nombre)
+        formatos_celda = [self._formato(formatos[i]) if i in formatos else None for i in range(len(columnas))]
+        for i in set(anchos) | set(formatos):
+            hoja.set_column(i, i, anchos.get(i), formatos_celda[i])
+
+        fila = 0
+        if header:
+            for i, columna in enumerate(columnas):
+                hoja.write(0, i, columna if isinstance(columna, str) else str(columna), self._formato_encabezado)
+            fila = 1
+
+        escritos = 0
+        for lote in lotes:
+            if fila + len(lote) > MAX_FILAS_EXCEL:
+                raise ValueError(f"La hoja '{nombre}' supera el máximo de {MAX_FILAS_EXCEL} filas de Excel")
+
+            # Función de escritura por columna según su tipo (evita deducir el tipo en cada celda)
+            escritores = []
+            for i, (_, serie) in enumerate(lote.items()):
+                tipo = serie.dtype.kind
+                if tipo in 'iuf':
+                    escritores.append(hoja.write_number)
+                elif tipo == 'b':
+                    escritores.append(hoja.write_boolean)
+                elif tipo == 'M':
+                    escritores.append(hoja.write_datetime)
+                else:
+                    escritores.append(self._escritor_generico(hoja))
+
+            columnas_lote = list(zip(range(len(escritores)), escritores, formatos_celda))
+            for registro in _filas(lote):
+                for (i, escribir, formato), valor in zip(columnas_lote, registro):
+                    if valor is not None:
+                        escribir(fila, i, valor, formato)
+                fila += 1
+            escritos += len(lote)
+        return escritos
+
+    # ---------- openpyxl (write_only) ----------
+
+    def _escribir_openpyxl(self, nombre, columnas, lotes, header, anchos, formatos):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        from openpyxl.utils import get_column_letter
+
+        hoja = self._libro.create_sheet(nombre)
+        for i, ancho in anchos.items():
+            hoja.column_dimensions[get_column_letter(i + 1)].width = ancho
+
+        fila = 0
+        if header:
+            encabezados = []
+            for columna in columnas:
+                celda = WriteOnlyCell(hoja, value=columna if isinstance(columna, str) else str(columna))
+                celda.font = Font(bold=True)
+                encabezados.append(celda)
+            hoja.append(encabezados)
+            fila = 1
+
+        escritos = 0
+        for lote in lotes:
+            if fila + len(lote) > MAX_FILAS_EXCEL:
+                raise ValueError(f"La hoja '{nombre}' supera el máximo de {MAX_FILAS_EXCEL} filas de Excel")
+            lote = _infinitos_como_error(lote)
+
+            # Formato por columna: el declarado o, en columnas de fecha, el de fechas
+            formatos_columna = {
+                i: formatos.get(i, self.formato_fecha)
+                for i, (_, serie) in enumerate(lote.items())
+                if i in formatos or serie.dtype.kind == 'M'
+            }
+            for registro in _filas(lote):
+                if formatos_columna:
+                    registro = list(registro)
+                    for i, num_format in formatos_columna.items():
+                        if registro[i] is not None:
+                            celda = WriteOnlyCell(hoja, value=registro[i])
+                            celda.number_format = num_format
+                            registro[i] = celda
+                hoja.append(registro)
+            fila += len(lote)
+            escritos += len(lote)
+        return escritos
+
+# ==================== FUNCIONES ====================
+
+def escribir_excel(ruta, datos: Union[DatosHoja, Dict[str, DatosHoja]], hoja: str = "Sheet1",
+                   header: bool = True, index: bool = False, anchos: Union[None, str, Dict] = None,
+                   formatos: Optional[Dict[str, str]] = None, formato_fecha: str = FORMATO_FECHA,
+                   agregar: bool = False) -> Path:
+    """
+    Guarda uno o varios DataFrames en un .xlsx.
+
+    Args:
+        ruta: Archivo de salida
+        datos: DataFrame, iterable de lotes, o {nombre_hoja: DataFrame/lotes}
+        hoja: Nombre de la hoja cuando 'datos' no es un diccionario
+        header, index: Igual que en DataFrame.to_excel
+        anchos: None, 'auto' o {columna: ancho}
+        formatos: {columna: formato de número de Excel}
+        formato_fecha: Formato de las fechas sin formato propio
+        agregar: Reemplazar/agregar las hojas en un libro existente (usa openpyxl)
+
+    Returns:
+        Ruta del archivo escrito
+    """
+    ruta = Path(ruta)
+    hojas = datos if isinstance(datos, dict) else {hoja: datos}
+
+    if agregar and ruta.exists():
+        _reemplazar_hojas(ruta, hojas, header, index, anchos, formatos, formato_fecha)
+        return ruta
+
+    with LibroExcel(ruta, formato_fecha=formato_fecha) as libro:
+        for nombre, datos_hoja in hojas.items():
+            libro.escribir_hoja(nombre, datos_hoja, header=header, index=index, anchos=anchos, formatos=formatos)
+    return ruta
+
+def _reemplazar_hojas(ruta, hojas, header, index, anchos, formatos, formato_fecha):
+    """Edita un libro existente con openpyxl: reemplaza (o agrega) las hojas indicadas."""
+    from openpyxl.utils import get_column_letter
+
+    with pd.ExcelWriter(ruta, engine='openpyxl', mode='a', if_sheet_exists='replace',
+                        datetime_format=formato_fecha) as writer:
+        for nombre, datos_hoja in hojas.items():
+            df = pd.concat(list(_lotes(datos_hoja)), ignore_index=True)
+            df.to_excel(writer, sheet_name=nombre, header=header, index=index)
+
+            df = _preparar(df, index)
+            anchos_hoja = calcular_anchos_columnas(df) if anchos == 'auto' else (anchos or {})
+            hoja = writer.sheets[nombre]
+            for i, columna in enumerate(df.columns):
+                letra = get_column_letter(i + 1)
+                if columna in anchos_hoja:
+                    hoja.column_dimensions[letra].width = anchos_hoja[columna]
+                if formatos and columna in formatos:
+                    for (celda,) in hoja.iter_rows(min_row=2 if header else 1, min_col=i + 1, max_col=i + 1):
+                        celda.number_format = formatos[columna]
+
+# ==================== BENCHMARK ====================
+
+def _memoria_pico_mb():
+    """Memoria máxima del proceso en MB (None si el sistema no la informa)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes
+    return pico / 1024 / (1024 if os.uname().sysname == 'Darwin' else 1)
+
+def _datos_benchmark(filas: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'Fecha': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365, filas), unit='D'),
+        'Centro': rng.choice(['SJO', 'ALJ', 'HER', 'CAR', 'LIB'], filas),
+        'Ruta': rng.integers(100, 999, filas).astype(str),
+        'Cliente': rng.integers(1_000_000, 9_999_999, filas),
+        'Material': rng.choice([f'MAT{i:05d}' for i in range(500)], filas),
+        'Cajas': rng.integers(0, 200, filas),
+        'Monto': rng.random(filas) * 10000,
+        'Estatus': rng.choice(['Entregado', 'Pendiente', 'Rechazado', None], filas),
+    })
+
+def _medir_variante(variante: str, filas: int, carpeta: str):
+    df = _datos_benchmark(filas)
+    memoria_df = df.memory_usage(deep=True).sum() / 1024 / 1024
+    ruta = Path(carpeta) / f"benchmark_{variante}.xlsx"
+    inicio = time.perf_counter()
+    if variante == 'pandas_openpyxl':
+        df.to_excel(ruta, index=False, engine='openpyxl')
+    else:
+        motor = 'xlsxwriter' if variante == 'xlsxwriter_constant_memory' else 'openpyxl'
+        with LibroExcel(ruta, motor=motor) as libro:
+            libro.escribir_hoja('Datos', df, formatos={'Monto': '#,##0.00'})
+    segundos = time.perf_counter() - inicio
+    return segundos, _memoria_pico_mb(), memoria_df, ruta.stat().st_size
+
+def benchmark(filas: int = 500_000, carpeta: str = "."):
+    """Compara tiempo y memoria pico de cada forma de escribir (un proceso nuevo por variante)."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    variantes = ['pandas_openpyxl', 'openpyxl_write_only']
+    if XLSXWRITER_DISPONIBLE:
+        variantes.append('xlsxwriter_constant_memory')
+
+    print(f"Benchmark de escritura Excel: {filas:,} filas x 8 columnas")
+    for variante in variantes:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            segundos, memoria, memoria_df, tamaño = executor.submit(_medir_variante, variante, filas, carpeta).result()
+        memoria_txt = f"{memoria:6.0f} MB" if memoria is not None else "   n/d"
+        print(f"  {variante:<28} {segundos:7.1f}s  memoria pico {memoria_txt} (DataFrame {memoria_df:.0f} MB)"
+              f"  archivo {tamaño / 1024 / 1024:5.1f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Escritura rápida de Excel")
+    parser.add_argument("--benchmark", type=int, metavar="FILAS", help="Ejecutar el benchmark con N filas")
+    parser.add_argument("--carpeta", default=".", help="Carpeta para los archivos del benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark, args.carpeta)
+    else:
+        parser.print_help()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+📤 PUBLICACIÓN DE ARCHIVOS DE SALIDA
+====================================
+
+Publica los archivos principales de output_unificado en output_final sin
+duplicar la escritura en disco cuando no hace falta:
+
+1. Si el contenido no cambió desde la última publicación (según el
+   manifiesto de checksums) el archivo se omite.
+2. Si origen y destino están en el mismo sistema de archivos se usa un
+   reflink (copy-on-write) o, si no está disponible, un hardlink.
+3. En otro caso se copia por bloques, con varios archivos en paralelo.
+
+Todo se escribe primero con un nombre temporal en la carpeta destino y se
+reemplaza con os.replace, de modo que los lectores nunca ven un archivo a
+medias. El resultado queda registrado en manifiesto_publicacion.json.
+
+Autor: OTIF Master
+Fecha: 2025
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_MANIFIESTO = "manifiesto_publicacion.json"
+TAMANO_BLOQUE = 16 * 1024 * 1024
+MAX_HILOS_COPIA = 4
+
+# ioctl de Linux para clonar un archivo (reflink) en btrfs/xfs
+FICLONE = 0x40049409
+
+def calcular_sha256(ruta):
+    """Calcula el SHA-256 de un archivo leyéndolo por bloques."""
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(TAMANO_BLOQUE), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+def cargar_manifiesto(carpeta_destino):
+    """Carga el manifiesto de publicación de la carpeta destino (vacío si no existe)."""
+    ruta = Path(carpeta_destino) / ARCHIVO_MANIFIESTO
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"archivos": {}}
+
+def guardar_manifiesto(carpeta_destino, manifiesto):
+    """Guarda el manifiesto de publicación de forma atómica."""
+    ruta = Path(carpeta_destino) / ARCHIVO_MANIFIESTO
+    ruta_temporal = ruta.with_name(f".{ruta.name}.tmp")
+    manifiesto["fecha_publicacion"] = datetime.now().isoformat()
+    with open(ruta_temporal, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+    os.replace(ruta_temporal, ruta)
+
+def _sha256_origen(origen, entrada_anterior):
+    """
+    Retorna el SHA-256 del archivo origen, reutilizando el del manifiesto si
+    el tamaño y la fecha de modificación no cambiaron (evita releer el archivo).
+    """
+    stat = origen.stat()
+    if (entrada_anterior
+            and entrada_anterior.get("tamaño") == stat.st_size
+            and entrada_anterior.get("mtime_ns_origen") == stat.st_mtime_ns):
+        return entrada_anterior["sha256"]
+    return calcular_sha256(origen)
+
+def _clonar_reflink(origen, destino):
+    """Clona el archivo con un reflink (solo Linux con sistemas de archivos CoW)."""
+    import fcntl
+
+    with open(origen, 'rb') as f_origen, open(destino, 'wb') as f_destino:
+        fcntl.ioctl(f_destino.fileno(), FICLONE, f_origen.fileno())
+
+def _copiar_por_bloques(origen, destino):
+    """Copia el archivo por bloques y retorna el SHA-256 de lo leído."""
+    sha = hashlib.sha256()
+    with open(origen, 'rb') as f_origen, open(destino, 'wb') as f_destino:
+        for bloque in iter(lambda: f_origen.read(TAMANO_BLOQUE), b''):
+            sha.update(bloque)
+            f_destino.write(bloque)
+    shutil.copystat(origen, destino)
+    return sha.hexdigest()
+
+def publicar_archivo(origen, carpeta_destino, entrada_anterior=None):
+    """
+    Publica un archivo en la carpeta destino usando el método más barato disponible.
+
+    Args:
+        origen (Path): Archivo a publicar
+        carpeta_destino (Path): Carpeta de publicación
+        entrada_anterior (dict): Entrada del manifiesto de la publicación anterior
+
+    Returns:
+        dict: Entrada del manifiesto con 'metodo' (omitido, reflink, hardlink o copia)
+
+    Raises:
+        IOError: Si la verificación del checksum de la copia falla
+    """
+    origen = Path(origen)
+    destino = Path(carpeta_destino) / origen.name
+    stat = origen.stat()
+    sha_origen = _sha256_origen(origen, entrada_anterior)
+
+    entrada = {
+        "sha256": sha_origen,
+        "tamaño": stat.st_size,
+        "mtime_ns_origen": stat.st_mtime_ns,
+        "metodo": None
+    }
+
+    if (entrada_anterior and entrada_anterior.get("sha256") == sha_origen
+            and destino.exists() and destino.stat().st_size == stat.st_size):
+        entrada["metodo"] = "omitido"
+        return entrada
+
+    ruta_temporal = destino.with_name(f".{destino.name}.tmp")
+    if ruta_temporal.exists():
+        ruta_temporal.unlink()
+
+    try:
+        if os.stat(Path(carpeta_destino)).st_dev == stat.st_dev:
+            try:
+                _clonar_reflink(origen, ruta_temporal)
+                entrada["metodo"] = "reflink"
+            except (ImportError, OSError):
+                if ruta_temporal.exists():
+                    ruta_temporal.unlink()
+                try:
+                    os.link(origen, ruta_temporal)
+                    entrada["metodo"] = "hardlink"
+                except OSError:
+                    pass
+
+        if entrada["metodo"] is None:
+            sha_copiado = _copiar_por_bloques(origen, ruta_temporal)
+            sha_destino = calcular_sha256(ruta_temporal)
+            if sha_copiado != sha_origen or sha_destino != sha_origen:
+                raise IOError(f"Checksum no coincide al copiar {origen.name}")
+            entrada["metodo"] = "copia"
+
+        os.replace(ruta_temporal, destino)
+    finally:
+        if ruta_temporal.exists():
+            ruta_temporal.unlink()
+
+    return entrada
+
+def publicar_archivos(archivos_origen, carpeta_destino, max_hilos=MAX_HILOS_COPIA):
+    """
+    Publica varios archivos en paralelo y actualiza el manifiesto de checksums.
+
+    Args:
+        archivos_origen (list[Path]): Archivos a publicar
+        carpeta_destino (Path): Carpeta de publicación
+        max_hilos (int): Máximo de archivos publicados a la vez
+
+    Returns:
+        dict: {nombre_archivo: entrada del manifiesto o {'error': mensaje}}
+    """
+    carpeta_destino = Path(carpeta_destino)
+    carpeta_destino.mkdir(parents=True, exist_ok=True)
+    manifiesto = cargar_manifiesto(carpeta_destino)
+    anteriores = manifiesto.get("archivos", {})
+
+    resultados = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_hilos, len(archivos_origen)))) as executor:
+        futuros = {
+            executor.submit(publicar_archivo, origen, carpeta_destino, anteriores.get(Path(origen).name)): Path(origen).name
+            for origen in archivos_origen
+        }
+        for futuro, nombre in futuros.items():
+            try:
+                resultados[nombre] = futuro.result()
+                logger.info(f"✅ Publicado {nombre} ({resultados[nombre]['metodo']})")
+            except Exception as e:
+                resultados[nombre] = {"error": str(e)}
+                logger.error(f"❌ Error al publicar {nombre}: {str(e)}")
+
+    for nombre, entrada in resultados.items():
+        if "error" not in entrada:
+            anteriores[nombre] = entrada
+    manifiesto["archivos"] = anteriores
+    guardar_manifiesto(carpeta_destino, manifiesto)
+
+    return resultados